@@ -0,0 +1,5 @@
+"""
+Benchmarks of loading, cleaning and rendering synthetic notebooks.
+
+Run with `python -m benchmarks`, see `python -m benchmarks --help` for the options.
+"""
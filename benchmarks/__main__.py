@@ -0,0 +1,236 @@
+"""
+Runs the benchmarks, writing the timings and peak memory use as JSON.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import tidynotes
+from tidynotes.mardown_document import MarkdownPart
+
+from .synthetic import NotebookSpec, generate_notebook
+
+# Sets up a benchmark in a copy of the notebook, returning the function to time.
+Setup = Callable[[str], Callable[[], Any]]
+
+
+def _notebook(notebook_dir: str) -> tidynotes.Notebook:
+    """Open a notebook with workers configured from the environment."""
+    return tidynotes.Notebook(
+        notebook_dir, workers=int(os.environ.get("TIDYNOTES_WORKERS", 1))
+    )
+
+
+def _cold(notebook_dir: str) -> tidynotes.Notebook:
+    """Open a notebook with all of its caches removed."""
+    notebook = _notebook(notebook_dir)
+    notebook.cache.clear()
+    notebook.fragments.clear()
+    clean_state = os.path.join(notebook_dir, notebook.working_dir, "clean_state.json")
+    if os.path.exists(clean_state):
+        os.remove(clean_state)
+    return notebook
+
+
+def setup_parse(notebook_dir: str) -> Callable[[], Any]:
+    """Parse every note from its file, without any caching."""
+    paths = list(_notebook(notebook_dir).files)
+    return lambda: [MarkdownPart.from_file(x) for x in paths]
+
+
+def setup_read_cold(notebook_dir: str) -> Callable[[], Any]:
+    """Read every note with an empty note cache."""
+    return _cold(notebook_dir).read_notes
+
+
+def setup_read_warm(notebook_dir: str) -> Callable[[], Any]:
+    """Read every note from the note cache."""
+    _notebook(notebook_dir).read_notes()
+    return _notebook(notebook_dir).read_notes
+
+
+def setup_clean_full(notebook_dir: str) -> Callable[[], Any]:
+    """Clean every note."""
+    notebook = _cold(notebook_dir)
+    return lambda: notebook.clean(incremental=False)
+
+
+def setup_clean_unchanged(notebook_dir: str) -> Callable[[], Any]:
+    """Clean a notebook that hasn't changed since it was last cleaned."""
+    _notebook(notebook_dir).clean()
+    return _notebook(notebook_dir).clean
+
+
+def setup_render_full_cold(notebook_dir: str) -> Callable[[], Any]:
+    """Render the whole notebook with empty caches."""
+    return _cold(notebook_dir).render_full
+
+
+def setup_render_full_warm(notebook_dir: str) -> Callable[[], Any]:
+    """Render the whole notebook again, with the caches filled."""
+    _notebook(notebook_dir).render_full()
+    return _notebook(notebook_dir).render_full
+
+
+def setup_render_projects(notebook_dir: str) -> Callable[[], Any]:
+    """Render every project to its own file."""
+    return _notebook(notebook_dir).render_all_projects
+
+
+def setup_render_shards_current(notebook_dir: str) -> Callable[[], Any]:
+    """Render the latest shard again after its newest note has changed."""
+    notebook = _notebook(notebook_dir)
+    notebook.render_shards()
+    with open(list(notebook.files)[-1], "a", encoding="utf-8") as file:
+        file.write("\nAn edit.\n")
+    return _notebook(notebook_dir).render_shards
+
+
+BENCHMARKS: Dict[str, Setup] = {
+    "parse": setup_parse,
+    "read_notes_cold": setup_read_cold,
+    "read_notes_warm": setup_read_warm,
+    "clean_full": setup_clean_full,
+    "clean_unchanged": setup_clean_unchanged,
+    "render_full_cold": setup_render_full_cold,
+    "render_full_warm": setup_render_full_warm,
+    "render_all_projects": setup_render_projects,
+    "render_shards_current": setup_render_shards_current,
+}
+
+
+def run_benchmark(
+    setup: Setup, source_dir: str, repeat: int, memory: bool = True
+) -> Dict[str, Any]:
+    """
+    Time a benchmark, setting it up afresh in a copy of the notebook for each run.
+
+    The peak memory is measured on an extra run, as tracing slows everything down.
+    """
+    times = []
+    peak = None
+    for run_no in range(repeat + (1 if memory else 0)):
+        with tempfile.TemporaryDirectory("tidynotes_bench") as working_dir:
+            notebook_dir = os.path.join(working_dir, "notebook")
+            shutil.copytree(source_dir, notebook_dir)
+            function = setup(notebook_dir)
+            if run_no < repeat:
+                start = time.perf_counter()
+                function()
+                times.append(time.perf_counter() - start)
+            else:
+                tracemalloc.start()
+                function()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+    return {
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "peak_memory": peak,
+    }
+
+
+def run_all(
+    spec: NotebookSpec, repeat: int, names: List[str], memory: bool = True
+) -> Dict[str, Any]:
+    """
+    Run the benchmarks against a synthetic notebook, collating the results.
+    """
+    with tempfile.TemporaryDirectory("tidynotes_bench") as working_dir:
+        source_dir = os.path.join(working_dir, "notebook")
+        generate_notebook(source_dir, spec).clean()
+        results = {}
+        for name in names:
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = run_benchmark(BENCHMARKS[name], source_dir, repeat, memory)
+
+    return {
+        "version": tidynotes.__version__,
+        "commit": _git_commit(),
+        "date": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workers": int(os.environ.get("TIDYNOTES_WORKERS", 1)),
+        "spec": spec.to_dict(),
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """
+    Print how each benchmark's median time and peak memory changed from a baseline.
+    """
+    print(f"{'benchmark':<22}{'baseline':>12}{'current':>12}{'ratio':>8}{'memory':>8}")
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        old = baseline["results"][name]
+        memory = ""
+        if old["peak_memory"] and result["peak_memory"]:
+            memory = f"{result['peak_memory'] / old['peak_memory']:.2f}"
+        print(
+            f"{name:<22}{old['median']:>12.4f}{result['median']:>12.4f}"
+            f"{result['median'] / old['median']:>8.2f}{memory:>8}"
+        )
+
+
+def _git_commit() -> Optional[str]:
+    """Get the current git commit, if there is one."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            universal_newlines=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    """
+    Run the benchmarks from the command-line.
+    """
+    defaults = NotebookSpec()
+    parser = argparse.ArgumentParser(description="Benchmark tidynotes.")
+    for name, value in defaults.to_dict().items():
+        parser.add_argument(f"--{name}", type=int, default=value)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of each.")
+    parser.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS)
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Don't measure peak memory."
+    )
+    parser.add_argument("--output", help="File to write results to (JSON).")
+    parser.add_argument("--compare", help="Results to compare against (JSON).")
+    args = parser.parse_args()
+
+    spec = NotebookSpec(**{x: getattr(args, x) for x in defaults.to_dict()})
+    results = run_all(spec, args.repeat, args.only, memory=not args.no_memory)
+    if args.output is None:
+        print(json.dumps(results, indent=4))
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Generates synthetic notebooks of a set size and shape for benchmarking.
+"""
+
+import datetime
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+import tidynotes
+
+WORDS = (
+    "the of and to in is was it for on with as at by this that from but not are "
+    "meeting notes review draft plan budget report data model test release fix "
+    "update check call email client design server query issue change follow up"
+).split()
+
+
+class NotebookSpec:  # pylint: disable=too-few-public-methods
+    """
+    The size and shape of a synthetic notebook.
+
+    Each note gets `projects` level 2 headings, each nested down to `depth` levels of
+    heading in total, with `body_lines` lines of text under every heading. The
+    notebook's corrections file gets `corrections` rules, a mix of plain text and
+    regex patterns. The same spec and seed always give the same notebook.
+    """
+
+    def __init__(
+        self,
+        *,
+        notes: int = 200,
+        projects: int = 3,
+        depth: int = 3,
+        body_lines: int = 5,
+        corrections: int = 3,
+        seed: int = 0,
+    ) -> None:
+        self.notes = notes
+        self.projects = projects
+        self.depth = depth
+        self.body_lines = body_lines
+        self.corrections = corrections
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the spec as a dictionary (e.g. for recording with results)."""
+        return dict(vars(self))
+
+
+def generate_notebook(notebook_dir: str, spec: NotebookSpec) -> tidynotes.Notebook:
+    """
+    Create a synthetic notebook in an empty directory.
+    """
+    generator = random.Random(spec.seed)
+    notebook = tidynotes.Notebook.initialise(notebook_dir)
+
+    project_names = [f"Project {x}" for x in range(max(spec.projects * 3, 1))]
+    start = datetime.date(year=2020, month=1, day=1)
+    for note_no in range(spec.notes):
+        date = start + datetime.timedelta(days=note_no)
+        title = date.strftime("%Y-%m-%d (%A)")
+        lines = [
+            "---",
+            f"note_for: {date.isoformat()}",
+            f"notebook: {notebook.config['notebook_name']}",
+            f"title: {title}",
+            "---",
+            "",
+            f"# {title}",
+            "",
+        ]
+        lines.extend(_paragraph(generator, spec.body_lines))
+        for project in generator.sample(project_names, spec.projects):
+            lines.extend(_section(generator, spec, project, 2))
+
+        path = os.path.join(
+            notebook.root_dir,
+            notebook.note_dir,
+            date.strftime(str(notebook.config["note_file_format"])),
+        )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    with open(
+        os.path.join(notebook.root_dir, notebook.working_dir, "corrections.json"),
+        "w",
+        encoding="utf-8",
+    ) as file:
+        json.dump(_corrections(spec.corrections), file, indent=4)
+
+    notebook.refresh()
+    return notebook
+
+
+def _section(
+    generator: random.Random, spec: NotebookSpec, title: str, level: int
+) -> List[str]:
+    """Make a heading with some text, along with any sub-headings."""
+    lines = ["#" * level + " " + title, ""]
+    lines.extend(_paragraph(generator, spec.body_lines))
+    if level < spec.depth:
+        for sub_no in range(2):
+            sub_title = f"{'Task' if level == 2 else 'Part'} {generator.randint(1, 9)}"
+            lines.extend(_section(generator, spec, f"{sub_title}.{sub_no}", level + 1))
+    return lines
+
+
+def _paragraph(generator: random.Random, line_count: int) -> List[str]:
+    """Make a paragraph of random words, with some text the corrections will fix."""
+    lines = []
+    for _ in range(line_count):
+        words = generator.choices(WORDS, k=12)
+        if generator.random() < 0.2:
+            words.append("it’s “quoted”")
+        lines.append(" ".join(words).capitalize() + ".")
+    lines.append("")
+    return lines
+
+
+def _corrections(count: int) -> Dict[str, str]:
+    """Make a set of correction rules, starting with the default ones."""
+    rules = {"\n{2,}": "\n\n", "(’|′|ʻ|‘)": "'", "(“|”)": '"'}
+    for rule_no in range(max(count - len(rules), 0)):
+        if rule_no % 2:
+            rules[f"colour{rule_no}"] = f"color{rule_no}"
+        else:
+            rules[f"teh{rule_no}\\b"] = f"the{rule_no}"
+    return dict(list(rules.items())[:count])
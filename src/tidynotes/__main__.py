@@ -3,10 +3,15 @@ Command-line arguments to drive the notebook management tools.
 """
 
 import argparse
+import datetime
+import json
 import os
+from typing import Any, Callable
 
 from .logs import setup_logging
 from .notebook import Notebook
+from .shards import PERIODS
+from .watch import NotebookWatcher
 
 
 def main() -> None:
@@ -36,6 +41,16 @@ def main() -> None:
         help="Create a blank notebook in the target directory.",
         action="store_true",
     )
+    parser.add_argument(
+        "--shards",
+        help=(
+            "Render a page per month or year of notes with an index page,"
+            " only updating pages whose notes changed."
+        ),
+        nargs="?",
+        const="",
+        metavar="PERIOD",
+    )
     parser.add_argument(
         "-e",
         "--extract_project",
@@ -47,16 +62,80 @@ def main() -> None:
         help="Extracts all entries for a each project and renders them to HTML.",
         action="store_true",
     )
+    parser.add_argument(
+        "--since",
+        help="Only render/extract notes for this date (YYYY-MM-DD) onwards.",
+        type=parse_date,
+    )
+    parser.add_argument(
+        "--until",
+        help="Only render/extract notes for dates up to this one (YYYY-MM-DD).",
+        type=parse_date,
+    )
+    parser.add_argument(
+        "--days",
+        help="Only render/extract notes for the last n days (including today).",
+        type=int,
+    )
+    parser.add_argument(
+        "-q", "--query", help="Search the notes and print the best matches."
+    )
+    parser.add_argument(
+        "-l",
+        "--links",
+        help=(
+            "Show the links to and from a note (by path or title),"
+            " or any broken links and images if no note is given."
+        ),
+        nargs="?",
+        const="",
+    )
+    parser.add_argument(
+        "--watch",
+        help="Keep running, re-cleaning/rendering notes as they change.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        help=(
+            "Report the time spent in each phase of work as JSON,"
+            " printed or written to the given file."
+        ),
+        nargs="?",
+        const="-",
+    )
+    parser.add_argument(
+        "--async_io",
+        help=(
+            "Read and write several notes at once when cleaning and rendering"
+            " (e.g. for notebooks on a network share)."
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Number of worker processes to use (defaults to the config setting).",
+        type=int,
+    )
 
     args = parser.parse_args()
+    if args.shards and args.shards not in PERIODS:
+        parser.error(f"--shards must be one of {', '.join(PERIODS)}.")
+    check_range(parser, args)
     active = any(
         [
             args.initialise_notebook,
             args.clean,
             args.render_all,
+            args.shards is not None,
             args.generate_note,
             args.make_series is not None,
             args.extract_project is not None,
+            args.extract_all,
+            args.query is not None,
+            args.links is not None,
+            args.watch,
         ]
     )
 
@@ -68,23 +147,176 @@ def main() -> None:
         book = Notebook.initialise(args.notedir)
     else:
         if Notebook.is_notebook(args.notedir):
-            book = Notebook(args.notedir)
+            book = Notebook(args.notedir, workers=args.workers)
         else:
             print("Directory is not a notebook, use the -i flag to initialise.")
             return
 
+    if args.profile is None:
+        run_actions(book, args)
+        return
+    with book.profile() as profiler:
+        run_actions(book, args)
+    report = json.dumps(profiler.report(), indent=4)
+    if args.profile == "-":
+        print(report)
+    else:
+        with open(args.profile, "w", encoding="utf-8") as file:
+            file.write(report)
+
+
+def check_range(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """
+    Check a range of dates is only given for actions that use it, and set its start.
+    """
+    if args.since is None and args.until is None and args.days is None:
+        return
+    ignored = {
+        "-a": args.extract_all,
+        "--shards": args.shards is not None,
+        "--watch": args.watch,
+        "-q": args.query is not None,
+        "-l": args.links is not None,
+    }
+    ignored_flags = [x for x, y in ignored.items() if y]
+    if ignored_flags:
+        parser.error(
+            "--since/--until/--days only apply to -r and -e,"
+            f" they can't be used with {', '.join(ignored_flags)}."
+        )
+    if not args.render_all and args.extract_project is None:
+        parser.error("--since/--until/--days need -r or -e.")
+    if args.days is not None:
+        if args.since is not None or args.days < 1:
+            parser.error("--days must be at least 1 and can't be used with --since.")
+        args.since = datetime.date.today() - datetime.timedelta(days=args.days - 1)
+
+
+def run_actions(book: Notebook, args: argparse.Namespace) -> None:
+    """
+    Carry out the actions requested on the command-line.
+
+    Cleaning and rendering use the notebook's async methods if the "--async_io" flag
+    or "async_io" config option is set.
+    """
+    act = action_runner(book, args.async_io or bool(book.config.get("async_io")))
     if args.generate_note:
         book.make_note()
     if args.clean:
-        book.clean()
+        act("clean")
     if args.render_all:
-        book.render_full()
+        act("render_full", start=args.since, end=args.until)
+    if args.shards is not None:
+        act("render_shards", args.shards or None)
     if args.make_series is not None:
         book.make_series(args.make_series)
     if args.extract_project is not None:
-        book.render_project(project_name=args.extract_project)
+        act(
+            "render_project",
+            project_name=args.extract_project,
+            start=args.since,
+            end=args.until,
+        )
     if args.extract_all:
-        book.render_all_projects()
+        act("render_all_projects")
+    if args.query is not None:
+        print_results(book, args.query)
+    if args.links is not None:
+        print_links(book, args.links)
+    if args.watch:
+        NotebookWatcher(
+            book,
+            clean=args.clean,
+            render_full=args.render_all
+            or not (args.extract_all or args.shards is not None),
+            render_projects=args.extract_all,
+            render_shards=args.shards is not None,
+            shard_period=args.shards or None,
+        ).run()
+
+
+def action_runner(book: Notebook, async_io: bool) -> Callable[..., Any]:
+    """
+    Make a function calling a notebook method by name, or its async version.
+    """
+    if not async_io:
+        return lambda name, *args, **kwargs: getattr(book, name)(*args, **kwargs)
+
+    # Imported here as asyncio is slow to import, and only needed if it's turned on.
+    # pylint: disable-next=import-outside-toplevel
+    from . import aio
+
+    def run_async(name: str, *args: Any, **kwargs: Any) -> Any:
+        return aio.run(getattr(book, f"{name}_async")(*args, **kwargs))
+
+    return run_async
+
+
+def parse_date(text: str) -> datetime.date:
+    """
+    Parse a date given on the command-line.
+    """
+    try:
+        return datetime.datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(
+            f'"{text}" is not a date in the form YYYY-MM-DD.'
+        ) from err
+
+
+def print_results(book: Notebook, query: str) -> None:
+    """
+    Search a notebook and print out the matching sections.
+    """
+    try:
+        results = book.search(query)
+    except ValueError as err:
+        print(err)
+        return
+    if not results:
+        print("No matches found.")
+    for result in results:
+        location = []
+        for heading in [result.project, result.task, result.heading]:
+            if heading and heading not in location:
+                location.append(heading)
+        path = os.path.relpath(result.path, book.root_dir)
+        print(f"{path}: {' > '.join(location)}")
+        print(f"    {' '.join(result.snippet.split())}")
+
+
+def print_links(book: Notebook, note: str) -> None:
+    """
+    Print the links to and from a note, or the broken links in the notebook.
+    """
+    book.update_link_index()
+    if not note:
+        for source, target in book.link_index.dangling():
+            print(f"{os.path.relpath(source, book.root_dir)}: [[{target}]] not found")
+        for source, image in book.link_index.missing_images():
+            print(f"{os.path.relpath(source, book.root_dir)}: {image} not found")
+        return
+
+    path = os.path.abspath(note)
+    if path not in book.files:
+        matches = [
+            x for x, y in book.link_index.titles(book.files).items() if y == note
+        ]
+        if not matches:
+            print(f'No note found for "{note}".')
+            return
+        path = matches[0]
+    backlinks = book.link_index.backlinks([path])[path]
+    print(os.path.relpath(path, book.root_dir))
+    for heading, items in [
+        ("Links to", book.link_index.links_from(path)),
+        ("Linked from", [os.path.relpath(x, book.root_dir) for x in backlinks]),
+        ("Images", book.link_index.images(path)),
+    ]:
+        if items:
+            print(f"  {heading}:")
+            for item in items:
+                print(f"    {item}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+"""
+Overlapping file reads and writes, for notebooks on slow (e.g. network) storage.
+
+Blocking I/O is handed off to a pool of threads from an asyncio event loop, with a
+limit on how many operations are in flight at once:
+
+    async with IOPool() as pool:
+        notes = await pool.map(MarkdownPart.from_file, paths)
+
+These are only used by the notebook's `*_async` methods (e.g. `read_notes_async`),
+the synchronous methods don't touch asyncio at all. `run` runs a coroutine from
+synchronous code.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+from .hashing import HashingWriter
+from .mardown_document import remove_temp_file, replace_file, temp_path_for
+
+# Most blocking calls in flight at once, unless configured otherwise.
+DEFAULT_CONCURRENCY = 8
+
+T = TypeVar("T")
+
+
+class IOPool:
+    """
+    Runs blocking calls in a pool of threads, a limited number at a time.
+
+    Must be used as an async context manager, which shuts the threads down on exit.
+    """
+
+    # Text written to a file at a time when streaming.
+    write_size = 64 * 1024
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        self.concurrency = max(concurrency, 1)
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "IOPool":
+        # The semaphore is made here so it belongs to the running event loop.
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._executor = concurrent.futures.ThreadPoolExecutor(self.concurrency)
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._executor = None
+        self._semaphore = None
+
+    async def call(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Run a blocking function in the pool, waiting for a free slot first.
+        """
+        if self._semaphore is None or self._executor is None:
+            raise RuntimeError("The pool must be entered before it's used.")
+        async with self._semaphore:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(function, *args)
+            )
+
+    async def map(
+        self, function: Callable[..., T], *iterables: Iterable[Any]
+    ) -> List[T]:
+        """
+        Run a blocking function over each set of arguments, returning results in order.
+
+        Arguments are handed to the threads in chunks (several per thread), so that
+        the cost of handing off each call doesn't outweigh quick calls.
+        """
+        arguments = list(zip(*iterables))
+        size = max(len(arguments) // (self.concurrency * 4), 1)
+        chunks = [arguments[x : x + size] for x in range(0, len(arguments), size)]
+        results = await asyncio.gather(
+            *[self.call(_call_each, function, x) for x in chunks]
+        )
+        return [y for x in results for y in x]
+
+    async def each(
+        self, function: Callable[[Any], Awaitable[T]], items: Iterable[Any]
+    ) -> List[T]:
+        """
+        Run a coroutine for each item, at most `concurrency` at once.
+
+        Results are returned in the same order as the items.
+        """
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def limited(item: Any) -> T:
+            async with limit:
+                return await function(item)
+
+        return list(await asyncio.gather(*[limited(x) for x in items]))
+
+    async def write(self, path: str, chunks: Iterable[str]) -> Dict[str, str]:
+        """
+        Write text to a file as it's produced, returning the file's digests.
+
+        Chunks are written in batches, with the next batch being put together (e.g.
+        rendered) while the last one is written. Like `replacing_file`, the text goes to
+        a temporary file that only replaces `path` once everything has been written.
+        """
+        temp_path = temp_path_for(path)
+        try:
+            file = cast(IO[bytes], await self.call(open, temp_path, "xb"))
+            writer = HashingWriter(file)
+            pending: Optional["asyncio.Future[None]"] = None
+            try:
+                for batch in _batches(chunks, self.write_size):
+                    if pending is not None:
+                        await pending
+                    pending = asyncio.ensure_future(self.call(writer.write, batch))
+                if pending is not None:
+                    await pending
+            finally:
+                # Make sure nothing is still being written before closing the file.
+                if pending is not None and not pending.done():
+                    await asyncio.wait([pending])
+                await self.call(file.close)
+            await self.call(replace_file, temp_path, path)
+        except BaseException:
+            await self.call(remove_temp_file, temp_path)
+            raise
+        return writer.hasher.hexdigests()
+
+
+def _call_each(function: Callable[..., T], arguments: List[Tuple[Any, ...]]) -> List[T]:
+    """Call a function with each set of arguments."""
+    return [function(*x) for x in arguments]
+
+
+def _batches(chunks: Iterable[str], size: int) -> Iterator[str]:
+    """Join chunks of text into batches of at least `size` characters."""
+    batch: List[str] = []
+    length = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(batch)
+            batch = []
+            length = 0
+    if batch:
+        yield "".join(batch)
+
+
+def run(coroutine: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion in a new event loop, returning its result.
+
+    The same as `asyncio.run` (which needs Python 3.7+). Can't be used while an event
+    loop is running in the same thread, await the coroutine there instead.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
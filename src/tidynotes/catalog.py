@@ -0,0 +1,222 @@
+"""
+Catalog of the date each note is for, to find the notes for a range of dates quickly.
+"""
+
+import datetime
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Pattern
+
+from . import storage
+from .file_index import FileIndex
+from .mardown_document import MarkdownPart
+from .note_cache import FileStat
+
+# Bump this whenever the layout of the catalog or how dates are found changes.
+CATALOG_VERSION = 2
+
+# Patterns for the parts of a note file format that can be read back from a path.
+# Only the year, month and day are used, anything else just has to match (numbers
+# are zero-padded by `strftime`, so have a fixed width).
+DIRECTIVES = {
+    "Y": r"\d{4}",
+    "m": r"\d{2}",
+    "d": r"\d{2}",
+    "y": r"\d{2}",
+    "H": r"\d{2}",
+    "M": r"\d{2}",
+    "S": r"\d{2}",
+    "j": r"\d{3}",
+    "a": r"[^/]+?",
+    "A": r"[^/]+?",
+    "b": r"[^/]+?",
+    "B": r"[^/]+?",
+}
+
+
+def note_date(note: MarkdownPart) -> Optional[datetime.date]:
+    """
+    Get the date a note is for (from its "note_for" metadata), if it has one.
+    """
+    value = note.meta.get("note_for")
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        return parse_date(value[:10])
+    return None
+
+
+def parse_date(text: str) -> Optional[datetime.date]:
+    """Parse an ISO format (YYYY-MM-DD) date, if it is one."""
+    try:
+        return datetime.datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def path_pattern(file_format: str) -> Optional[Pattern[str]]:
+    """
+    Turn a note file format (for `strftime`) into a regex reading the date from paths.
+
+    Repeated parts (e.g. the year in "%Y/notes_%Y-%m-%d.md") have to match each
+    other. Returns None if the format doesn't give the full date, or has parts that
+    can't be read back.
+    """
+    pattern = []
+    seen = set()
+    for literal, directive in re.findall(r"([^%]*)(%.?|$)", file_format):
+        pattern.append(re.escape(literal))
+        name = directive[1:]
+        if directive == "%%":
+            pattern.append("%")
+        elif name in seen:
+            pattern.append(f"(?P={name})")
+        elif name in DIRECTIVES:
+            pattern.append(f"(?P<{name}>{DIRECTIVES[name]})")
+            seen.add(name)
+        elif directive:
+            return None
+    if not {"Y", "m", "d"} <= seen:
+        return None
+    return re.compile("".join(pattern) + "$")
+
+
+class NoteCatalog(FileIndex):
+    """
+    An SQLite catalog of the date each note is for.
+
+    The date is taken from the "note_for" in the note's front matter, which is all
+    that's read of each note. Notes without one are dated from their path (relative to
+    `note_dir`) if it matches the notebook's `file_format`. Notes are only read again
+    when their modification time or size changes.
+    """
+
+    description = "catalog"
+
+    def __init__(self, path: str, note_dir: str, file_format: str) -> None:
+        super().__init__(path)
+        self.note_dir = note_dir
+        self.file_format = file_format
+        self._pattern = path_pattern(file_format)
+
+    def between(
+        self,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> List[str]:
+        """
+        Get the paths of the notes for dates from `start` to `end` (both included).
+
+        Either end of the range can be left open. Notes are sorted by date, then path.
+        Notes without a date are only included if neither end of the range is given.
+        """
+        query = "SELECT path FROM files"
+        conditions = []
+        values = []
+        if start is not None:
+            conditions.append("date >= ?")
+            values.append(start.isoformat())
+        if end is not None:
+            conditions.append("date <= ?")
+            values.append(end.isoformat())
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._connect() as connection:
+            rows = connection.execute(query + " ORDER BY date, path", values)
+            return [x for x, in rows]
+
+    def dates(self) -> Dict[str, Optional[datetime.date]]:
+        """Get the date of every note in the catalog."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT path, date FROM files").fetchall()
+        return {x: None if y is None else parse_date(y) for x, y in rows}
+
+    def path_date(self, path: str) -> Optional[datetime.date]:
+        """Get the date from a note's path, if it matches the notebook's file format."""
+        if self._pattern is None:
+            return None
+        relative = os.path.relpath(path, self.note_dir).replace(os.sep, "/")
+        match = self._pattern.match(relative)
+        if match is None:
+            return None
+        try:
+            return datetime.date(*[int(match.group(x)) for x in "Ymd"])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def read_front_matter(paths: List[str]) -> List[MarkdownPart]:
+        """
+        Read just the front matter of notes, which is all that's needed for their date.
+        """
+        output = []
+        for path in paths:
+            note = MarkdownPart(_front_matter(path))
+            note.meta[".file"] = {"path": path}
+            output.append(note)
+        return output
+
+    def clear(self) -> None:
+        """
+        Remove everything from the catalog.
+        """
+        with self._connect() as connection:
+            connection.execute("DELETE FROM files")
+
+    def _remove(self, connection: sqlite3.Connection, paths: List[str]) -> None:
+        """Remove the specified notes from the catalog."""
+        for start in range(0, len(paths), 500):
+            chunk = paths[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            connection.execute(
+                f"DELETE FROM files WHERE path IN ({placeholders})", chunk
+            )
+
+    def _add(
+        self,
+        connection: sqlite3.Connection,
+        notes: Iterable[MarkdownPart],
+        stats: Dict[str, FileStat],
+    ) -> None:
+        """Add the dates of notes to the catalog, along with their stat info."""
+        rows = []
+        for note in notes:
+            path = note.meta[".file"]["path"]
+            date = note_date(note) or self.path_date(path)
+            rows.append(
+                (path, *stats[path], None if date is None else date.isoformat())
+            )
+        connection.executemany(
+            "INSERT INTO files (path, mtime, size, date) VALUES (?, ?, ?, ?)", rows
+        )
+
+    def _prepare_database(self, connection: sqlite3.Connection) -> None:
+        """
+        Create the catalog table if needed, emptying it if it's out of date.
+
+        The file format is part of the version, as it changes the dates of notes.
+        """
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS files"
+            " (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, date TEXT)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS files_date ON files (date)")
+        storage.check_version(
+            connection, f"{CATALOG_VERSION}:{self.file_format}", ["files"]
+        )
+
+
+def _front_matter(path: str) -> str:
+    """Read the YAML header at the start of a note (if it has one)."""
+    lines = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line_no, line in enumerate(file):
+            if line_no == 0 and not line.startswith("---"):
+                break
+            lines.append(line)
+            if line_no > 0 and line.startswith("---"):
+                break
+    return "".join(lines)
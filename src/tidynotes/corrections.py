@@ -0,0 +1,101 @@
+"""
+Compiled sets of text corrections, applied to a piece of text in a single pass.
+"""
+
+import re
+from typing import Callable, Dict, List, Tuple
+
+# Characters that give a pattern a meaning beyond matching itself literally.
+REGEX_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+
+def is_literal(pattern: str) -> bool:
+    """
+    Checks if a regex pattern only matches itself (has no special characters).
+    """
+    return not REGEX_CHARS.intersection(pattern)
+
+
+class CorrectionSet:  # pylint: disable=too-few-public-methods
+    """
+    An ordered set of replacements, compiled once and applied as a whole.
+
+    Applying the set gives the same result as applying each replacement in turn, as
+    `MarkdownPart.make_replacement` would. Runs of literal replacements that can't
+    interact with each other are merged into a single step - either a translation
+    table (for single characters) or one alternation of all the literals.
+
+    If `regex` is false, every pattern and replacement is treated as literal text.
+    """
+
+    def __init__(self, rules: Dict[str, str], regex: bool = True) -> None:
+        self.rules = dict(rules)
+        self.regex = regex
+        self._steps: List[Callable[[str], str]] = []
+
+        group: List[Tuple[str, str]] = []
+        for pattern, replacement in self.rules.items():
+            literal = not regex or (is_literal(pattern) and "\\" not in replacement)
+            if literal and pattern and _can_join(group, pattern):
+                group.append((pattern, replacement))
+                continue
+            self._add_literals(group)
+            if literal and pattern:
+                group = [(pattern, replacement)]
+            else:
+                group = []
+                self._add_single(pattern, replacement, literal)
+        self._add_literals(group)
+
+    def apply(self, text: str) -> str:
+        """
+        Apply all of the replacements to the text.
+        """
+        for step in self._steps:
+            text = step(text)
+        return text
+
+    def _add_single(self, pattern: str, replacement: str, literal: bool) -> None:
+        """Add a step for a replacement that can't be grouped with any others."""
+        if literal:
+            self._steps.append(lambda x: x.replace(pattern, replacement))
+        else:
+            compiled = re.compile(pattern)
+            self._steps.append(lambda x: compiled.sub(replacement, x))
+
+    def _add_literals(self, group: List[Tuple[str, str]]) -> None:
+        """Add a single step for a group of literal replacements."""
+        if not group:
+            return
+        if len(group) == 1:
+            self._add_single(*group[0], literal=True)
+            return
+
+        lookup = dict(group)
+        if all(len(x) == 1 for x in lookup):
+            table = str.maketrans(lookup)
+            self._steps.append(lambda x: x.translate(table))
+        else:
+            compiled = re.compile("|".join(re.escape(x) for x in lookup))
+            self._steps.append(
+                lambda x: compiled.sub(lambda match: lookup[match.group(0)], x)
+            )
+
+
+def _can_join(group: List[Tuple[str, str]], pattern: str) -> bool:
+    """
+    Checks if a literal pattern can be applied in the same pass as a group of others.
+
+    This is only safe if none of the earlier replacements could create or consume a
+    match for the new pattern - they must not share any characters with it, and must
+    not delete text (which could join two halves of a match together).
+    """
+    characters = set(pattern)
+    for other_pattern, other_replacement in group:
+        if not other_replacement:
+            return False
+        if characters.intersection(other_pattern):
+            return False
+        if characters.intersection(other_replacement):
+            return False
+    return True
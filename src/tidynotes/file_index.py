@@ -0,0 +1,77 @@
+"""
+Base for databases of information taken from each note, kept up to date incrementally.
+"""
+
+import abc
+import logging
+import sqlite3
+from typing import Callable, ContextManager, Dict, Iterable, List
+
+from . import storage
+from .logs import LOG_NAME
+from .mardown_document import MarkdownPart
+from .note_cache import FileStat
+
+
+class FileIndex(abc.ABC):  # pylint: disable=too-few-public-methods
+    """
+    An SQLite database of information taken from each note.
+
+    The stat info of each note is recorded in a "files" table when it's indexed, and
+    notes are only re-indexed when their modification time or size changes.
+    Sub-classes say how to add notes to and remove them from the index.
+    """
+
+    # Short description used when logging.
+    description = "index"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def update(
+        self,
+        stats: Dict[str, FileStat],
+        read: Callable[[List[str]], List[MarkdownPart]],
+    ) -> int:
+        """
+        Bring the index up to date with the notes, returning the number re-indexed.
+
+        `stats` gives the stat signature of every note, anything not in it is dropped
+        from the index. `read` is used to read any notes that need indexing.
+        """
+        logger = logging.getLogger(LOG_NAME)
+        with self._connect() as connection:
+            stale, dropped = storage.changed_files(connection, "files", stats)
+            self._remove(connection, stale + dropped)
+            for start in range(0, len(stale), 500):
+                self._add(connection, read(stale[start : start + 500]), stats)
+        logger.debug(
+            "Indexed %s notes and dropped %s from the %s.",
+            len(stale),
+            len(dropped),
+            self.description,
+        )
+        return len(stale)
+
+    @abc.abstractmethod
+    def _remove(self, connection: sqlite3.Connection, paths: List[str]) -> None:
+        """Remove the specified notes from the index."""
+
+    @abc.abstractmethod
+    def _add(
+        self,
+        connection: sqlite3.Connection,
+        notes: Iterable[MarkdownPart],
+        stats: Dict[str, FileStat],
+    ) -> None:
+        """Add freshly read notes to the index, along with their stat info."""
+
+    @abc.abstractmethod
+    def _prepare_database(self, connection: sqlite3.Connection) -> None:
+        """Create the index tables if needed and empty them if they're out of date."""
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        """
+        Open the index database, resetting it if it's unreadable or out of date.
+        """
+        return storage.connect(self.path, self._prepare_database)
@@ -0,0 +1,125 @@
+"""
+Persistent cache of markdown converted to HTML, so unchanged text isn't re-converted.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import time
+from typing import Callable, ContextManager, Dict, List, Optional
+
+from . import storage
+from .logs import LOG_NAME
+
+
+class FragmentCache:
+    """
+    A size-bounded, content-addressed cache of HTML fragments stored in SQLite.
+
+    Each fragment is keyed on a hash of the markdown it was converted from, so the
+    same text gives the same fragment whichever document it appears in. Once the
+    total size of the cached HTML goes over `max_size` (in characters) the least
+    recently used fragments are dropped.
+
+    If `path` is None nothing is cached, text is just converted.
+    The `version` should change whenever the conversion would give different output,
+    any fragments from another version are dropped.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        convert: Callable[[str], str],
+        version: str,
+        max_size: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.path = path
+        self.convert = convert
+        self.version = version
+        self.max_size = max_size
+
+    def convert_many(self, texts: List[str]) -> List[str]:
+        """
+        Convert a list of markdown texts to HTML, using cached fragments where possible.
+        """
+        if self.path is None:
+            return [self.convert(x) for x in texts]
+
+        logger = logging.getLogger(LOG_NAME)
+        keys = [hashlib.sha256(x.encode("utf-8")).hexdigest() for x in texts]
+        with self._connect() as connection:
+            found: Dict[str, str] = {}
+            unique = list(set(keys))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT key, html FROM fragments WHERE key IN ({placeholders})",
+                    chunk,
+                )
+                found.update(rows)
+
+            now = time.time()
+            new = {}
+            for key, text in zip(keys, texts):
+                if key not in found:
+                    found[key] = new[key] = self.convert(text)
+            connection.executemany(
+                "UPDATE fragments SET used = ? WHERE key = ?",
+                [(now, x) for x in set(keys) - set(new)],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO fragments (key, html, size, used)"
+                " VALUES (?, ?, ?, ?)",
+                [(x, y, len(y), now) for x, y in new.items()],
+            )
+            if new:
+                self._evict(connection)
+        logger.debug("Converted %s of %s fragments.", len(new), len(texts))
+        return [found[x] for x in keys]
+
+    def clear(self) -> None:
+        """
+        Remove all fragments from the cache.
+        """
+        if self.path is None:
+            return
+        with self._connect() as connection:
+            connection.execute("DELETE FROM fragments")
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Drop the least recently used fragments until the cache fits its size."""
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM fragments"
+        ).fetchone()[0]
+        if total <= self.max_size:
+            return
+        dropped = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM fragments ORDER BY used"
+        ).fetchall():
+            if total <= self.max_size:
+                break
+            dropped.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM fragments WHERE key = ?", dropped)
+        logger = logging.getLogger(LOG_NAME)
+        logger.debug("Dropped %s fragments from the cache.", len(dropped))
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        """
+        Open the cache database, resetting it if it's unreadable or out of date.
+        """
+        if self.path is None:
+            raise RuntimeError("Fragment cache doesn't have a path.")
+        return storage.connect(self.path, self._prepare_database)
+
+    def _prepare_database(self, connection: sqlite3.Connection) -> None:
+        """
+        Create the cache tables if needed and drop fragments from other versions.
+        """
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS fragments"
+            " (key TEXT PRIMARY KEY, html TEXT, size INTEGER, used REAL)"
+        )
+        storage.check_version(connection, self.version, ["fragments"])
@@ -0,0 +1,103 @@
+"""
+Calculating digests of files and text, several algorithms at a time.
+"""
+
+import hashlib
+import mmap
+import os
+from typing import IO, Dict, Iterable, Union
+
+from . import profiling
+
+# The digests recorded for each rendered file.
+DEFAULT_ALGORITHMS = ("sha256", "md5")
+
+
+class MultiHasher:
+    """
+    Calculates digests with several algorithms from a single pass over the data.
+    """
+
+    def __init__(self, algorithms: Iterable[str] = DEFAULT_ALGORITHMS) -> None:
+        self._hashes = {x: hashlib.new(x) for x in algorithms}
+
+    def update(self, data: Union[bytes, mmap.mmap]) -> None:
+        """Add more data to every digest."""
+        for algorithm in self._hashes.values():
+            algorithm.update(data)
+
+    def hexdigests(self) -> Dict[str, str]:
+        """Get the digest for each algorithm, as hex strings."""
+        return {x: y.hexdigest() for x, y in self._hashes.items()}
+
+
+class HashingWriter:  # pylint: disable=too-few-public-methods
+    """
+    Writes text to a binary file, hashing the bytes as they're written.
+
+    Newlines are translated and text encoded the same way as a file opened in text
+    mode, so the digests match those of the finished file.
+    """
+
+    def __init__(
+        self,
+        file: IO[bytes],
+        algorithms: Iterable[str] = DEFAULT_ALGORITHMS,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.file = file
+        self.hasher = MultiHasher(algorithms)
+        self.encoding = encoding
+
+    def write(self, text: str) -> None:
+        """Write a chunk of text to the file."""
+        if os.linesep != "\n":
+            text = text.replace("\n", os.linesep)
+        data = text.encode(self.encoding)
+        with profiling.phase("hash"):
+            self.hasher.update(data)
+        with profiling.phase("write", bytes_written=len(data)):
+            self.file.write(data)
+
+
+def calc_digests(
+    path: str,
+    algorithms: Iterable[str] = DEFAULT_ALGORITHMS,
+    buffer_size: int = 65536,
+    use_mmap: bool = False,
+) -> Dict[str, str]:
+    """
+    Calculate several digests of a file, only reading it once.
+
+    With `use_mmap` the file is memory-mapped rather than read into a buffer, which
+    avoids copying for large files.
+    """
+    hasher = MultiHasher(algorithms)
+    with open(path, "rb") as file_in, profiling.phase("hash") as timer:
+        size = os.fstat(file_in.fileno()).st_size
+        timer.add(bytes_read=size)
+        if use_mmap and size > 0:
+            with mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hasher.update(mapped)
+        else:
+            while True:
+                data = file_in.read(buffer_size)
+                if not data:
+                    break
+                hasher.update(data)
+    return hasher.hexdigests()
+
+
+def calc_sha256(path: str, buffer_size: int = 65536) -> str:
+    "Calculates the SHA256 of a file."
+    return calc_digests(path, ["sha256"], buffer_size)["sha256"]
+
+
+def calc_text_sha256(text: str, encoding: str = "utf-8") -> str:
+    "Calculates the SHA256 of a string."
+    return hashlib.sha256(text.encode(encoding)).hexdigest()
+
+
+def calc_md5(path: str, buffer_size: int = 65536) -> str:
+    "Calculates the MD5 of a file."
+    return calc_digests(path, ["md5"], buffer_size)["md5"]
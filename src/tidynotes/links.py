@@ -0,0 +1,230 @@
+"""
+Index of the wikilinks and images in a notebook, so backlinks can be looked up.
+"""
+
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+from . import storage
+from .file_index import FileIndex
+from .mardown_document import IMAGE_PATTERN, LINK_PATTERN, MarkdownPart
+from .note_cache import FileStat
+
+# Bump this whenever the layout of the index or how links are resolved changes.
+LINK_INDEX_VERSION = 1
+
+# Tables in the index database.
+TABLES = ["files", "keys", "links", "images"]
+
+
+class LinkIndex(FileIndex):
+    """
+    A persistent graph of the wikilinks between notes and the images they use.
+
+    Links are matched to notes by their title or file name (ignoring case, along with
+    any "|alias" or "#heading" in the link). Each note's links are only re-read when
+    the note changes, and the links pointing at a note are looked up directly rather
+    than by scanning every note.
+    """
+
+    description = "link index"
+
+    def links_from(self, path: str) -> List[str]:
+        """
+        Get the targets of the links in a note, in the order they appear.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT target FROM links WHERE source = ? ORDER BY position", (path,)
+            )
+            return [x for x, in rows]
+
+    def backlinks(self, paths: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Find the notes linking to each of the specified notes.
+
+        Returns the paths of the linking notes (sorted) for each path.
+        """
+        paths = list(paths)
+        output: Dict[str, List[str]] = {x: [] for x in paths}
+        with self._connect() as connection:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    "SELECT DISTINCT keys.path, links.source FROM keys"
+                    " JOIN links ON links.key = keys.key"
+                    f" WHERE keys.path IN ({placeholders}) AND links.source != keys.path"
+                    " ORDER BY links.source",
+                    chunk,
+                )
+                for path, source in rows:
+                    output[path].append(source)
+        return output
+
+    def titles(self, paths: Iterable[str]) -> Dict[str, str]:
+        """
+        Get the titles of indexed notes.
+        """
+        paths = list(paths)
+        output: Dict[str, str] = {}
+        with self._connect() as connection:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                output.update(
+                    connection.execute(
+                        f"SELECT path, title FROM files WHERE path IN ({placeholders})",
+                        chunk,
+                    )
+                )
+        return output
+
+    def dangling(self) -> List[Tuple[str, str]]:
+        """
+        Find links that don't match any note, as (source path, target) pairs.
+        """
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT source, target FROM links"
+                " WHERE key NOT IN (SELECT key FROM keys)"
+                " ORDER BY source, position"
+            ).fetchall()
+
+    def images(self, path: str) -> List[str]:
+        """
+        Get the sources of the images in a note, in the order they appear.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT src FROM images WHERE source = ? ORDER BY position", (path,)
+            )
+            return [x for x, in rows]
+
+    def missing_images(self) -> List[Tuple[str, str]]:
+        """
+        Find images with local paths that don't exist, as (source path, image) pairs.
+
+        Image paths are relative to the note they're in.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT source, src FROM images ORDER BY source, position"
+            ).fetchall()
+        output = []
+        for source, src in rows:
+            if "://" in src or src.startswith("data:"):
+                continue
+            image_path = os.path.join(os.path.dirname(source), src.split(" ")[0])
+            if not os.path.exists(image_path):
+                output.append((source, src))
+        return output
+
+    def clear(self) -> None:
+        """
+        Remove everything from the index.
+        """
+        with self._connect() as connection:
+            for table in TABLES:
+                connection.execute(f"DELETE FROM {table}")
+
+    def _remove(self, connection: sqlite3.Connection, paths: List[str]) -> None:
+        """Remove the specified notes from the index."""
+        for start in range(0, len(paths), 500):
+            chunk = paths[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for table, column in [
+                ("files", "path"),
+                ("keys", "path"),
+                ("links", "source"),
+                ("images", "source"),
+            ]:
+                connection.execute(
+                    f"DELETE FROM {table} WHERE {column} IN ({placeholders})", chunk
+                )
+
+    def _add(
+        self,
+        connection: sqlite3.Connection,
+        notes: Iterable[MarkdownPart],
+        stats: Dict[str, FileStat],
+    ) -> None:
+        """Add the links and images of freshly read notes to the index."""
+        for note in notes:
+            path = note.meta[".file"]["path"]
+            links, images = _find_references(note)
+            keys = {link_key(os.path.splitext(os.path.basename(path))[0])}
+            if note.title is not None:
+                keys.add(link_key(note.title))
+            connection.execute(
+                "INSERT INTO files (path, mtime, size, title) VALUES (?, ?, ?, ?)",
+                (path, *stats[path], note.title or ""),
+            )
+            connection.executemany(
+                "INSERT INTO keys (key, path) VALUES (?, ?)",
+                [(x, path) for x in keys if x],
+            )
+            connection.executemany(
+                "INSERT INTO links (source, position, target, key) VALUES (?, ?, ?, ?)",
+                [(path, x, y, link_key(y)) for x, y in enumerate(links) if link_key(y)],
+            )
+            connection.executemany(
+                "INSERT INTO images (source, position, src) VALUES (?, ?, ?)",
+                [(path, x, y) for x, y in enumerate(images)],
+            )
+
+    def _prepare_database(self, connection: sqlite3.Connection) -> None:
+        """
+        Create the index tables if needed, emptying them if they're out of date.
+        """
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS files"
+            " (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, title TEXT)"
+        )
+        connection.execute("CREATE TABLE IF NOT EXISTS keys (key TEXT, path TEXT)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS links"
+            " (source TEXT, position INTEGER, target TEXT, key TEXT)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS images (source TEXT, position INTEGER, src TEXT)"
+        )
+        for table, column in [
+            ("keys", "key"),
+            ("keys", "path"),
+            ("links", "key"),
+            ("links", "source"),
+            ("images", "source"),
+        ]:
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})"
+            )
+        storage.check_version(connection, str(LINK_INDEX_VERSION), TABLES)
+
+
+def link_key(target: str) -> str:
+    """
+    Normalise the target of a link, so it can be matched against notes.
+
+    Any alias ("[[target|alias]]") or heading ("[[target#heading]]") is dropped.
+    """
+    return target.split("|")[0].split("#")[0].strip().casefold()
+
+
+def _find_references(note: MarkdownPart) -> Tuple[List[str], List[str]]:
+    """
+    Find the links and images in a note and all of its sub-sections in one pass.
+    """
+    links: List[str] = []
+    images: List[str] = []
+    stack = [note]
+    while stack:
+        part = stack.pop()
+        body = part.body
+        if "[[" in body:
+            links.extend(LINK_PATTERN.findall(body))
+        if "![" in body:
+            images.extend(x[1] for x in IMAGE_PATTERN.findall(body))
+        stack.extend(reversed(part.parts))
+    return links, images
@@ -1,6 +1,7 @@
 """
 Defines logging setup.
 """
+
 import logging
 import logging.config
 from typing import Any, Dict, Optional
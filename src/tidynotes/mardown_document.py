@@ -2,17 +2,177 @@
 General markdown document control.
 """
 
+import contextlib
 import copy
+import itertools
 import os
 import re
-from typing import Any, Dict, List, Optional
+import shutil
+import uuid
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from . import profiling
+from .corrections import CorrectionSet
+from .fragment_cache import FragmentCache
+from .hashing import calc_text_sha256
+
+# Wikilink-style links (e.g. [[Some note]]) and markdown images.
+LINK_PATTERN = re.compile(r"\[\[([^\]]*)\]\]")
+IMAGE_PATTERN = re.compile(r"\!\[([^\]]*)\]\(([^\)]*)\)")
+
+# Reference-style link definitions (e.g. "[ref]: http://..."), and anything in square
+# brackets that might use one.
+REFERENCE_PATTERN = re.compile(r"^ {0,3}\[([^\]]+)\]:[ \t]*\S.*$", re.MULTILINE)
+LABEL_PATTERN = re.compile(r"\[([^\[\]]+)\]")
+
+# Extensions used when converting markdown to HTML.
+RENDERER_EXTENSIONS = ["fenced_code", "tables", "sane_lists", "admonition"]
+
+
+class _Deferred:  # pylint: disable=too-few-public-methods
+    """
+    A class attribute that's only created when it's first used.
+
+    Once created the value replaces the attribute on the class it was defined on.
+    """
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self.factory = factory
+        self.owner: Optional[type] = None
+        self.name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        value = self.factory()
+        setattr(self.owner or owner, self.name, value)
+        return value
+
+
+def _make_renderer() -> Any:
+    """Create the markdown renderer used to convert documents to HTML."""
+    import markdown  # pylint: disable=import-outside-toplevel
+
+    return markdown.Markdown(extensions=RENDERER_EXTENSIONS)
+
+
+def _make_env() -> Any:
+    """Create the template environment for the templates in the package."""
+    import jinja2  # pylint: disable=import-outside-toplevel
+
+    return jinja2.Environment(loader=jinja2.PackageLoader("tidynotes"))
+
+
+def _load_yaml(text: str) -> Any:
+    """Parse YAML safely, using the libyaml parser if it's available."""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def _dump_yaml(data: Any) -> str:
+    """Write data as YAML (as `yaml.dump`), using libyaml if it's available."""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    return yaml.dump(data, Dumper=getattr(yaml, "CDumper", yaml.Dumper))
+
 
-import jinja2
-import markdown
-import yaml
+def _snapshot(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy metadata, only copying deeply if it has values that can be changed."""
+    if any(isinstance(x, (list, dict, set)) for x in meta.values()):
+        return copy.deepcopy(meta)
+    return dict(meta)
 
 
-class MarkdownPart:
+def read_text(path: str, encoding: str = "utf-8") -> Tuple[str, os.stat_result]:
+    """
+    Read a text file, returning the text along with the file's stat info.
+    """
+    with open(path, encoding=encoding) as file:
+        text = file.read()
+    return text, os.stat(path)
+
+
+def write_text(
+    path: str, text: str, encoding: str = "utf-8", compare: bool = True
+) -> bool:
+    """
+    Write text to a file, returning whether it was written.
+
+    Nothing is written if the text is empty, or if `compare` is true and the file
+    already holds the same text. The text is written to a temporary file that then
+    replaces the original, so an interrupted write can't leave a truncated file.
+    """
+    if not text:
+        return False
+
+    exists = os.path.exists(path)
+    if compare and exists:
+        with open(path, "r", encoding=encoding) as file:
+            existing = file.read()
+        if existing == text:
+            return False
+
+    # Encoded here (as text mode would) so the bytes written can be counted.
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    data = text.encode(encoding)
+    with profiling.phase("write", bytes_written=len(data), notes=1):
+        with replacing_file(path) as file:
+            file.write(data)
+    return True
+
+
+@contextlib.contextmanager
+def replacing_file(path: str) -> Iterator[IO[bytes]]:
+    """
+    Open a temporary file (for writing bytes) that replaces `path` once it's closed.
+
+    If anything goes wrong before then the temporary file is removed, leaving any
+    existing file untouched.
+    """
+    temp_path = temp_path_for(path)
+    try:
+        with open(temp_path, "xb") as file:
+            yield file
+        replace_file(temp_path, path)
+    except BaseException:
+        remove_temp_file(temp_path)
+        raise
+
+
+def temp_path_for(path: str) -> str:
+    """Get a unique path for a temporary file to write before replacing `path`."""
+    directory, file_name = os.path.split(path)
+    return os.path.join(directory, f".{file_name}.{uuid.uuid4().hex}.tmp")
+
+
+def replace_file(temp_path: str, path: str) -> None:
+    """Replace a file with a finished temporary file, keeping its permissions."""
+    if os.path.exists(path):
+        shutil.copymode(path, temp_path)
+    os.replace(temp_path, path)
+
+
+def remove_temp_file(temp_path: str) -> None:
+    """Remove a temporary file left by a failed write, if it was created."""
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+class MarkdownPart:  # pylint: disable=too-many-instance-attributes
     """
     A part of a markdown document.
 
@@ -27,41 +187,90 @@ class MarkdownPart:
     And one optional attribute:
 
     * file - The path that the document came from (if applicable).
+
+    Parts parsed from the same text share that text, with each body stored as an
+    offset into it until the body is changed. The text of any YAML header is kept too,
+    and is written back out as-is if the metadata hasn't been changed.
     """
 
-    renderer = markdown.Markdown(
-        extensions=["fenced_code", "tables", "sane_lists", "admonition"]
+    __slots__ = (
+        "level",
+        "file",
+        "title",
+        "parts",
+        "meta",
+        "_source",
+        "_span",
+        "_body",
+        "_meta_text",
+        "_meta_loaded",
     )
-    env = jinja2.Environment(loader=jinja2.PackageLoader("tidynotes"))
+
+    # Created when first used, as importing markdown & jinja2 is slow.
+    renderer = _Deferred(_make_renderer)
+    env = _Deferred(_make_env)
 
     def __init__(self, text: str) -> None:
-        self.raw = text
         self.level = 0
         self.file: Optional[str] = None
 
         self.title: Optional[str] = None
-        self.body: str = ""
         self.parts: List[MarkdownPart] = []
         self.meta: Dict[str, Any] = {}
 
+        self._source = ""
+        self._span = (0, 0)
+        self._body: Optional[str] = None
+        self._meta_text: Optional[str] = None
+        self._meta_loaded: Optional[Dict[str, Any]] = None
+
         self._parse_raw(text)
 
+    @property
+    def body(self) -> str:
+        """
+        The text of the section, not including its title or any sub-sections.
+        """
+        if self._body is None:
+            start, end = self._span
+            return self._source[start:end] + "\n"
+        return self._body
+
+    @body.setter
+    def body(self, value: str) -> None:
+        self._body = value
+
     @classmethod
-    def from_file(cls, path: str, encoding: str = "utf-8") -> "MarkdownPart":
+    def from_file(
+        cls,
+        path: str,
+        encoding: str = "utf-8",
+        text: Optional[str] = None,
+        file_info: Optional[os.stat_result] = None,
+    ) -> "MarkdownPart":
         """
         Load a markdown document from a text file at the specified path.
+
+        If the text of the file is already known (e.g. it's just been written, or was
+        read with `read_text`) it can be given to save reading the file again, along
+        with its stat info if that's known too.
         """
-        with open(path, encoding=encoding) as file:
-            text = file.read()
-        doc = cls(text)
+        if text is None:
+            text, file_info = read_text(path, encoding)
+        if file_info is None:
+            file_info = os.stat(path)
+        with profiling.phase("parse", bytes_read=file_info.st_size, notes=1):
+            doc = cls(text)
 
         file_name = os.path.split(path)[1]
         file_name = os.path.splitext(file_name)[0]
         doc.file = file_name
         doc.meta[".file"] = {
             "path": path,
-            "mtime": os.stat(path).st_mtime,
+            "mtime": file_info.st_mtime,
+            "size": file_info.st_size,
             "name": file_name,
+            "sha256": calc_text_sha256(text),
         }
 
         return doc
@@ -69,32 +278,61 @@ class MarkdownPart:
     def to_file(self, path: str, encoding: str = "utf-8") -> None:
         """
         Writes the document to a text file at the specified path.
-        """
 
-        output = self.combine()
+        If the document was loaded from the same file and the file hasn't changed
+        since (going by its stat info), the digest taken when it was loaded is used to
+        tell whether anything needs writing, rather than reading the file again.
+        """
 
+        with profiling.phase("combine", notes=1):
+            output = self.combine()
         if not output:
             return
 
-        if os.path.exists(path):
-            with open(path, "r", encoding=encoding) as file:
-                existing = file.read()
-            if existing == output:
-                return
-
-        with open(path, "w", encoding=encoding) as file:
-            file.write(output)
-
-    def combine(self, metadata: bool = True) -> str:
+        digest = calc_text_sha256(output)
+        loaded = self._loaded_digest(path)
+        if loaded == digest:
+            return
+        write_text(path, output, encoding, compare=loaded is None)
+        if self.meta.get(".file", {}).get("path") == path:
+            file_info = os.stat(path)
+            self.meta[".file"].update(
+                mtime=file_info.st_mtime, size=file_info.st_size, sha256=digest
+            )
+
+    def _loaded_digest(self, path: str) -> Optional[str]:
+        """
+        Get the digest of the file the document was loaded from, if it's unchanged.
+        """
+        file_info = self.meta.get(".file", {})
+        if file_info.get("path") != path or "sha256" not in file_info:
+            return None
+        try:
+            current = os.stat(path)
+        except OSError:
+            return None
+        if (current.st_mtime, current.st_size) != (
+            file_info["mtime"],
+            file_info["size"],
+        ):
+            return None
+        return str(file_info["sha256"])
+
+    def combine(self, metadata: bool = True, parts: bool = True) -> str:
         """
         Recombine the document and its parts into a markdown string.
+
+        If `parts` is false, sub-sections are left out.
         """
-        parts = []
+        output = []
         if metadata and self.meta:
             useable_meta = {x: y for x, y in self.meta.items() if x not in [".file"]}
             useable_meta["title"] = self.title
-            meta_block = "\n".join(["---", yaml.dump(useable_meta).strip(), "---", ""])
-            parts.append(meta_block)
+            if self._meta_text is not None and useable_meta == self._meta_loaded:
+                output.append(self._meta_text)
+            else:
+                meta_text = _dump_yaml(useable_meta).strip()
+                output.append("\n".join(["---", meta_text, "---", ""]))
         if self.level > 0 and self.title is not None:
             title = "#" * self.level + " " + self.title + "\n"
         else:
@@ -104,13 +342,13 @@ class MarkdownPart:
             body = "\n" * 2 + body
         elif self.level == 3:
             body = "\n" + body
-        parts.append(body)
-        if self.parts:
-            parts.append("\n".join([x.combine(metadata=False) for x in self.parts]))
+        output.append(body)
+        if parts and self.parts:
+            output.append("\n".join([x.combine(metadata=False) for x in self.parts]))
             if not self.body.strip():
-                parts[-1] = parts[-1].lstrip("\n")
+                output[-1] = output[-1].lstrip("\n")
 
-        return "\n".join(parts)
+        return "\n".join(output)
 
     def drop_parts(self, pattern: str) -> None:
         """
@@ -134,12 +372,13 @@ class MarkdownPart:
         """
         Extract any parts of the document that have a title matching the provided regex.
 
-        Parts without a title can't be extracted this way.
+        Parts without a title can't be extracted this way. Each extracted part is a
+        view, so changing it doesn't affect the document.
         """
-        output = []
+        output: List[MarkdownPart] = []
         for part in self.parts:
             if part.title is not None and re.match(pattern, part.title):
-                output.append(part.copy())
+                output.append(PartView(part))
             output.extend(part.extract_parts(pattern))
         return output
 
@@ -156,13 +395,29 @@ class MarkdownPart:
         Replace any text in the body patching `pattern` with `replacement`.
         If `regex` is true then re.sub is used.
         """
+        body = self.body
         if regex:
-            self.body = re.sub(pattern, replacement, self.body)
+            new_body = re.sub(pattern, replacement, body)
         else:
-            self.body = self.body.replace(pattern, replacement)
+            new_body = body.replace(pattern, replacement)
+        if new_body != body:
+            self.body = new_body
         for part in self.parts:
             part.make_replacement(pattern, replacement, regex=regex)
 
+    def apply_corrections(self, corrections: CorrectionSet) -> None:
+        """
+        Apply a compiled set of corrections to the body of the document and its children.
+
+        Each part is only visited once, however many corrections are in the set.
+        """
+        body = self.body
+        new_body = corrections.apply(body)
+        if new_body != body:
+            self.body = new_body
+        for part in self.parts:
+            part.apply_corrections(corrections)
+
     def replace_title(
         self, replacements: Dict[str, str], level: Optional[int] = None
     ) -> None:
@@ -183,7 +438,7 @@ class MarkdownPart:
         """
         Get any wikilink-style links from the document or its children.
         """
-        links = re.findall(r"\[\[([^\]]*)\]\]", self.body)
+        links = LINK_PATTERN.findall(self.body)
         for part in self.parts:
             links.extend(part.get_links())
         return links
@@ -192,80 +447,137 @@ class MarkdownPart:
         """
         Get any wikilink-style links from the document or its children.
         """
-        images = re.findall(r"\!\[([^\]]*)\]\(([^\)]*)\)", self.body)
-        images = [x[1] for x in images]
+        images = [x[1] for x in IMAGE_PATTERN.findall(self.body)]
         for part in self.parts:
             images.extend(part.get_images())
         return images
 
     def add_part(self, new_part: "MarkdownPart") -> None:
         """
-        Add a copy of the provided part as a sub-heading.
+        Add a view of the provided part as a sub-heading.
+
+        Changes to the new sub-heading don't affect the original part.
         """
-        new_part = new_part.copy()
-        new_part.set_level(self.level + 1)
-        self.parts.append(new_part)
+        self.parts.append(PartView(new_part, level=self.level + 1))
 
     def html(self) -> str:
         """
         Render this document as a a chunk of HTML.
         """
-        return self.env.get_template("document.html").render(document=self)
+        return "".join(self.html_chunks())
+
+    def html_chunks(self) -> Iterator[str]:
+        """
+        Render this document as HTML, generating the output a piece at a time.
+        """
+        return self.env.get_template("document.html").generate(document=self)
+
+    def html_fragments(self) -> Iterator[str]:
+        """
+        Convert the markdown of this document to HTML, in one or more fragments.
+        """
+        yield self._body_html()
 
     def _body_html(self) -> str:
-        return self.renderer.convert(self.combine(metadata=False))
+        return self.markdown_to_html(self.combine(metadata=False))
+
+    @classmethod
+    def markdown_to_html(cls, text: str) -> str:
+        """
+        Convert markdown to HTML, resetting the renderer so no state carries over.
+        """
+        with profiling.phase("convert", bytes_read=len(text)):
+            try:
+                return cls.renderer.convert(text)
+            finally:
+                cls.renderer.reset()
+
+    @classmethod
+    def renderer_version(cls) -> str:
+        """
+        Identifies the renderer setup, which changes if its output might change.
+        """
+        import markdown  # pylint: disable=import-outside-toplevel
+
+        return f"{markdown.__version__}:{','.join(RENDERER_EXTENSIONS)}"
 
     def _parse_raw(self, text: str) -> None:
         """
         Parse raw markdown into its component parts.
+
+        The document is scanned once, tracking the chain of open sections on a stack.
+        A heading only starts a new section if it's at most one level below the
+        current section and deeper than the document itself - any other heading is
+        treated as body text of the current section.
         """
         lines = text.split("\n")
-        line_no = -1
 
         lines = self._parse_metadata(lines)
         lines = self._parse_title(lines)
 
-        child_pattern = re.compile(f"^({'#' * (self.level + 1)}) (.*)$")
-        # Parse main text
-        body: List[str] = []
-        for line_no, line in enumerate(lines):
-            if re.match(child_pattern, line):
-                break
-            body.append(line)
-        lines = lines[line_no:]
+        # Character offset of the start of the current line.
+        position = len(text) + 1 - sum(len(x) + 1 for x in lines)
+        stack = [_OpenSection(self, body_start=position)]
+        for line in lines:
+            level = _heading_level(line) if line.startswith("#") else 0
+            if self.level < level <= stack[-1].section.level + 1:
+                while stack[-1].section.level >= level:
+                    stack.pop().close(text, end=position - 1)
+
+                parent = stack[-1]
+                if parent.body_end is None:
+                    parent.body_end = position - 1
+                child = MarkdownPart._empty(title=line[level + 1 :], level=level)
+                parent.section.parts.append(child)
+                stack.append(_OpenSection(child, body_start=position + len(line) + 1))
+            position += len(line) + 1
+
+        while stack:
+            stack.pop().close(text, end=len(text))
 
-        # Parse children
-        current_child: List[str] = []
-        children: List[MarkdownPart] = []
-        for line_no, line in enumerate(lines):
-            if not re.match(child_pattern, line):
-                current_child.append(line)
-            else:
-                temp = "\n".join(current_child)
-                if temp.strip():
-                    children.append(MarkdownPart(temp))
-                current_child = [line]
-        if current_child and re.match(child_pattern, current_child[0]):
-            temp = "\n".join(current_child)
-            if temp.strip():
-                children.append(MarkdownPart(temp))
-
-        self.body = "\n".join(body).strip("\n") + "\n"
-        self.parts = children
-        self.set_level(self.level)
+    @classmethod
+    def _empty(cls, title: Optional[str], level: int) -> "MarkdownPart":
+        """
+        Create a section without parsing any text.
+        """
+        output = cls.__new__(cls)
+        output.level = level
+        output.file = None
+        output.title = title
+        output.parts = []
+        output.meta = {}
+        output._source = ""
+        output._span = (0, 0)
+        output._body = None
+        output._meta_text = None
+        output._meta_loaded = None
+        return output
 
     def _parse_metadata(self, lines: List[str]) -> List[str]:
-        """Parse any metadata from the file."""
+        """
+        Parse any metadata from the file.
+
+        The text of the header is kept (along with what was loaded from it) so it can
+        be written back out unchanged.
+        """
         line_no = -1
         if lines[0].startswith("---"):
             meta_block = []
+            closed = False
             for line_no, line in enumerate(lines):
                 if line.startswith("---"):
                     if line_no > 0:
+                        closed = True
                         break
                 else:
                     meta_block.append(line)
-            self.meta = {**self.meta, **yaml.safe_load("\n".join(meta_block))}
+
+            with profiling.phase("yaml"):
+                loaded = _load_yaml("\n".join(meta_block))
+                self.meta = {**self.meta, **loaded}
+            if closed:
+                self._meta_text = "\n".join(lines[: line_no + 1] + [""])
+                self._meta_loaded = _snapshot(loaded)
             if "title" in self.meta:
                 self.title = self.meta["title"]
                 self.level = 0
@@ -305,3 +617,276 @@ class MarkdownPart:
         return f"<MarkdownPart, title = {self.title}, level = {self.level}>"
 
     __str__ = __repr__
+
+
+class HtmlDocument(MarkdownPart):
+    """
+    A document assembled for rendering, converted to HTML one section at a time.
+
+    The document's own title and body, then each of its sub-sections, are converted
+    separately and joined together. If a fragment cache is provided, sections that
+    have been converted before are taken from the cache.
+
+    As sections are converted separately, reference-style links (`[text][ref]`) only
+    work across sections because the definitions are shared: any definitions a
+    section uses from earlier sections, or others in the same batch, are added to
+    it before it's converted. Definitions in later batches aren't seen.
+
+    Sub-sections can also be streamed into the document with `stream_parts`, in which
+    case each one is only held in memory while it is converted. Any `corrections`
+    are applied to the document's own body and each streamed section.
+    """
+
+    __slots__ = ("fragments", "corrections", "_stream", "_references")
+
+    # Number of streamed sections converted at once.
+    batch_size = 64
+
+    def __init__(
+        self,
+        text: str,
+        fragments: Optional[FragmentCache] = None,
+        corrections: Optional[CorrectionSet] = None,
+    ) -> None:
+        super().__init__(text)
+        self.fragments = fragments
+        self.corrections = corrections
+        self._stream: Iterator[MarkdownPart] = iter(())
+        self._references: Dict[str, str] = {}
+        if corrections is not None:
+            with profiling.phase("corrections", notes=1):
+                self.apply_corrections(corrections)
+
+    def stream_parts(self, parts: Iterable[MarkdownPart]) -> None:
+        """
+        Provide sub-sections to be added to the document as it's converted to HTML.
+
+        The sections are only consumed once, so the document can only be converted
+        once after calling this.
+        """
+        self._stream = iter(parts)
+
+    def html_fragments(self) -> Iterator[str]:
+        texts = [self.combine(metadata=False, parts=False)]
+        texts.extend(x.combine(metadata=False) for x in self.parts)
+        first = True
+        while texts:
+            for fragment in self._convert(texts):
+                if fragment:
+                    yield fragment if first else "\n" + fragment
+                    first = False
+            texts = []
+            with profiling.phase("combine") as timer:
+                for part in itertools.islice(self._stream, self.batch_size):
+                    view = PartView(part, level=self.level + 1)
+                    if self.corrections is not None:
+                        with profiling.phase("corrections", notes=1):
+                            view.apply_corrections(self.corrections)
+                    texts.append(view.combine(metadata=False))
+                timer.add(notes=len(texts))
+
+    def _convert(self, texts: List[str]) -> List[str]:
+        """Convert markdown to HTML, using the fragment cache if there is one."""
+        texts = self._with_references(texts)
+        if self.fragments is None:
+            return [self.markdown_to_html(x) for x in texts]
+        return self.fragments.convert_many(texts)
+
+    def _with_references(self, texts: List[str]) -> List[str]:
+        """
+        Add the link reference definitions each text uses but doesn't define itself.
+
+        Definitions are remembered from every text the document has seen so far.
+        """
+        defined = []
+        for text in texts:
+            found = {
+                _reference_label(x.group(1)): x.group(0)
+                for x in REFERENCE_PATTERN.finditer(text)
+            }
+            self._references.update(found)
+            defined.append(found)
+
+        output = []
+        for text, own in zip(texts, defined):
+            missing = {
+                self._references[x]
+                for x in map(_reference_label, LABEL_PATTERN.findall(text))
+                if x in self._references and x not in own
+            }
+            if missing:
+                text = text.rstrip("\n") + "\n\n" + "\n".join(sorted(missing)) + "\n"
+            output.append(text)
+        return output
+
+
+class PartView(MarkdownPart):  # pylint: disable=too-many-instance-attributes
+    """
+    A lightweight view of another part, which can be re-titled and re-levelled.
+
+    Nothing is copied up front - the view starts out sharing the text of the part it
+    is based on, and views of its sub-sections are only made once they're used.
+    Changing the view (e.g. with `make_replacement`) only replaces the text of the
+    affected sections in the view, the original part is never modified.
+    """
+
+    __slots__ = ("base", "_view_parts")
+
+    def __init__(  # pylint: disable=super-init-not-called
+        self, base: MarkdownPart, level: Optional[int] = None
+    ) -> None:
+        self.base = base
+        self.level = base.level if level is None else level
+        self.file = base.file
+        self.title = base.title
+        self.meta = dict(base.meta)
+        if ".file" in base.meta:
+            self.meta[".file"] = dict(base.meta[".file"])
+        # pylint: disable=protected-access
+        self._source = base._source
+        self._span = base._span
+        self._body = base._body
+        self._meta_text = base._meta_text
+        self._meta_loaded = base._meta_loaded
+        self._view_parts: Optional[List[MarkdownPart]] = None
+
+    @property
+    def parts(self) -> List[MarkdownPart]:
+        """
+        Views of the sub-sections of the original part, made when first needed.
+        """
+        if self._view_parts is None:
+            self._view_parts = [
+                PartView(x, level=self.level + 1) for x in self.base.parts
+            ]
+        return self._view_parts
+
+    @parts.setter
+    def parts(self, value: List[MarkdownPart]) -> None:
+        self._view_parts = value
+
+    def set_level(self, level: int) -> None:
+        """
+        Set the level of the view, along with any of its sub-sections.
+        """
+        self.level = level
+        if self._view_parts is not None:
+            for part in self._view_parts:
+                part.set_level(level + 1)
+
+    def __repr__(self) -> str:
+        return f"<PartView, title = {self.title}, level = {self.level}>"
+
+    __str__ = __repr__
+
+
+def _reference_label(label: str) -> str:
+    """Normalise the label of a link reference, as the markdown renderer does."""
+    return " ".join(label.split()).lower()
+
+
+def _heading_level(line: str) -> int:
+    """
+    Get the level of a markdown heading, or 0 if the line isn't a heading.
+    """
+    level = len(line) - len(line.lstrip("#"))
+    if level and line[level : level + 1] == " ":
+        return level
+    return 0
+
+
+def part_to_data(part: MarkdownPart) -> Dict[str, Any]:
+    """
+    Get a document as plain data (lists, dicts, strings and numbers), e.g. to store it
+    as JSON. `part_from_data` turns it back into a document.
+
+    Metadata (other than the file info) is stored as YAML, as it can hold dates.
+    Bodies that are still offsets into the parsed text are stored as offsets.
+    """
+    # pylint: disable=protected-access
+    meta = {x: y for x, y in part.meta.items() if x != ".file"}
+    if part._meta_loaded is None or part._meta_loaded == meta:
+        meta_loaded: Any = part._meta_loaded is not None
+    else:
+        meta_loaded = _dump_yaml(part._meta_loaded)
+    return {
+        "source": part._source,
+        "file": part.file,
+        "file_info": part.meta.get(".file"),
+        "meta": _dump_yaml(meta) if meta else None,
+        "meta_text": part._meta_text,
+        "meta_loaded": meta_loaded,
+        "tree": _tree_data(part, part._source),
+    }
+
+
+def part_from_data(data: Dict[str, Any]) -> MarkdownPart:
+    """
+    Make a document from plain data given by `part_to_data`.
+
+    Only YAML that `yaml.safe_load` accepts is read, so no code is run.
+    """
+    # pylint: disable=protected-access
+    output = _from_tree_data(data["tree"], data["source"])
+    output.file = data["file"]
+    if data["meta"] is not None:
+        output.meta = _load_yaml(data["meta"])
+    if data["meta_loaded"] is True:
+        output._meta_loaded = _snapshot(output.meta)
+    elif data["meta_loaded"]:
+        output._meta_loaded = _load_yaml(data["meta_loaded"])
+    output._meta_text = data["meta_text"]
+    if data["file_info"] is not None:
+        output.meta[".file"] = data["file_info"]
+    return output
+
+
+def _tree_data(part: MarkdownPart, source: str) -> List[Any]:
+    """Get the title, level, body and sub-sections of a part as plain data."""
+    body: Any = part.body
+    # pylint: disable=protected-access
+    if part._body is None and part._source is source:
+        body = list(part._span)
+    return [part.title, part.level, body, [_tree_data(x, source) for x in part.parts]]
+
+
+def _from_tree_data(tree: List[Any], source: str) -> MarkdownPart:
+    """Make a part and its sub-sections from `_tree_data`."""
+    title, level, body, parts = tree
+    # pylint: disable=protected-access
+    output = MarkdownPart._empty(title=title, level=level)
+    if isinstance(body, list):
+        output._source = source
+        output._span = (body[0], body[1])
+    else:
+        output._body = body
+    output.parts = [_from_tree_data(x, source) for x in parts]
+    return output
+
+
+class _OpenSection:  # pylint: disable=too-few-public-methods
+    """
+    A section that's still being parsed, with the character offsets of its body.
+    """
+
+    def __init__(self, section: MarkdownPart, body_start: int) -> None:
+        self.section = section
+        self.body_start = body_start
+        self.body_end: Optional[int] = None
+
+    def close(self, text: str, end: int) -> None:
+        """
+        Point the section at its body text once the offset it ends on is known.
+
+        Leading and trailing newlines are excluded from the body.
+        """
+        start = min(self.body_start, len(text))
+        end = max(end if self.body_end is None else self.body_end, start)
+        while start < end and text[start] == "\n":
+            start += 1
+        while end > start and text[end - 1] == "\n":
+            end -= 1
+        # pylint: disable=protected-access
+        self.section._source = text
+        self.section._span = (start, end)
+        self.section._body = None
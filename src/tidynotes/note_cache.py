@@ -0,0 +1,129 @@
+"""
+Persistent cache of parsed notes, so unchanged files aren't re-parsed on every run.
+"""
+
+import json
+import logging
+import sqlite3
+from typing import ContextManager, Dict, Iterable, List, Tuple
+
+from . import storage
+from .logs import LOG_NAME
+from .mardown_document import MarkdownPart, part_from_data, part_to_data
+
+# Bump this whenever the parser or the structure of MarkdownPart changes.
+# Entries written under any other version are dropped when the cache is opened.
+CACHE_VERSION = 5
+
+# Stat signature of a file - modification time and size in bytes.
+FileStat = Tuple[float, int]
+
+
+class NoteCache:
+    """
+    A cache of parsed MarkdownParts stored in an SQLite database.
+
+    Entries are keyed on the path of the note, along with the modification time and
+    size of the file when it was parsed. An entry is only used if both still match.
+
+    Notes are stored as JSON (see `part_to_data`) rather than pickled, as the
+    working directory may be shared with others (e.g. on a network share) and reading
+    the cache mustn't run anything written into it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def get(self, stats: Dict[str, FileStat]) -> Dict[str, MarkdownPart]:
+        """
+        Get any cached notes for the provided paths that are still up to date.
+
+        Notes that are missing or stale are left out of the output.
+        """
+        logger = logging.getLogger(LOG_NAME)
+        output = {}
+        with self._connect() as connection:
+            for chunk in _chunks(list(stats), 500):
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    "SELECT path, mtime, size, data FROM notes"
+                    f" WHERE path IN ({placeholders})",
+                    chunk,
+                )
+                for path, mtime, size, data in rows:
+                    if stats[path] != (mtime, size):
+                        continue
+                    try:
+                        output[path] = part_from_data(json.loads(data))
+                    except Exception:  # pylint: disable=broad-except
+                        logger.warning('Discarding unreadable cache entry "%s".', path)
+        logger.debug("Found %s of %s notes in the cache.", len(output), len(stats))
+        return output
+
+    def put(self, notes: Iterable[MarkdownPart]) -> None:
+        """
+        Store freshly parsed notes in the cache.
+
+        Notes must have come from `MarkdownPart.from_file`, as the file information
+        recorded there is used as the key.
+        """
+        rows = []
+        for note in notes:
+            file_info = note.meta[".file"]
+            data = json.dumps(part_to_data(note))
+            rows.append(
+                (file_info["path"], file_info["mtime"], file_info["size"], data)
+            )
+        if not rows:
+            return
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO notes (path, mtime, size, data)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def prune(self, paths: Iterable[str]) -> None:
+        """
+        Remove any entries for notes that aren't in the provided paths.
+        """
+        keep = set(paths)
+        with self._connect() as connection:
+            existing = [x for x, in connection.execute("SELECT path FROM notes")]
+            dropped = [(x,) for x in existing if x not in keep]
+            connection.executemany("DELETE FROM notes WHERE path = ?", dropped)
+        if dropped:
+            logger = logging.getLogger(LOG_NAME)
+            logger.debug("Dropped %s notes from the cache.", len(dropped))
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache.
+        """
+        with self._connect() as connection:
+            connection.execute("DELETE FROM notes")
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        """
+        Open the cache database, resetting it if it's unreadable or out of date.
+        """
+        return storage.connect(self.path, _prepare_database)
+
+
+def _prepare_database(connection: sqlite3.Connection) -> None:
+    """
+    Create the cache tables if needed and drop entries from other cache versions.
+    """
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS notes"
+        " (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, data TEXT)"
+    )
+    storage.check_version(connection, str(CACHE_VERSION), ["notes"])
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    """
+    Split a list into chunks of at most `size` items.
+    """
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
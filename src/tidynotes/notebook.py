@@ -1,25 +1,67 @@
+# pylint: disable=too-many-lines
 """
 Utility for managing an entire notebook.
 
 There should be no direct modification of markdown here, that's in MarkdownPart.
 """
 
+import concurrent.futures
 import datetime
 import glob
-import hashlib
+import itertools
 import json
 import logging
 import os
-from typing import Any, Dict, List, Optional, Tuple, Union
+import pkgutil
+import uuid
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+)
 
-import jinja2
-import pkg_resources
+if TYPE_CHECKING:
+    import jinja2
 
+    from . import aio
+
+from . import profiling
+from .catalog import NoteCatalog
+from .corrections import CorrectionSet
+from .fragment_cache import FragmentCache
+from .hashing import HashingWriter, calc_digests, calc_sha256, calc_text_sha256
+from .links import LinkIndex
 from .logs import LOG_NAME
-from .mardown_document import MarkdownPart
+from .mardown_document import (
+    HtmlDocument,
+    MarkdownPart,
+    PartView,
+    read_text,
+    replacing_file,
+    write_text,
+)
+from .note_cache import FileStat, NoteCache
+from .project_index import ProjectIndex
+from .search import SearchIndex, SearchResult
+from .shards import (
+    ShardManifest,
+    index_text,
+    navigation,
+    outdated_pages,
+    remove_pages,
+    shard_key,
+)
 
 
-class Notebook:
+class Notebook:  # pylint: disable=too-many-instance-attributes, too-many-public-methods
     """
     A notebook of markdown documents, creates, cleans and renders the notebook to HTML.
     """
@@ -29,18 +71,41 @@ class Notebook:
     working_dir = "working"
     config_name = "config.json"
     output_dir = "rendered"
+    # Below this many files to parse, a worker pool costs more than it saves.
+    parallel_threshold = 64
+    # Number of notes read at a time when streaming through the notebook.
+    stream_chunk_size = 256
+    # Most threads used to write notes when generating several at once.
+    generation_threads = 8
+    clean_state_name = "clean_state.json"
+    clean_state_version = 1
 
-    def __init__(self, notebook_dir: str) -> None:
+    def __init__(self, notebook_dir: str, workers: Optional[int] = None) -> None:
         logger = self._make_logger()
         self.root_dir = os.path.abspath(notebook_dir)
         self.config = self._read_config()
         if "notebook_name" not in self.config:
             self.set_config("notebook_name", "TidyNotes notebook.")
+        if workers is None:
+            workers = int(self.config.get("workers", 1))
+        self.workers = max(workers, 1)
 
-        _ = jinja2.FileSystemLoader(os.path.join(self.root_dir, self.template_dir))
-        self.env = jinja2.Environment(loader=_)
+        self.cache = NoteCache(self._working_path("note_cache.sqlite"))
+        self.search_index = SearchIndex(self._working_path("search_index.sqlite"))
+        self.link_index = LinkIndex(self._working_path("link_index.sqlite"))
+        self.catalog = NoteCatalog(
+            self._working_path("catalog.sqlite"),
+            os.path.join(self.root_dir, self.note_dir),
+            str(self.config.get("note_file_format", "")),
+        )
 
-        self.notes = self.read_notes()
+        # Set up when first needed, as they need slow imports (jinja2 & markdown).
+        self._env: Optional["jinja2.Environment"] = None
+        self._fragments: Optional[FragmentCache] = None
+        # Both the file index and the notes themselves are only read when needed.
+        self._files: Optional[Dict[str, FileStat]] = None
+        self._notes: Optional[List[MarkdownPart]] = None
+        self._index: Optional[ProjectIndex] = None
 
         logger.info("Set up notebook in %s.", self.root_dir)
 
@@ -70,11 +135,11 @@ class Notebook:
             logger.debug('Creating "%s".', template)
 
             os.makedirs(dst_dir, exist_ok=True)
-            src_path = os.path.join("templates", template)
-            raw = pkg_resources.resource_string(__name__, src_path)
+            raw = pkgutil.get_data("tidynotes", f"templates/{template}")
+            if raw is None:
+                raise FileNotFoundError(f'Template "{template}" not found.')
 
             with open(dst_path, "wb") as file_out:
-                raw = pkg_resources.resource_string(__name__, src_path)
                 file_out.write(raw)
 
         return cls(notebook_dir)
@@ -90,47 +155,293 @@ class Notebook:
             return False
         return "notebook_name" in read_json(config_path)
 
+    @property
+    def env(self) -> "jinja2.Environment":
+        """
+        Environment for the templates in the notebook, set up when first used.
+        """
+        if self._env is None:
+            import jinja2  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+            loader = jinja2.FileSystemLoader(
+                os.path.join(self.root_dir, self.template_dir)
+            )
+            self._env = jinja2.Environment(loader=loader)
+        return self._env
+
+    @property
+    def fragments(self) -> FragmentCache:
+        """
+        Cache of markdown converted to HTML, set up when first used.
+        """
+        if self._fragments is None:
+            self._fragments = FragmentCache(
+                (
+                    self._working_path("html_cache.sqlite")
+                    if self.config.get("cache_html", True)
+                    else None
+                ),
+                convert=MarkdownPart.markdown_to_html,
+                version=MarkdownPart.renderer_version(),
+                max_size=int(self.config.get("html_cache_size", 64 * 1024 * 1024)),
+            )
+        return self._fragments
+
+    @property
+    def files(self) -> Dict[str, FileStat]:
+        """
+        Index of all note files in the notebook, mapping each path to its stat info.
+
+        Built on first use without parsing any of the notes.
+        """
+        if self._files is None:
+            self._files = self._scan_files()
+        return self._files
+
+    @property
+    def notes(self) -> List[MarkdownPart]:
+        """
+        All notes in the notebook, read from files the first time they're needed.
+        """
+        if self._notes is None:
+            self._notes = self.read_notes()
+        return self._notes
+
+    @notes.setter
+    def notes(self, value: List[MarkdownPart]) -> None:
+        self._notes = value
+        self._index = None
+
+    @property
+    def project_index(self) -> ProjectIndex:
+        """
+        Index of the projects and tasks in the notebook, built when first needed.
+
+        The index is rebuilt whenever notes are added, reloaded or have their titles
+        updated by the notebook.
+        """
+        if self._index is None or self._index.notes is not self.notes:
+            self._index = ProjectIndex(self.notes)
+        return self._index
+
+    def _get_index(self, notes: Optional[List[MarkdownPart]]) -> ProjectIndex:
+        """Get the project index for a list of notes (the whole notebook by default)."""
+        if notes is None or notes is self._notes:
+            return self.project_index
+        return ProjectIndex(notes)
+
+    def _scan_files(self) -> Dict[str, FileStat]:
+        """Find all note files and their modification time / size, sorted by path."""
+        logger = self._make_logger()
+        note_pattern = os.path.join(self.root_dir, self.note_dir, "**", "*.md")
+        output = {}
+        with profiling.phase("glob") as timer:
+            for path in sorted(glob.glob(note_pattern, recursive=True)):
+                file_info = os.stat(path)
+                output[path] = (file_info.st_mtime, file_info.st_size)
+            timer.add(notes=len(output))
+        logger.debug("Found %s note files.", len(output))
+        return output
+
     def read_notes(self) -> List[MarkdownPart]:
-        """Read all notes from files."""
+        """
+        Read all notes from files.
+
+        Unless the "cache_notes" config option is turned off, parsed notes are cached
+        in the working directory and only new or modified files are parsed.
+
+        Notes are always returned sorted by path.
+        """
         logger = self._make_logger()
         logger.debug("Reading notes.")
-        note_pattern = os.path.join(self.root_dir, self.note_dir, "**", "*.md")
+        self._files = self._scan_files()
+        paths = list(self._files)
+        notes = self._read_files(paths)
+        if self.config.get("cache_notes", True):
+            self.cache.prune(paths)
+        return notes
+
+    async def read_notes_async(self) -> List[MarkdownPart]:
+        """
+        Read all notes from files, reading several at once (see `read_notes`).
+        """
+        logger = self._make_logger()
+        logger.debug("Reading notes.")
+        self._files = self._scan_files()
+        paths = list(self._files)
+        notes = await self._read_files_async(paths)
+        if self.config.get("cache_notes", True):
+            self.cache.prune(paths)
+        return notes
+
+    def _io_pool(self) -> "aio.IOPool":
+        """
+        Make a pool for file I/O, sized by the "io_concurrency" config option.
+        """
+        # Imported here as asyncio is slow to import, and only the async methods use it.
+        # pylint: disable-next=import-outside-toplevel,redefined-outer-name
+        from . import aio
+
+        return aio.IOPool(
+            int(self.config.get("io_concurrency", aio.DEFAULT_CONCURRENCY))
+        )
+
+    def _read_files(self, paths: List[str]) -> List[MarkdownPart]:
+        """
+        Read the notes at the specified paths, using the cache where possible.
+
+        The stat info for each path is taken from the file index.
+        """
+        cached = self._cached_notes(paths)
+        parsed = self._parse_files([x for x in paths if x not in cached])
+        return self._collect_notes(paths, cached, parsed)
+
+    async def _read_files_async(
+        self, paths: List[str], pool: Optional["aio.IOPool"] = None
+    ) -> List[MarkdownPart]:
+        """
+        Read the notes at the specified paths, several files at a time.
+
+        Uses its own I/O pool unless one is given.
+        """
+        if pool is None:
+            async with self._io_pool() as pool:
+                return await self._read_files_async(paths, pool)
+
+        cached = self._cached_notes(paths)
+        uncached = [x for x in paths if x not in cached]
+        if self.workers > 1 and len(uncached) >= self.parallel_threshold:
+            parsed = self._parse_files(uncached)
+        else:
+            # Only the reading is done in the pool, parsing is quicker in one thread.
+            files = await pool.map(read_text, uncached)
+            parsed = [
+                MarkdownPart.from_file(x, text=y, file_info=z)
+                for x, (y, z) in zip(uncached, files)
+            ]
+        return self._collect_notes(paths, cached, parsed)
+
+    def _cached_notes(self, paths: List[str]) -> Dict[str, MarkdownPart]:
+        """Get any of the notes that are unchanged since they were cached."""
+        if not self.config.get("cache_notes", True):
+            return {}
+        with profiling.phase("note_cache", notes=len(paths)):
+            return self.cache.get({x: self.files[x] for x in paths})
+
+    def _collect_notes(
+        self,
+        paths: List[str],
+        cached: Dict[str, MarkdownPart],
+        parsed: List[MarkdownPart],
+    ) -> List[MarkdownPart]:
+        """
+        Put cached and freshly parsed notes in order, caching the parsed ones.
+        """
+        logger = self._make_logger()
+        loaded = {**cached, **{x.meta[".file"]["path"]: x for x in parsed}}
+
         notes = []
-        for path in glob.glob(note_pattern, recursive=True):
-            temp = MarkdownPart.from_file(path)
+        for path in paths:
+            temp = loaded[path]
             if temp.is_stub():
                 logger.info('"%s" is a stub.', path)
             notes.append(temp)
-        logger.debug("Loaded %s notes.", len(notes))
+        logger.debug("Loaded %s notes, %s were parsed.", len(notes), len(parsed))
+
+        if self.config.get("cache_notes", True):
+            with profiling.phase("note_cache", notes=len(parsed)):
+                self.cache.put(parsed)
         return notes
 
+    def _notes_for(self, paths: List[str]) -> List[MarkdownPart]:
+        """
+        Get the notes for the specified paths.
+
+        If the notebook's notes are already loaded those are used, otherwise only the
+        requested notes are read.
+        """
+        if self._notes is None:
+            return self._read_files(paths)
+        return self._loaded_notes(paths)
+
+    async def _notes_for_async(
+        self, paths: List[str], pool: Optional["aio.IOPool"] = None
+    ) -> List[MarkdownPart]:
+        """
+        Get the notes for the specified paths (see `_notes_for`), reading several at
+        once with their own I/O pool unless one is given.
+        """
+        if self._notes is None:
+            return await self._read_files_async(paths, pool)
+        return self._loaded_notes(paths)
+
+    def _loaded_notes(self, paths: List[str]) -> List[MarkdownPart]:
+        """Pick the notes for the specified paths out of the loaded notes."""
+        by_path = {x.meta[".file"]["path"]: x for x in self.notes}
+        return [by_path[x] for x in paths if x in by_path]
+
+    def _iter_notes(self) -> Iterator[MarkdownPart]:
+        """
+        Go through every note in the notebook, in order.
+
+        If the notes aren't already loaded they're read a chunk at a time, so only one
+        chunk needs to be held in memory.
+        """
+        if self._notes is not None:
+            yield from self._notes
+            return
+        paths = list(self.files)
+        for start in range(0, len(paths), self.stream_chunk_size):
+            yield from self._read_files(paths[start : start + self.stream_chunk_size])
+
+    def _parse_files(self, paths: List[str]) -> List[MarkdownPart]:
+        """
+        Parse a list of files, in the same order as the paths.
+
+        Uses a pool of worker processes if more than one worker is configured and
+        there are enough files to make it worthwhile.
+        """
+        logger = self._make_logger()
+        if self.workers == 1 or len(paths) < self.parallel_threshold:
+            return [MarkdownPart.from_file(x) for x in paths]
+
+        logger.debug("Parsing %s notes with %s workers.", len(paths), self.workers)
+        chunk_size = max(len(paths) // (self.workers * 4), 1)
+        with concurrent.futures.ProcessPoolExecutor(self.workers) as executor:
+            return list(
+                executor.map(MarkdownPart.from_file, paths, chunksize=chunk_size)
+            )
+
     def refresh(self) -> None:
-        """Reload all of the notes for the notebook."""
-        self.notes = self.read_notes()
+        """
+        Reload all of the notes for the notebook.
+
+        The notes are read again the next time they're used.
+        """
+        self._files = None
+        self._notes = None
+        self._index = None
+
+    def reload_notes(self, paths: Iterable[str]) -> None:
+        """
+        Re-read specific notes from disk, e.g. after they've been modified.
+
+        Notes that no longer exist are dropped and new files are added. If the notes
+        haven't been loaded yet only the file index is updated.
+        """
+        paths = set(paths)
+        self._files = self._scan_files()
+        if self._notes is None:
+            return
+        kept = [x for x in self._notes if x.meta[".file"]["path"] not in paths]
+        loaded = self._read_files(sorted(x for x in paths if x in self._files))
+        self.notes = sorted(kept + loaded, key=lambda x: x.meta[".file"]["path"])
 
     def make_note(
         self, date: datetime.datetime = datetime.datetime.today(), force: bool = False
     ) -> None:
         """Generates and writes a note for the specified date."""
-        logger = self._make_logger("Generation")
-        logger.debug("Generating a note for %s.", date)
-
-        date_format = str(self.config["note_file_format"])
-        dst_path = os.path.join(
-            self.root_dir, self.note_dir, date.strftime(date_format)
-        )
-        os.makedirs(os.path.split(dst_path)[0], exist_ok=True)
-        if force or not os.path.exists(dst_path):
-            template = self.env.get_template("note.md")
-            output = MarkdownPart(template.render(date=date))
-            output.meta["note_for"] = date
-            output.meta["notebook"] = self.config["notebook_name"]
-            output.to_file(dst_path)
-            logger.debug("Generated note")
-            self.notes.append(MarkdownPart.from_file(dst_path))
-        else:
-            logger.debug("Note already exists - skipping.")
-        logger.debug("Finished writing note.")
+        self.make_notes([date], force=force)
 
     def make_series(
         self,
@@ -139,9 +450,72 @@ class Notebook:
         force: bool = False,
     ) -> None:
         """Generate a series of notes for `days` number of days."""
-        for _ in range(days):
-            self.make_note(starting, force=force)
-            starting += datetime.timedelta(days=1)
+        dates = [starting + datetime.timedelta(days=x) for x in range(days)]
+        self.make_notes(dates, force=force)
+
+    def make_notes(
+        self, dates: Iterable[datetime.datetime], force: bool = False
+    ) -> List[str]:
+        """
+        Generate and write notes for several dates, returning their paths.
+
+        The paths are all worked out first, so each directory is only created once and
+        the note template is only loaded once. The notes are written concurrently, and
+        added to the notebook from the generated text rather than read back in.
+        """
+        logger = self._make_logger("Generation")
+        date_format = str(self.config["note_file_format"])
+        planned: Dict[str, datetime.datetime] = {}
+        for date in dates:
+            dst_path = os.path.join(
+                self.root_dir, self.note_dir, date.strftime(date_format)
+            )
+            planned.setdefault(dst_path, date)
+
+        for directory in {os.path.split(x)[0] for x in planned}:
+            os.makedirs(directory, exist_ok=True)
+        if not force:
+            existing = [x for x in planned if os.path.exists(x)]
+            for dst_path in existing:
+                logger.debug(
+                    "Note already exists for %s - skipping.", planned[dst_path]
+                )
+                del planned[dst_path]
+        if not planned:
+            return []
+
+        logger.debug("Generating %s notes.", len(planned))
+        template = self.env.get_template("note.md")
+        texts = {}
+        for dst_path, date in planned.items():
+            output = MarkdownPart(template.render(date=date))
+            output.meta["note_for"] = date
+            output.meta["notebook"] = self.config["notebook_name"]
+            with profiling.phase("combine", notes=1):
+                texts[dst_path] = output.combine()
+
+        threads = min(self.generation_threads, len(texts))
+        with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+            list(executor.map(write_text, texts, texts.values()))
+        logger.debug("Finished writing %s notes.", len(texts))
+        self._add_generated(texts)
+        return list(texts)
+
+    def _add_generated(self, texts: Dict[str, str]) -> None:
+        """
+        Add freshly written notes to the notebook (if it's been loaded).
+
+        Any notes already loaded from the same paths are replaced.
+        """
+        if self._files is not None:
+            for dst_path in texts:
+                file_info = os.stat(dst_path)
+                self._files[dst_path] = (file_info.st_mtime, file_info.st_size)
+            self._files = dict(sorted(self._files.items()))
+        if self._notes is not None:
+            kept = [x for x in self._notes if x.meta[".file"]["path"] not in texts]
+            added = [MarkdownPart.from_file(x, text=y) for x, y in texts.items()]
+            self.notes = sorted(kept + added, key=lambda x: x.meta[".file"]["path"])
 
     def _make_logger(self, sub_log: Optional[str] = None) -> logging.Logger:
         """Get the logger for the notebook, with an optional sub-log name."""
@@ -173,105 +547,504 @@ class Notebook:
         self.config[item_name] = item_value
         write_json(self.config, os.path.join(self.root_dir, self.config_name))
 
-    def clean(self) -> None:
-        """General cleanup operations on the notebook."""
+    @staticmethod
+    def profile(
+        hooks: Optional[List[profiling.Hook]] = None,
+    ) -> ContextManager[profiling.Profiler]:
+        """
+        Record the time spent and work done in each phase while in the context.
+
+        Each hook is called with the name, duration and counters of every phase as it
+        ends. Work done in worker processes isn't recorded.
+        """
+        return profiling.profile(hooks)
+
+    def clean(
+        self, incremental: bool = True, paths: Optional[Iterable[str]] = None
+    ) -> None:
+        """
+        General cleanup operations on the notebook.
+
+        The state of each note after cleaning is recorded in the working directory,
+        along with the rules used to clean it. If `incremental` is true and none of the
+        rules have changed since, only notes that changed after the last clean are
+        processed. Only those in `paths` are checked for changes if it's given (e.g.
+        notes known to have just been edited), instead of every note.
+        """
+        state, paths = self._clean_targets(incremental, paths)
+        notes = self._notes_for(paths)
+        if notes:
+            self.update_projects_and_tasks(notes)
+            self.text_corrections(notes)
+        for this_note in notes:
+            this_note.to_file(this_note.meta[".file"]["path"])
+        self._record_clean(state, notes)
+
+    async def clean_async(
+        self, incremental: bool = True, paths: Optional[Iterable[str]] = None
+    ) -> None:
+        """
+        Clean up the notebook, reading & writing several notes at once (see `clean`).
+        """
+        state, paths = self._clean_targets(incremental, paths)
+        async with self._io_pool() as pool:
+            notes = await self._notes_for_async(paths, pool)
+            if notes:
+                self.update_projects_and_tasks(notes)
+                self.text_corrections(notes)
+            note_paths = [x.meta[".file"]["path"] for x in notes]
+            await pool.map(MarkdownPart.to_file, notes, note_paths)
+        self._record_clean(state, notes)
+
+    def _clean_targets(
+        self, incremental: bool, paths: Optional[Iterable[str]]
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Read the state left by the last clean, and find the notes that need cleaning.
+
+        Only `paths` are checked for changes if given, unless every note needs
+        cleaning.
+        """
         logger = self._make_logger("Cleanup")
         logger.info("Cleaning up all notes.")
-        self.update_projects_and_tasks()
-        self.text_corrections()
-        for this_note in self.notes:
-            this_note.to_file(this_note.meta[".file"]["path"])
+        if self._notes is None:
+            self._files = self._scan_files()
+        state = read_json(self._working_path(self.clean_state_name))
+        rules = self._clean_rule_hashes()
+
+        if (
+            incremental
+            and state.get("version") == self.clean_state_version
+            and state.get("rules") == rules
+        ):
+            checked = None if paths is None else set(paths)
+            targets = self._changed_since_clean(state.get("notes", {}), checked)
+        else:
+            logger.debug("Cleaning rules have changed - cleaning every note.")
+            targets = list(self.files)
+        logger.debug("%s notes to clean.", len(targets))
+        return state, targets
+
+    def _record_clean(self, state: Dict[str, Any], notes: List[MarkdownPart]) -> None:
+        """
+        Record the state of freshly cleaned (and saved) notes, for the next clean.
+        """
+        logger = self._make_logger("Cleanup")
+        note_state = {
+            x: y for x, y in state.get("notes", {}).items() if x in self.files
+        }
+        for this_note in notes:
+            file_info = this_note.meta[".file"]
+            path = file_info["path"]
+            self.files[path] = (file_info["mtime"], file_info["size"])
+            note_state[path] = {
+                "sha256": file_info["sha256"],
+                "mtime": file_info["mtime"],
+                "size": file_info["size"],
+            }
+
+        state = {
+            "version": self.clean_state_version,
+            "rules": self._clean_rule_hashes(),
+            "notes": note_state,
+        }
+        write_json(state, self._working_path(self.clean_state_name))
         logger.info("Finished cleaning notes.")
 
-    def extract_project(self, pattern: str) -> List[MarkdownPart]:
-        """Extract all entries for a project."""
+    def _clean_rule_hashes(self) -> Dict[str, str]:
+        """Hash each of the files that control how notes are cleaned."""
+        output = {}
+        for file_name in ["corrections.json", "projects.json", "tasks.json"]:
+            path = self._working_path(file_name)
+            output[file_name] = calc_sha256(path) if os.path.exists(path) else ""
+        return output
+
+    def _changed_since_clean(
+        self,
+        note_state: Dict[str, Dict[str, Any]],
+        paths: Optional[Set[str]] = None,
+    ) -> List[str]:
+        """
+        Find any notes that have changed since they were last cleaned.
+
+        Files are only hashed if their stat info has changed, which also updates
+        `note_state` for files that were touched without changing. If the notes have
+        been loaded, each note is checked in memory instead, so unsaved changes count.
+        Only the notes in `paths` are checked if it's given.
+        """
+        output = []
+        if self._notes is not None:
+            notes = self._notes
+            if paths is not None:
+                notes = self._loaded_notes(sorted(paths))
+            for this_note in notes:
+                path = this_note.meta[".file"]["path"]
+                previous = note_state.get(path)
+                if previous is None:
+                    output.append(path)
+                elif calc_text_sha256(this_note.combine()) != previous["sha256"]:
+                    output.append(path)
+            return output
+
+        for path, (mtime, size) in self.files.items():
+            if paths is not None and path not in paths:
+                continue
+            previous = note_state.get(path)
+            if previous is None:
+                output.append(path)
+                continue
+            if (previous["mtime"], previous["size"]) == (mtime, size):
+                continue
+            with open(path, "r", encoding="utf-8") as file:
+                text = file.read()
+            if calc_text_sha256(text) == previous["sha256"]:
+                previous["mtime"], previous["size"] = mtime, size
+            else:
+                output.append(path)
+        return output
+
+    def extract_project(
+        self,
+        pattern: str,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> List[MarkdownPart]:
+        """
+        Extract all entries for a project.
+
+        If `start` and/or `end` are given, only notes for dates in that range are
+        read and searched (see `notes_between`).
+        """
+        notes = None
+        if start is not None or end is not None:
+            notes = self.notes_between(start, end)
+        return self._extract(pattern, notes)
+
+    def _extract(
+        self, pattern: str, notes: Optional[List[MarkdownPart]]
+    ) -> List[MarkdownPart]:
+        """Extract all entries for a project from notes (all notes by default)."""
         logger = self._make_logger()
         logger.debug('Extracting notes for "%s".', pattern)
-        output = []
-        for this_note in self.notes:
-            for part in this_note.extract_parts(pattern):
-                part.title = this_note.title
-                part.set_level(2)
-                output.append(part)
+        output: List[MarkdownPart] = []
+        for this_note, part in self._get_index(notes).find(pattern):
+            view = PartView(part)
+            view.title = this_note.title
+            view.set_level(2)
+            output.append(view)
         return output
 
-    def update_projects_and_tasks(self) -> None:
+    def update_projects_and_tasks(
+        self, notes: Optional[List[MarkdownPart]] = None
+    ) -> None:
         """
         Build a list of projects/tasks and replace existing ones based on a mapping.
 
         The mappings are stored in JSON files called "projects" and "tasks".
+        Only the provided notes are updated, or all notes if none are provided.
         """
         projects = read_json(self._working_path("projects.json"))
         tasks = read_json(self._working_path("tasks.json"))
 
-        new_projects, new_tasks = self._make_part_list()
-        for this_project in new_projects:
+        index = self._get_index(notes)
+        for this_project in index.projects:
             if this_project not in projects:
                 projects[this_project] = this_project
-        for this_tasks in new_tasks:
+        for this_tasks in index.tasks:
             if this_tasks not in tasks:
                 tasks[this_tasks] = this_tasks
 
-        for this_note in self.notes:
-            this_note.replace_title(projects, level=2)
-            this_note.replace_title(tasks, level=3)
+        with profiling.phase("titles", notes=len(index.notes)):
+            changed = index.replace_titles(projects, level=2)
+            changed += index.replace_titles(tasks, level=3)
+        # The notes may be (some of) the loaded ones, even if they aren't the same list.
+        if changed:
+            self._index = None
 
         write_json(projects, self._working_path("projects.json"))
         write_json(tasks, self._working_path("tasks.json"))
 
-    def text_corrections(self) -> None:
-        """Apply each regex replacement pattern in corrections.json to all notes."""
-        corrections = read_json(self._working_path("corrections.json"))
-        for pattern, replacement in corrections.items():
-            for this_note in self.notes:
-                this_note.make_replacement(pattern, replacement)
-
-    def _make_part_list(self) -> Tuple[List[str], List[str]]:
-        """Generate a list of projects and tasks in the notebook."""
-        projects = set()
-        tasks = set()
-        for this_note in self.notes:
-            projects.update([x.title for x in this_note.parts])
-            for this_project in this_note.parts:
-                tasks.update([x.title for x in this_project.parts])
-
-        return sorted(list({x for x in projects if x is not None})), sorted(
-            list({x for x in tasks if x is not None})
-        )
+    def text_corrections(self, notes: Optional[List[MarkdownPart]] = None) -> None:
+        """
+        Apply each regex replacement pattern in corrections.json to notes.
+
+        Only the provided notes are corrected, or all notes if none are provided.
+        """
+        if notes is None:
+            notes = self.notes
+        corrections = CorrectionSet(read_json(self._working_path("corrections.json")))
+        with profiling.phase("corrections", notes=len(notes)):
+            for this_note in notes:
+                this_note.apply_corrections(corrections)
+
+    def _make_part_list(
+        self, notes: Optional[List[MarkdownPart]] = None
+    ) -> Tuple[List[str], List[str]]:
+        """Generate a list of projects and tasks in the notebook (or provided notes)."""
+        index = self._get_index(notes)
+        return index.projects, index.tasks
+
+    def update_search_index(self) -> None:
+        """
+        Bring the full-text search index up to date with the notes on disk.
+
+        Only notes that have been modified since they were last indexed are read.
+        """
+        logger = self._make_logger("Search")
+        if self._notes is None:
+            self._files = self._scan_files()
+        count = self.search_index.update(self.files, self._read_files)
+        logger.debug("Re-indexed %s notes for searching.", count)
+
+    def update_catalog(self) -> None:
+        """
+        Bring the catalog of the date each note is for up to date with the notes on disk.
+
+        Only new or modified notes are looked at, and only their front matter is read
+        (for "note_for"). Notes without a "note_for" are dated from their path.
+        """
+        logger = self._make_logger("Catalog")
+        if self._notes is None:
+            self._files = self._scan_files()
+        count = self.catalog.update(self.files, self.catalog.read_front_matter)
+        logger.debug("Re-catalogued %s notes.", count)
+
+    def notes_between(
+        self,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> List[MarkdownPart]:
+        """
+        Get the notes for dates from `start` to `end` (both included), sorted by date.
+
+        Either end of the range can be left open. The catalog is updated first, and
+        only the notes in the range are read unless the notebook's notes are already
+        loaded.
+        """
+        self.update_catalog()
+        return self._notes_for(self.catalog.between(start, end))
+
+    async def notes_between_async(
+        self,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+        pool: Optional["aio.IOPool"] = None,
+    ) -> List[MarkdownPart]:
+        """
+        Get the notes for a range of dates (see `notes_between`), reading several at
+        once with their own I/O pool unless one is given.
+        """
+        self.update_catalog()
+        return await self._notes_for_async(self.catalog.between(start, end), pool)
+
+    def search(self, query: str, limit: int = 20) -> List[SearchResult]:
+        """
+        Search the text of the notes, returning the best matching sections.
+
+        The search index is updated first, see `SearchIndex.search` for the syntax.
+        """
+        self.update_search_index()
+        return self.search_index.search(query, limit)
+
+    def update_link_index(self) -> None:
+        """
+        Bring the index of links between notes up to date with the notes on disk.
+
+        Only notes that have been modified since they were last indexed are read.
+        """
+        logger = self._make_logger("Links")
+        if self._notes is None:
+            self._files = self._scan_files()
+        count = self.link_index.update(self.files, self._read_files)
+        logger.debug("Re-indexed links in %s notes.", count)
+
+    def backlinks(self, paths: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Find the paths of the notes linking to each of the specified notes.
+
+        The link index is updated first.
+        """
+        self.update_link_index()
+        return self.link_index.backlinks(paths)
+
+    def _with_backlinks(self, notes: Iterable[MarkdownPart]) -> Iterator[MarkdownPart]:
+        """
+        Add a list of the notes linking to each note, for rendering.
+
+        Notes are changed through views, so the originals are left alone. Anything
+        that isn't a whole note (e.g. extracted projects) is passed through as-is.
+        """
+        notes = iter(notes)
+        updated = False
+        while True:
+            batch = list(itertools.islice(notes, self.stream_chunk_size))
+            if not batch:
+                return
+            paths = [x.meta[".file"]["path"] for x in batch if ".file" in x.meta]
+            if paths and not updated:
+                self.update_link_index()
+                updated = True
+            links = self.link_index.backlinks(paths) if paths else {}
+            titles = self.link_index.titles({y for x in links.values() for y in x})
+            for part in batch:
+                sources = links.get(part.meta.get(".file", {}).get("path"), [])
+                if sources:
+                    part = PartView(part)
+                    names = ", ".join(titles.get(x) or x for x in sources)
+                    part.body = f"{part.body}\nLinked from: {names}\n"
+                yield part
 
     def _working_path(self, file_name: str) -> str:
         return os.path.join(self.root_dir, self.working_dir, file_name)
 
-    def render_full(self, dst_path: Optional[str] = None) -> None:
-        """Render all notes into a single HTML file."""
+    def render_full(
+        self,
+        dst_path: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> None:
+        """
+        Render all notes into a single HTML file.
+
+        If `start` and/or `end` are given, only notes for dates in that range are
+        rendered, by default to a file named after the range.
+        """
         logger = self._make_logger("Rendering")
         logger.info('Rendering full notes to HTML at "%s".', dst_path)
-        if dst_path is None:
-            dst_path = os.path.join(
-                self.root_dir, self.output_dir, f"{self.config['notebook_name']}.html"
-            )
-        self._render(
-            notes=self.notes, title=str(self.config["notebook_name"]), dst_path=dst_path
+        title, dst_path = self._render_target(
+            str(self.config["notebook_name"]), dst_path, start, end
+        )
+        notes: Iterable[MarkdownPart] = self._iter_notes()
+        if start is not None or end is not None:
+            notes = self.notes_between(start, end)
+        self._render(notes=notes, title=title, dst_path=dst_path)
+        logger.info("Finished redering full notes.")
+
+    async def render_full_async(
+        self,
+        dst_path: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> None:
+        """
+        Render all notes into a single HTML file, writing while rendering.
+        """
+        logger = self._make_logger("Rendering")
+        logger.info('Rendering full notes to HTML at "%s".', dst_path)
+        title, dst_path = self._render_target(
+            str(self.config["notebook_name"]), dst_path, start, end
         )
+        async with self._io_pool() as pool:
+            notes: Iterable[MarkdownPart] = self._iter_notes()
+            if start is not None or end is not None:
+                notes = await self.notes_between_async(start, end, pool)
+            await self._render_async(
+                notes=notes, title=title, dst_path=dst_path, pool=pool
+            )
         logger.info("Finished redering full notes.")
 
-    def render_project(self, project_name: str, dst_path: Optional[str] = None) -> None:
-        """Render a single project to a HTML file."""
+    def render_project(
+        self,
+        project_name: str,
+        dst_path: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> None:
+        """
+        Render a single project to a HTML file.
+
+        If `start` and/or `end` are given, only entries in notes for dates in that
+        range are rendered, by default to a file named after the range.
+        """
         logger = self._make_logger("Rendering")
         logger.info('Rendering project "%s" to HTML at "%s".', project_name, dst_path)
-        if dst_path is None:
-            dst_path = os.path.join(
-                self.root_dir, self.output_dir, f"{project_name}.html"
-            )
+        title, dst_path = self._render_target(project_name, dst_path, start, end)
         self._render(
-            notes=self.extract_project(project_name),
-            title=project_name,
+            notes=self.extract_project(project_name, start, end),
+            title=title,
             dst_path=dst_path,
         )
         logger.info("Finished redering project.")
 
-    def render_all_projects(self, dst_dir: Optional[str] = None) -> None:
-        """Render all projects to their own HTML file."""
+    async def render_project_async(
+        self,
+        project_name: str,
+        dst_path: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> None:
+        """
+        Render a single project to a HTML file, writing while rendering.
+        """
+        logger = self._make_logger("Rendering")
+        logger.info('Rendering project "%s" to HTML at "%s".', project_name, dst_path)
+        title, dst_path = self._render_target(project_name, dst_path, start, end)
+        async with self._io_pool() as pool:
+            notes = None
+            if start is not None or end is not None:
+                notes = await self.notes_between_async(start, end, pool)
+            await self._render_async(
+                notes=self._extract(project_name, notes),
+                title=title,
+                dst_path=dst_path,
+                pool=pool,
+            )
+        logger.info("Finished redering project.")
+
+    def _render_target(
+        self,
+        title: str,
+        dst_path: Optional[str],
+        start: Optional[datetime.date],
+        end: Optional[datetime.date],
+    ) -> Tuple[str, str]:
+        """
+        Get the title of a page, and where it's written to unless a path is given.
+
+        Pages for a range of dates have the range in their title (and so file name).
+        """
+        if start is not None or end is not None:
+            title = f"{title} ({_range_label(start, end)})"
+        if dst_path is None:
+            dst_path = os.path.join(self.root_dir, self.output_dir, f"{title}.html")
+        return title, dst_path
+
+    def render_all_projects(self, dst_dir: Optional[str] = None) -> List[str]:
+        """
+        Render all projects to their own HTML file.
+
+        If more than one worker is configured, projects are rendered in parallel by a
+        pool of worker processes. A project that fails to render is logged and skipped
+        without stopping the others. Returns the names of any projects that failed.
+        """
+        jobs = self._project_jobs(dst_dir)
+        if self.workers == 1 or len(jobs) < 2:
+            results = {x: self._try_render_project(x, y) for x, y in jobs.items()}
+        else:
+            results = self._render_projects_parallel(jobs)
+        return self._project_results(results)
+
+    async def render_all_projects_async(
+        self, dst_dir: Optional[str] = None
+    ) -> List[str]:
+        """
+        Render all projects to their own HTML file (see `render_all_projects`).
+
+        With a single worker, several projects are rendered at once so that each
+        one's writes overlap with rendering the others.
+        """
+        jobs = self._project_jobs(dst_dir)
+        if self.workers > 1 and len(jobs) > 1:
+            return self._project_results(self._render_projects_parallel(jobs))
+        async with self._io_pool() as pool:
+            rendered = await pool.each(
+                lambda x: self._try_render_project_async(x[0], x[1], pool=pool),
+                jobs.items(),
+            )
+        return self._project_results(dict(zip(jobs, rendered)))
+
+    def _project_jobs(self, dst_dir: Optional[str]) -> Dict[str, str]:
+        """Get the path each project is rendered to."""
         logger = self._make_logger("Rendering")
         logger.info("Rendering all projects to their own output.")
 
@@ -279,50 +1052,502 @@ class Notebook:
             dst_dir = os.path.join(self.root_dir, self.output_dir)
 
         projects, _ = self._make_part_list()
-        for this_project in projects:
-            dst_path = os.path.join(dst_dir, f"{this_project}.html")
-            self.render_project(this_project, dst_path)
+        return {x: os.path.join(dst_dir, f"{x}.html") for x in projects}
+
+    def _project_results(
+        self, results: Dict[str, Union[List[str], Exception]]
+    ) -> List[str]:
+        """
+        Log the outcome of rendering each project, returning the ones that failed.
+        """
+        logger = self._make_logger("Rendering")
+        failed = []
+        rows = []
+        for this_project, result in results.items():
+            if isinstance(result, Exception):
+                logger.error('Failed to render "%s": %s', this_project, result)
+                failed.append(this_project)
+            else:
+                rows.append(result)
+        self._write_hash_log(rows)
         logger.info("Finished all rendering projects.")
+        return failed
+
+    def render_shards(
+        self,
+        period: Optional[str] = None,
+        dst_dir: Optional[str] = None,
+        force: bool = False,
+    ) -> List[str]:
+        """
+        Render the notes as a page per period, with an index page linking to each.
 
-    def _render(self, notes: List[MarkdownPart], title: str, dst_path: str) -> None:
+        Notes are put in shards by their "note_for" date, with `period` being "month"
+        or "year" (the "shard_period" config option by default, or "month"). Only
+        shards with new, changed or removed notes are rendered again unless `force`
+        is true. Returns the names of the shards that were rendered.
+
+        Any links added with "render_backlinks" are only updated in shards that are
+        rendered again.
+        """
+        manifest, dst_dir, before = self._shard_manifest(period, dst_dir, force)
+        shards, rendered = self._stale_shards(manifest, before, dst_dir)
+        rows = [
+            self._render(
+                notes=self._notes_for(shards[x]),
+                **self._shard_page(x, shards, dst_dir),
+            )
+            for x in rendered
+        ]
+        index_page = self._shard_index_page(rendered, before, shards, dst_dir)
+        if index_page is not None:
+            rows.append(self._render(notes=[], **index_page))
+        self._finish_shards(manifest, before, dst_dir, rows)
+        return rendered
+
+    async def render_shards_async(
+        self,
+        period: Optional[str] = None,
+        dst_dir: Optional[str] = None,
+        force: bool = False,
+    ) -> List[str]:
+        """
+        Render the notes as a page per period (see `render_shards`), several at once.
+        """
+        manifest, dst_dir, before = self._shard_manifest(period, dst_dir, force)
+        shards, rendered = self._stale_shards(manifest, before, dst_dir)
+        async with self._io_pool() as pool:
+            rows = await pool.each(
+                lambda x: self._render_shard_async(x, shards, dst_dir, pool), rendered
+            )
+            index_page = self._shard_index_page(rendered, before, shards, dst_dir)
+            if index_page is not None:
+                rows.append(await self._render_async(notes=[], pool=pool, **index_page))
+        self._finish_shards(manifest, before, dst_dir, rows)
+        return rendered
+
+    def _shard_manifest(
+        self, period: Optional[str], dst_dir: Optional[str], force: bool
+    ) -> Tuple[ShardManifest, str, Dict[str, List[str]]]:
+        """
+        Load the shard manifest, along with where the pages go and the current shards.
+        """
+        if period is None:
+            period = str(self.config.get("shard_period", "month"))
+        if dst_dir is None:
+            dst_dir = os.path.join(self.root_dir, self.output_dir, f"by_{period}")
+        manifest = ShardManifest(
+            self._working_path("shard_manifest.json"), period, self._render_settings()
+        )
+        if force:
+            manifest.drop(list(manifest.notes))
+        if self._notes is None:
+            self._files = self._scan_files()
+        return manifest, dst_dir, manifest.shards()
+
+    def _stale_shards(
+        self, manifest: ShardManifest, before: Dict[str, List[str]], dst_dir: str
+    ) -> Tuple[Dict[str, List[str]], List[str]]:
+        """
+        Bring the manifest up to date, returning the shards and those to render again.
+        """
         logger = self._make_logger("Rendering")
-        logger.debug("Combining %s parts for rendering.", len(notes))
-        document = MarkdownPart(f"# {title}")
-        for part in notes:
-            document.add_part(part)
+        changed, dropped = manifest.changes(self.files)
+        logger.info(
+            "Rendering %s shards, %s notes changed and %s removed.",
+            manifest.period,
+            len(changed),
+            len(dropped),
+        )
+        stale = self._assign_shards(manifest, changed, dropped)
+        shards = manifest.shards()
+        # Pages link to the shards either side, so those might need updating too.
+        stale.update(outdated_pages(list(before), list(shards), dst_dir))
+        return shards, [x for x in shards if x in stale]
 
-        logger.debug("Making render-time corrections.")
-        corrections = read_json(self._working_path("render_changes.json"))
-        for pattern, replacement in corrections.items():
-            document.make_replacement(pattern, replacement)
+    def _shard_page(
+        self, shard: str, shards: Dict[str, List[str]], dst_dir: str
+    ) -> Dict[str, Any]:
+        """Get the arguments for rendering a shard's page, other than its notes."""
+        return {
+            "title": f"{self.config['notebook_name']} - {shard}",
+            "dst_path": os.path.join(dst_dir, f"{shard}.html"),
+            "log": False,
+            "intro": navigation(list(shards), shard),
+        }
 
-        logger.debug("Rendering template")
-        output = self.env.get_template("page.html").render(
-            **self.config, document=document, title=title
+    async def _render_shard_async(
+        self,
+        shard: str,
+        shards: Dict[str, List[str]],
+        dst_dir: str,
+        pool: "aio.IOPool",
+    ) -> List[str]:
+        """Render the notes in a shard to its page, returning its hash log entry."""
+        return await self._render_async(
+            notes=await self._notes_for_async(shards[shard], pool),
+            pool=pool,
+            **self._shard_page(shard, shards, dst_dir),
         )
 
-        logger.debug("Writing to disk.")
-        with open(dst_path, "w", encoding="utf-8") as file:
-            file.write(output)
-        self._log_file_info(dst_path)
+    def _shard_index_page(
+        self,
+        rendered: List[str],
+        before: Dict[str, List[str]],
+        shards: Dict[str, List[str]],
+        dst_dir: str,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the arguments for rendering the index of shards, if it needs rendering.
+        """
+        index_path = os.path.join(dst_dir, "index.html")
+        if (
+            not rendered
+            and before.keys() == shards.keys()
+            and os.path.exists(index_path)
+        ):
+            return None
+        return {
+            "title": str(self.config["notebook_name"]),
+            "dst_path": index_path,
+            "log": False,
+            "intro": index_text(shards),
+        }
+
+    def _finish_shards(
+        self,
+        manifest: ShardManifest,
+        before: Dict[str, List[str]],
+        dst_dir: str,
+        rows: List[List[str]],
+    ) -> None:
+        """
+        Remove the pages of emptied shards and record what was rendered.
+        """
+        logger = self._make_logger("Rendering")
+        remove_pages(before.keys() - manifest.shards().keys(), dst_dir)
+        self._write_hash_log(rows)
+        manifest.save()
+        logger.info("Finished rendering %s pages.", len(rows))
+
+    def _assign_shards(
+        self, manifest: ShardManifest, changed: List[str], dropped: List[str]
+    ) -> Set[str]:
+        """
+        Update the shard of each changed or dropped note, returning the shards affected.
+        """
+        stale = {manifest.shard_of(x) for x in changed + dropped}
+        manifest.drop(dropped)
+        if changed:
+            # The catalog has each note's date, so the notes themselves aren't read.
+            self.catalog.update(self.files, self.catalog.read_front_matter)
+        dates = self.catalog.dates() if changed else {}
+        for path in changed:
+            shard = shard_key(dates.get(path), manifest.period)
+            manifest.assign(path, self.files[path], shard)
+            stale.add(shard)
+        return {x for x in stale if x is not None}
+
+    def _render_settings(self) -> str:
+        """
+        Digest of everything other than the notes that changes how they're rendered.
+        """
+        parts = [
+            json.dumps(self.config, sort_keys=True, default=str),
+            MarkdownPart.renderer_version(),
+        ]
+        template_dir = os.path.join(self.root_dir, self.template_dir)
+        paths = [
+            os.path.join(template_dir, x) for x in sorted(os.listdir(template_dir))
+        ]
+        for path in paths + [self._working_path("render_changes.json")]:
+            parts.append(calc_sha256(path) if os.path.isfile(path) else "")
+        return calc_text_sha256("\n".join(parts))
+
+    def _try_render_project(
+        self,
+        project_name: str,
+        dst_path: str,
+        notes: Optional[List[MarkdownPart]] = None,
+    ) -> Union[List[str], Exception]:
+        """
+        Render a project, returning its hash log entry or the exception it raised.
+
+        The project's entries are extracted from the notebook unless they're given.
+        """
+        try:
+            if notes is None:
+                notes = self.extract_project(project_name)
+            return self._render(
+                notes=notes,
+                title=project_name,
+                dst_path=dst_path,
+                log=False,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            return err
+
+    async def _try_render_project_async(
+        self, project_name: str, dst_path: str, *, pool: Optional["aio.IOPool"] = None
+    ) -> Union[List[str], Exception]:
+        """
+        Render a project, returning its hash log entry or the exception it raised.
+        """
+        try:
+            return await self._render_async(
+                notes=self.extract_project(project_name),
+                title=project_name,
+                dst_path=dst_path,
+                log=False,
+                pool=pool,
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            return err
+
+    def _render_projects_parallel(
+        self, jobs: Dict[str, str]
+    ) -> Dict[str, Union[List[str], Exception]]:
+        """
+        Render projects with a pool of worker processes.
+
+        Each job is sent just the entries for its project, and the parent collects the
+        results so that only it writes to the hash log.
+        """
+        logger = self._make_logger("Rendering")
+        logger.debug("Rendering %s projects with %s workers.", len(jobs), self.workers)
+        with concurrent.futures.ProcessPoolExecutor(self.workers) as executor:
+            futures = {
+                x: executor.submit(
+                    _render_project_worker,
+                    self.root_dir,
+                    x,
+                    y,
+                    self.extract_project(x),
+                )
+                for x, y in jobs.items()
+            }
+            results: Dict[str, Union[List[str], Exception]] = {}
+            for this_project, future in futures.items():
+                try:
+                    results[this_project] = future.result()
+                except Exception as err:  # pylint: disable=broad-except
+                    results[this_project] = err
+        return results
+
+    def _render(
+        self,
+        notes: Iterable[MarkdownPart],
+        title: str,
+        dst_path: str,
+        *,
+        log: bool = True,
+        stream: bool = True,
+        intro: str = "",
+    ) -> List[str]:
+        """
+        Render notes to a HTML file, returning its entry for the hash log.
+
+        Notes are converted to HTML in batches as they're consumed, and unless
+        `stream` is false the page is written out as it's rendered rather than built
+        up in memory first. It's written to a temporary file that only replaces
+        `dst_path` once it's finished, so a failed render leaves the last good page in
+        place. The entry is only written to the hash log if `log` is true.
+        Any `intro` (markdown) goes between the title and the notes.
+
+        The "render" phase is the total for the page, including the phases for reading,
+        converting, correcting, templating, hashing and writing it that run inside it.
+        """
+        logger = self._make_logger("Rendering")
+        with profiling.phase("render"):
+            chunks = self._page_chunks(notes, title, stream=stream, intro=intro)
+            logger.debug("Writing to disk.")
+            os.makedirs(os.path.split(dst_path)[0], exist_ok=True)
+            with replacing_file(dst_path) as file:
+                writer = HashingWriter(file)
+                for chunk in chunks:
+                    writer.write(chunk)
+        return self._rendered(dst_path, writer.hasher.hexdigests(), log)
+
+    async def _render_async(
+        self,
+        notes: Iterable[MarkdownPart],
+        title: str,
+        dst_path: str,
+        *,
+        log: bool = True,
+        stream: bool = True,
+        pool: Optional["aio.IOPool"] = None,
+        intro: str = "",
+    ) -> List[str]:
+        """
+        Render notes to a HTML file (see `_render`), writing from an I/O pool.
+
+        The page is written a batch at a time, each batch being written while the next
+        is rendered. Uses its own I/O pool unless one is given.
+        """
+        if pool is None:
+            async with self._io_pool() as pool:
+                return await self._render_async(
+                    notes,
+                    title,
+                    dst_path,
+                    log=log,
+                    stream=stream,
+                    pool=pool,
+                    intro=intro,
+                )
+
+        logger = self._make_logger("Rendering")
+        with profiling.phase("render"):
+            chunks = self._page_chunks(notes, title, stream=stream, intro=intro)
+            logger.debug("Writing to disk.")
+            os.makedirs(os.path.split(dst_path)[0], exist_ok=True)
+            digests = await pool.write(dst_path, chunks)
+        return self._rendered(dst_path, digests, log)
+
+    def _page_chunks(
+        self,
+        notes: Iterable[MarkdownPart],
+        title: str,
+        *,
+        stream: bool,
+        intro: str,
+    ) -> Iterable[str]:
+        """
+        Render the page for some notes, giving the HTML a piece at a time if streaming.
+
+        Rendering the page template around the notes is profiled as "template". That
+        only includes converting the notes if the page can't be streamed.
+        """
+        logger = self._make_logger("Rendering")
+        document = HtmlDocument(
+            f"# {title}\n\n{intro}" if intro else f"# {title}",
+            fragments=self.fragments,
+            corrections=CorrectionSet(
+                read_json(self._working_path("render_changes.json"))
+            ),
+        )
+        if self.config.get("render_backlinks", False):
+            notes = self._with_backlinks(notes)
+        document.stream_parts(notes)
+
+        logger.debug("Rendering template")
+        with profiling.phase("template"):
+            template = self.env.get_template("page.html")
+            page = None
+            if stream:
+                page = _split_page(template, document, {**self.config, "title": title})
+            if page is None:
+                return [template.render(**self.config, document=document, title=title)]
+        return itertools.chain([page[0]], document.html_chunks(), [page[1]])
+
+    def _rendered(self, dst_path: str, digests: Dict[str, str], log: bool) -> List[str]:
+        """Get the hash log entry for a rendered file, logging it if `log` is true."""
+        logger = self._make_logger("Rendering")
+        file_info = self._file_info(dst_path, digests)
+        if log:
+            self._write_hash_log([file_info])
         logger.debug("Finished rendering.")
+        return file_info
+
+    def _file_info(
+        self, file_path: str, digests: Optional[Dict[str, str]] = None
+    ) -> List[str]:
+        """
+        Collates information about a file (called after rendering an output).
 
-    def _log_file_info(self, file_path: str) -> None:
-        """Logs information about a file (called after rendering an output)."""
+        If the file's digests were worked out while writing it they can be provided,
+        otherwise the file is read to calculate them.
+        """
         logger = self._make_logger()
         logger.debug("Collating information on %s.", file_path)
-        dst_path = self._working_path("hash_log.csv")
+        if digests is None:
+            digests = calc_digests(file_path)
         file_info = os.stat(file_path)
         output = [
             '"' + os.path.relpath(file_path, self.root_dir) + '"',
             datetime.datetime.fromtimestamp(file_info.st_mtime).isoformat(),
-            calc_sha256(file_path),
-            calc_md5(file_path),
+            digests["sha256"],
+            digests["md5"],
             str(file_info.st_size),
         ]
-        with open(dst_path, mode="a", encoding="utf-8") as file:
-            file.write(",".join(output) + "\n")
         logger.debug("SHA256 was %s.", output[2])
+        return output
+
+    def _write_hash_log(self, rows: List[List[str]]) -> None:
+        """Append file information to the hash log."""
+        if not rows:
+            return
+        dst_path = self._working_path("hash_log.csv")
+        with open(dst_path, mode="a", encoding="utf-8") as file:
+            for row in rows:
+                file.write(",".join(row) + "\n")
+
+
+# The notebook used by each worker process when rendering in parallel.
+_WORKER_NOTEBOOK: Optional[Notebook] = None
+
+
+def _render_project_worker(
+    notebook_dir: str, project_name: str, dst_path: str, notes: List[MarkdownPart]
+) -> Union[List[str], Exception]:
+    """
+    Render a single project in a worker process.
+
+    The worker's copy of the notebook is made for its first project, and never reads
+    any notes itself.
+    """
+    global _WORKER_NOTEBOOK  # pylint: disable=global-statement
+    if _WORKER_NOTEBOOK is None or _WORKER_NOTEBOOK.root_dir != notebook_dir:
+        _WORKER_NOTEBOOK = Notebook(notebook_dir, workers=1)
+    # pylint: disable=protected-access
+    return _WORKER_NOTEBOOK._try_render_project(project_name, dst_path, notes)
+
+
+class _DocumentPlaceholder:  # pylint: disable=too-few-public-methods
+    """
+    Stands in for a document when rendering a page, marking where its HTML goes.
+
+    Anything other than the HTML itself is taken from the real document.
+    """
+
+    def __init__(self, document: MarkdownPart, marker: str) -> None:
+        self._document = document
+        self._marker = marker
+
+    def html(self) -> str:
+        """Give the marker in place of the document's HTML."""
+        return self._marker
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._document, name)
+
+
+def _split_page(
+    template: "jinja2.Template", document: MarkdownPart, context: Dict[str, Any]
+) -> Optional[Tuple[str, str]]:
+    """
+    Render a page template around a document, split where the document's HTML goes.
+
+    Returns None if the page can't be split (e.g. the template includes the document
+    more than once), in which case it needs to be rendered in one go.
+    """
+    marker = f"<!-- tidynotes:{uuid.uuid4().hex} -->"
+    page = template.render(
+        **context, document=_DocumentPlaceholder(document, marker)
+    ).split(marker)
+    if len(page) != 2:
+        return None
+    return page[0], page[1]
+
+
+def _range_label(start: Optional[datetime.date], end: Optional[datetime.date]) -> str:
+    """Describe a range of dates, e.g. for the name of a file rendered from it."""
+    if start is None:
+        return f"to {end}"
+    if end is None:
+        return f"from {start}"
+    return f"{start} to {end}"
 
 
 def write_json(data: Dict[str, Any], path: str) -> None:
@@ -342,27 +1567,3 @@ def read_json(path: str) -> Dict[str, Any]:
             return json.load(file)
     else:
         return {}
-
-
-def calc_sha256(path: str, buffer_size: int = 65536) -> str:
-    "Calculates the SHA256 of a file."
-    algorithm = hashlib.sha256()
-    with open(path, "rb") as file_in:
-        while True:
-            data = file_in.read(buffer_size)
-            if not data:
-                break
-            algorithm.update(data)
-    return algorithm.hexdigest()
-
-
-def calc_md5(path: str, buffer_size: int = 65536) -> str:
-    "Calculates the MD5 of a file."
-    algorithm = hashlib.md5()
-    with open(path, "rb") as file_in:
-        while True:
-            data = file_in.read(buffer_size)
-            if not data:
-                break
-            algorithm.update(data)
-    return algorithm.hexdigest()
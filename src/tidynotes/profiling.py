@@ -0,0 +1,137 @@
+"""
+Timings and counters for each phase of work, e.g. parsing or rendering.
+
+Profiling is off unless turned on with `profile`, in which case every phase run in
+the process is recorded:
+
+    with profile() as profiler:
+        notebook.render_full()
+    print(profiler.report())
+
+Phases can be nested, each phase's time includes any phases inside it.
+"""
+
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Called with the name, duration (in seconds) and counters of each phase as it ends.
+Hook = Callable[[str, float, Dict[str, int]], None]
+
+# Counters recorded for every phase.
+COUNTERS = ["bytes_read", "bytes_written", "notes"]
+
+
+class Profiler:
+    """
+    Collects the total time, calls and counters of each phase.
+    """
+
+    def __init__(self, hooks: Optional[List[Hook]] = None) -> None:
+        self.hooks = list(hooks or [])
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration: float, counters: Dict[str, int]) -> None:
+        """
+        Add a finished phase to the totals.
+        """
+        with self._lock:
+            totals = self.phases.get(name)
+            if totals is None:
+                totals = self.phases[name] = {"calls": 0, "time": 0.0}
+                totals.update({x: 0 for x in COUNTERS})
+            totals["calls"] += 1
+            totals["time"] += duration
+            for counter, value in counters.items():
+                totals[counter] = totals.get(counter, 0) + value
+        for hook in self.hooks:
+            hook(name, duration, counters)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the totals for each phase, slowest first, as a JSON-friendly dictionary.
+        """
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda x: -x[1]["time"])
+            return {
+                "total_time": time.perf_counter() - self.started,
+                "phases": {x: dict(y) for x, y in phases},
+            }
+
+
+class Phase:
+    """
+    Times a phase of work, recording it with a profiler when the phase ends.
+
+    Counters that aren't known until part-way through can be added with `add`.
+    """
+
+    __slots__ = ("profiler", "name", "counters", "start")
+
+    def __init__(self, profiler: Profiler, name: str, counters: Dict[str, int]):
+        self.profiler = profiler
+        self.name = name
+        self.counters = counters
+        self.start = 0.0
+
+    def add(self, **counters: int) -> None:
+        """Add to the counters for the phase."""
+        for counter, value in counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def __enter__(self) -> "Phase":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        duration = time.perf_counter() - self.start
+        self.profiler.record(self.name, duration, self.counters)
+
+
+class _NullPhase:
+    """Stands in for a phase when profiling is off, doing nothing."""
+
+    def add(self, **counters: int) -> None:
+        """Ignore any counters."""
+
+    def __enter__(self) -> "_NullPhase":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+_ACTIVE: Optional[Profiler] = None
+
+
+def phase(name: str, **counters: int) -> Any:
+    """
+    Time a phase of work (as a context manager), if profiling is turned on.
+    """
+    if _ACTIVE is None:
+        return _NULL_PHASE
+    return Phase(_ACTIVE, name, counters)
+
+
+@contextlib.contextmanager
+def profile(hooks: Optional[List[Hook]] = None) -> Iterator[Profiler]:
+    """
+    Turn on profiling for the duration of the context.
+
+    If profiling is already on, the existing profiler is used (with any new hooks
+    added to it).
+    """
+    global _ACTIVE  # pylint: disable=global-statement
+    if _ACTIVE is not None:
+        _ACTIVE.hooks.extend(hooks or [])
+        yield _ACTIVE
+        return
+    _ACTIVE = Profiler(hooks)
+    try:
+        yield _ACTIVE
+    finally:
+        _ACTIVE = None
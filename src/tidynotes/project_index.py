@@ -0,0 +1,114 @@
+"""
+Index of the projects and tasks in a set of notes.
+"""
+
+import bisect
+import itertools
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from .corrections import is_literal
+from .mardown_document import MarkdownPart
+
+# A part found in the index - its position, the note it's in and the part itself.
+IndexEntry = Tuple[int, int, MarkdownPart, MarkdownPart]
+
+
+class ProjectIndex:
+    """
+    An index of every titled part in a set of notes, built in a single pass.
+
+    Lookups by title pattern give the same results, in the same order, as calling
+    `MarkdownPart.extract_parts` on each note in turn. Patterns without any regex
+    syntax are looked up directly, as `re.match` only needs the title to start with
+    them. Other patterns are only checked once against each distinct title.
+    """
+
+    def __init__(self, notes: List[MarkdownPart]) -> None:
+        self.notes = notes
+        self.projects: List[str] = []
+        self.tasks: List[str] = []
+        self._by_title: Dict[str, List[IndexEntry]] = {}
+        # Parts that `MarkdownPart.replace_title` could reach, with their parents.
+        self._by_level: Dict[int, List[Tuple[MarkdownPart, MarkdownPart]]] = {}
+
+        projects: Set[Optional[str]] = set()
+        tasks: Set[Optional[str]] = set()
+        for note_no, this_note in enumerate(self.notes):
+            projects.update(x.title for x in this_note.parts)
+            for this_project in this_note.parts:
+                tasks.update(x.title for x in this_project.parts)
+            if this_note.title is not None:
+                self._by_level.setdefault(this_note.level, []).append(
+                    (this_note, this_note)
+                )
+            self._add_parts(note_no, this_note, this_note, this_note.title is not None)
+
+        self.projects = sorted(x for x in projects if x is not None)
+        self.tasks = sorted(x for x in tasks if x is not None)
+        self._titles = sorted(self._by_title)
+
+    def _add_parts(
+        self,
+        note_no: int,
+        note: MarkdownPart,
+        parent: MarkdownPart,
+        reachable: bool,
+        count: int = 0,
+    ) -> int:
+        """
+        Add the sub-sections of a part to the index, returning the number seen so far.
+
+        Parts are `reachable` if all of their parents have titles.
+        """
+        for part in parent.parts:
+            if part.title is not None:
+                self._by_title.setdefault(part.title, []).append(
+                    (note_no, count, note, part)
+                )
+            if reachable:
+                self._by_level.setdefault(part.level, []).append((part, parent))
+            count = self._add_parts(
+                note_no, note, part, reachable and part.title is not None, count + 1
+            )
+        return count
+
+    def find(self, pattern: str) -> List[Tuple[MarkdownPart, MarkdownPart]]:
+        """
+        Find all parts with a title matching the pattern (using `re.match`).
+
+        Returns each matching part along with the note it came from.
+        """
+        if is_literal(pattern):
+            titles = []
+            start = bisect.bisect_left(self._titles, pattern)
+            for title in itertools.islice(self._titles, start, None):
+                if not title.startswith(pattern):
+                    break
+                titles.append(title)
+        else:
+            compiled = re.compile(pattern)
+            titles = [x for x in self._titles if compiled.match(x)]
+
+        entries: List[IndexEntry] = []
+        for title in titles:
+            entries.extend(self._by_title[title])
+        entries.sort(key=lambda x: (x[0], x[1]))
+        return [(x[2], x[3]) for x in entries]
+
+    def replace_titles(self, replacements: Dict[str, str], level: int) -> int:
+        """
+        Replace the titles of parts at a level using a dictionary map.
+
+        Equivalent to calling `MarkdownPart.replace_title` on each note. Returns the
+        number of titles that were changed, as the index is out of date if any were.
+        """
+        changed = 0
+        for part, parent in self._by_level.get(level, []):
+            if part.title is None or parent.title is None:
+                continue
+            title = replacements.get(part.title, part.title)
+            if title != part.title:
+                part.title = title
+                changed += 1
+        return changed
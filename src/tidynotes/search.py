@@ -0,0 +1,153 @@
+"""
+Full-text search over the notes in a notebook.
+"""
+
+import sqlite3
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from . import storage
+from .file_index import FileIndex
+from .mardown_document import MarkdownPart
+from .note_cache import FileStat
+
+# Bump this whenever the layout of the index or what's indexed changes.
+SEARCH_VERSION = 1
+
+# A row of the index - heading, project, task, date and body text.
+SectionRow = Tuple[str, str, str, str, str]
+
+
+class SearchResult(NamedTuple):
+    """A section of a note matching a search."""
+
+    path: str
+    heading: str
+    project: str
+    task: str
+    date: str
+    snippet: str
+    score: float
+
+
+class SearchIndex(FileIndex):
+    """
+    A full-text index of every section of every note, stored with SQLite FTS5.
+
+    Each section is indexed with its heading, the project and task it's under, the
+    date the note is for and its own body text. Files are only re-indexed when their
+    modification time or size changes.
+    """
+
+    description = "search index"
+
+    def search(self, query: str, limit: int = 20) -> List[SearchResult]:
+        """
+        Find the sections matching a query, best matches first.
+
+        Queries use the FTS5 syntax, e.g. `project:alpha AND "some phrase"`.
+        Matches in headings count for more than those in the body.
+        """
+        with self._connect() as connection:
+            try:
+                rows = connection.execute(
+                    "SELECT sections.path, heading, project, task, date,"
+                    " snippet(search, 4, '[', ']', '...', 12),"
+                    " bm25(search, 5.0, 3.0, 3.0, 1.0, 1.0) AS score"
+                    " FROM search JOIN sections ON sections.id = search.rowid"
+                    " WHERE search MATCH ? ORDER BY score LIMIT ?",
+                    (query, limit),
+                ).fetchall()
+            except sqlite3.OperationalError as err:
+                raise ValueError(f'Invalid search "{query}": {err}') from err
+        return [SearchResult(*x) for x in rows]
+
+    def clear(self) -> None:
+        """
+        Remove everything from the index.
+        """
+        with self._connect() as connection:
+            for table in ["search", "sections", "files"]:
+                connection.execute(f"DELETE FROM {table}")
+
+    def _remove(self, connection: sqlite3.Connection, paths: List[str]) -> None:
+        """Remove the sections of the specified notes from the index."""
+        for start in range(0, len(paths), 500):
+            chunk = paths[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            connection.execute(
+                "DELETE FROM search WHERE rowid IN"
+                f" (SELECT id FROM sections WHERE path IN ({placeholders}))",
+                chunk,
+            )
+            connection.execute(
+                f"DELETE FROM sections WHERE path IN ({placeholders})", chunk
+            )
+            connection.execute(
+                f"DELETE FROM files WHERE path IN ({placeholders})", chunk
+            )
+
+    def _add(
+        self,
+        connection: sqlite3.Connection,
+        notes: Iterable[MarkdownPart],
+        stats: Dict[str, FileStat],
+    ) -> None:
+        """Add the sections of freshly read notes to the index."""
+        for note in notes:
+            path = note.meta[".file"]["path"]
+            for row in _note_sections(note):
+                cursor = connection.execute(
+                    "INSERT INTO sections (path) VALUES (?)", (path,)
+                )
+                connection.execute(
+                    "INSERT INTO search (rowid, heading, project, task, date, body)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, *row),
+                )
+            connection.execute(
+                "INSERT OR REPLACE INTO files (path, mtime, size) VALUES (?, ?, ?)",
+                (path, *stats[path]),
+            )
+
+    def _prepare_database(self, connection: sqlite3.Connection) -> None:
+        """
+        Create the index tables if needed, emptying them if they're out of date.
+        """
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS files"
+            " (path TEXT PRIMARY KEY, mtime REAL, size INTEGER)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS sections (id INTEGER PRIMARY KEY, path TEXT)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS sections_path ON sections (path)"
+        )
+        connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5"
+            " (heading, project, task, date, body, tokenize = 'unicode61')"
+        )
+        storage.check_version(
+            connection, str(SEARCH_VERSION), ["search", "sections", "files"]
+        )
+
+
+def _note_sections(note: MarkdownPart) -> List[SectionRow]:
+    """
+    Split a note into the rows to index, one for each section.
+    """
+    date = str(note.meta.get("note_for", ""))
+    output = []
+
+    def add_section(part: MarkdownPart, project: str, task: str) -> None:
+        output.append((part.title or "", project, task, date, part.body))
+        for sub_part in part.parts:
+            if sub_part.level == 2:
+                add_section(sub_part, sub_part.title or "", "")
+            elif sub_part.level == 3:
+                add_section(sub_part, project, sub_part.title or "")
+            else:
+                add_section(sub_part, project, task)
+
+    add_section(note, "", "")
+    return output
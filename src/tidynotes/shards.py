@@ -0,0 +1,148 @@
+"""
+Splitting the rendered notebook into a page per period (e.g. a month) of notes.
+"""
+
+import datetime
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .note_cache import FileStat
+
+SHARD_VERSION = 1
+
+# How notes' dates are turned into the name of the shard they go in.
+PERIODS = {"month": "%Y-%m", "year": "%Y"}
+
+# Shard for notes without a date.
+UNDATED = "undated"
+
+
+def shard_key(date: Optional[datetime.date], period: str) -> str:
+    """Get the name of the shard for notes on a date."""
+    return UNDATED if date is None else date.strftime(PERIODS[period])
+
+
+class ShardManifest:
+    """
+    Record of which shard each note was rendered into, kept as JSON.
+
+    Each note's stat info is recorded when its shard is rendered, so only shards
+    holding new, changed or deleted notes need rendering again. Everything is
+    rendered again if the period or `settings` (a digest of anything else that
+    changes the output, e.g. templates) are different to last time.
+    """
+
+    def __init__(self, path: str, period: str, settings: str) -> None:
+        if period not in PERIODS:
+            raise ValueError(
+                f'Unknown shard period "{period}", expected one of {list(PERIODS)}.'
+            )
+        self.path = path
+        self.period = period
+        self.settings = settings
+        self.notes: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if (data.get("version"), data.get("period"), data.get("settings")) == (
+                SHARD_VERSION,
+                period,
+                settings,
+            ):
+                self.notes = data["notes"]
+
+    def changes(self, stats: Dict[str, FileStat]) -> Tuple[List[str], List[str]]:
+        """
+        Find notes that are new or changed since they were rendered, and those dropped.
+        """
+        changed = [
+            x
+            for x, y in stats.items()
+            if x not in self.notes or tuple(self.notes[x]["stat"]) != tuple(y)
+        ]
+        dropped = [x for x in self.notes if x not in stats]
+        return changed, dropped
+
+    def shard_of(self, path: str) -> Optional[str]:
+        """Get the shard a note was last rendered into."""
+        entry = self.notes.get(path)
+        return None if entry is None else str(entry["shard"])
+
+    def assign(self, path: str, stat: FileStat, shard: str) -> None:
+        """Record the shard a note is rendered into."""
+        self.notes[path] = {"stat": list(stat), "shard": shard}
+
+    def drop(self, paths: Iterable[str]) -> None:
+        """Forget about notes that no longer exist."""
+        for path in paths:
+            self.notes.pop(path, None)
+
+    def shards(self) -> Dict[str, List[str]]:
+        """Get the paths of the notes in each shard, both sorted."""
+        output: Dict[str, List[str]] = {}
+        for path in sorted(self.notes):
+            output.setdefault(self.notes[path]["shard"], []).append(path)
+        return dict(sorted(output.items(), key=lambda x: (x[0] == UNDATED, x[0])))
+
+    def save(self) -> None:
+        """Write the manifest to disk."""
+        data = {
+            "version": SHARD_VERSION,
+            "period": self.period,
+            "settings": self.settings,
+            "notes": self.notes,
+        }
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+
+def navigation(shards: List[str], current: str) -> str:
+    """
+    Make the links at the top of a shard's page (to the index, previous & next).
+    """
+    position = shards.index(current)
+    links = ["[Index](index.html)"]
+    if position > 0:
+        links.append(f"[« {shards[position - 1]}]({shards[position - 1]}.html)")
+    if position < len(shards) - 1:
+        links.append(f"[{shards[position + 1]} »]({shards[position + 1]}.html)")
+    return " | ".join(links)
+
+
+def index_text(shards: Dict[str, List[str]]) -> str:
+    """Make the markdown listing each shard, for the index page."""
+    lines = []
+    for shard, paths in shards.items():
+        count = f"{len(paths)} note{'' if len(paths) == 1 else 's'}"
+        lines.append(f"* [{shard}]({shard}.html) - {count}")
+    return "\n".join(lines)
+
+
+def outdated_pages(before: List[str], after: List[str], dst_dir: str) -> Set[str]:
+    """
+    Find the shards whose pages are missing, or link to different shards either side.
+
+    `before` and `after` are the shards before and after any notes were changed.
+    """
+    linked = _neighbours(before)
+    return {
+        x
+        for x, y in _neighbours(after).items()
+        if linked.get(x) != y or not os.path.exists(os.path.join(dst_dir, f"{x}.html"))
+    }
+
+
+def remove_pages(shards: Iterable[str], dst_dir: str) -> None:
+    """Delete the pages of shards that no longer have any notes."""
+    for shard in shards:
+        path = os.path.join(dst_dir, f"{shard}.html")
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _neighbours(shards: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """Get the shards either side of each shard."""
+    padded: List[Optional[str]] = [None, *shards, None]
+    return {x: (padded[y], padded[y + 2]) for y, x in enumerate(shards)}
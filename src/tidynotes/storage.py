@@ -0,0 +1,92 @@
+"""
+Helpers for the SQLite databases kept in a notebook's working directory.
+"""
+
+import contextlib
+import logging
+import os
+import sqlite3
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from .logs import LOG_NAME
+
+
+@contextlib.contextmanager
+def connect(
+    path: str, prepare: Callable[[sqlite3.Connection], None]
+) -> Iterator[sqlite3.Connection]:
+    """
+    Open a database of derived data, rebuilding it from scratch if it's unreadable.
+
+    `prepare` is called on every new connection (e.g. to create tables). Changes are
+    committed and the connection closed on exit.
+    """
+    logger = logging.getLogger(LOG_NAME)
+    os.makedirs(os.path.split(path)[0], exist_ok=True)
+    try:
+        connection = _open_database(path, prepare)
+    except sqlite3.OperationalError:
+        # Locked or otherwise unavailable, rather than corrupt.
+        raise
+    except sqlite3.DatabaseError:
+        logger.warning('Database "%s" is unreadable - rebuilding.', path)
+        os.remove(path)
+        connection = _open_database(path, prepare)
+    try:
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def check_version(
+    connection: sqlite3.Connection, version: str, tables: List[str]
+) -> None:
+    """
+    Record the version of a database, emptying the tables if the version changed.
+    """
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)"
+    )
+    row = connection.execute("SELECT value FROM info WHERE key = 'version'").fetchone()
+    if row is None or row[0] != version:
+        for table in tables:
+            connection.execute(f"DELETE FROM {table}")
+        connection.execute(
+            "INSERT OR REPLACE INTO info (key, value) VALUES ('version', ?)",
+            (version,),
+        )
+
+
+def changed_files(
+    connection: sqlite3.Connection, table: str, stats: Dict[str, Tuple[float, int]]
+) -> Tuple[List[str], List[str]]:
+    """
+    Compare the files recorded in a table against their current stat info.
+
+    The table needs "path", "mtime" and "size" columns. Returns the paths that are
+    new or modified, and those that are no longer in `stats`.
+    """
+    recorded = {
+        x: (y, z)
+        for x, y, z in connection.execute(f"SELECT path, mtime, size FROM {table}")
+    }
+    changed = [x for x, y in stats.items() if recorded.get(x) != y]
+    dropped = [x for x in recorded if x not in stats]
+    return changed, dropped
+
+
+def _open_database(
+    path: str, prepare: Callable[[sqlite3.Connection], None]
+) -> sqlite3.Connection:
+    """
+    Connect to a database, making sure it's ready for use.
+    """
+    connection = sqlite3.connect(path, timeout=60)
+    try:
+        with connection:
+            prepare(connection)
+    except sqlite3.DatabaseError:
+        connection.close()
+        raise
+    return connection
@@ -0,0 +1,188 @@
+"""
+Watching a notebook for changes, updating its outputs as notes are edited.
+"""
+
+import glob
+import logging
+import os
+import stat
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from .logs import LOG_NAME
+from .note_cache import FileStat
+from .notebook import Notebook
+
+# Files in the working directory that change what's produced from the notes.
+RULE_FILES = ["corrections.json", "projects.json", "tasks.json", "render_changes.json"]
+
+
+class NotebookWatcher:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps a notebook in memory, updating it and its outputs when files change.
+
+    The notes, templates and rule files are polled every `interval` seconds. Once a
+    set of changes has stayed the same for `debounce` seconds (so a burst of saves is
+    handled once), only the changed notes are re-read. The changed notes are then
+    cleaned if `clean` is set, and the outputs re-rendered: the full notebook if
+    `render_full` is set, any changed shards (see `Notebook.render_shards`) if
+    `render_shards` is set and the projects in the changed notes if `render_projects`
+    is set. The pages of projects no longer in any note are removed. Changes to
+    templates or rules re-render every project (and re-clean every note).
+
+    If updating fails (e.g. a cache is locked, or a note was read part-way through
+    being saved) the changes are still pending, so they're tried again on the next
+    poll. The error is only logged in full the first time it happens.
+    """
+
+    def __init__(
+        self,
+        notebook: Notebook,
+        *,
+        clean: bool = False,
+        render_full: bool = True,
+        render_projects: bool = False,
+        render_shards: bool = False,
+        shard_period: Optional[str] = None,
+        interval: float = 1.0,
+        debounce: float = 0.5,
+    ) -> None:
+        self.notebook = notebook
+        self.clean = clean
+        self.render_full = render_full
+        self.render_projects = render_projects
+        self.render_shards = render_shards
+        self.shard_period = shard_period
+        self.interval = interval
+        self.debounce = debounce
+
+        _ = self.notebook.notes
+        self._known = self._snapshot()
+        self._pending: Optional[Dict[str, FileStat]] = None
+        self._pending_since = 0.0
+        self._last_error: Optional[str] = None
+
+    def run(self, cycles: Optional[int] = None) -> None:
+        """
+        Watch the notebook until interrupted (or for a set number of polls).
+        """
+        logger = logging.getLogger(LOG_NAME)
+        logger.info('Watching "%s" for changes.', self.notebook.root_dir)
+        count = 0
+        try:
+            while cycles is None or count < cycles:
+                try:
+                    if self.check():
+                        self._last_error = None
+                except Exception as err:  # pylint: disable=broad-except
+                    # The changes haven't been marked as handled, so are retried.
+                    error = f"{type(err).__name__}: {err}"
+                    if error == self._last_error:
+                        logger.debug("Still failing to update the notebook: %s", error)
+                    else:
+                        logger.exception("Failed to update the notebook.")
+                    self._last_error = error
+                count += 1
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+        logger.info("Stopped watching.")
+
+    def check(self) -> bool:
+        """
+        Poll for changes, updating the notebook if they've settled.
+
+        Returns true if the notebook was updated.
+        """
+        current = self._snapshot()
+        if current == self._known:
+            self._pending = None
+            return False
+        now = time.monotonic()
+        if current != self._pending:
+            self._pending = current
+            self._pending_since = now
+            if self.debounce > 0:
+                return False
+        elif now - self._pending_since < self.debounce:
+            return False
+
+        changed = {
+            x
+            for x in set(current) | set(self._known)
+            if current.get(x) != self._known.get(x)
+        }
+        self._update(changed)
+        self._pending = None
+        # Anything written while updating (e.g. cleaned notes) isn't a new change.
+        self._known = self._snapshot()
+        return True
+
+    def _update(self, changed: Set[str]) -> None:
+        """Update the notebook and re-render its outputs after files have changed."""
+        logger = logging.getLogger(LOG_NAME)
+        note_dir = os.path.join(self.notebook.root_dir, self.notebook.note_dir)
+        notes = {x for x in changed if x.startswith(note_dir + os.sep)}
+        logger.info(
+            "%s notes and %s other files changed.", len(notes), len(changed - notes)
+        )
+
+        projects = self._projects_in(notes)
+        self.notebook.reload_notes(notes)
+        if self.clean:
+            self.notebook.clean(paths=notes)
+        projects.update(self._projects_in(notes))
+
+        if self.render_full:
+            self.notebook.render_full()
+        if self.render_shards:
+            self.notebook.render_shards(self.shard_period)
+        if not self.render_projects:
+            return
+        if changed - notes:
+            self.notebook.render_all_projects()
+            return
+        remaining = set(self.notebook.project_index.projects)
+        output_dir = os.path.join(self.notebook.root_dir, self.notebook.output_dir)
+        for project in sorted(projects):
+            if project in remaining:
+                self.notebook.render_project(project)
+                continue
+            dst_path = os.path.join(output_dir, f"{project}.html")
+            if os.path.exists(dst_path):
+                logger.info('Removing "%s", it\'s no longer in any note.', dst_path)
+                os.remove(dst_path)
+
+    def _projects_in(self, paths: Iterable[str]) -> Set[str]:
+        """Find the projects in the loaded copies of specific notes."""
+        paths = set(paths)
+        output: Set[str] = set()
+        for this_note in self.notebook.notes:
+            if this_note.meta[".file"]["path"] in paths:
+                output.update(x.title for x in this_note.parts if x.title is not None)
+        return output
+
+    def _snapshot(self) -> Dict[str, FileStat]:
+        """Get the stat info of every file that's watched."""
+        root_dir = self.notebook.root_dir
+        paths = glob.glob(
+            os.path.join(root_dir, self.notebook.note_dir, "**", "*.md"), recursive=True
+        )
+        paths.extend(
+            glob.glob(
+                os.path.join(root_dir, self.notebook.template_dir, "**"), recursive=True
+            )
+        )
+        paths.extend(
+            os.path.join(root_dir, self.notebook.working_dir, x) for x in RULE_FILES
+        )
+        output = {}
+        for path in paths:
+            try:
+                file_info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if stat.S_ISDIR(file_info.st_mode):
+                continue
+            output[path] = (file_info.st_mtime, file_info.st_size)
+        return output
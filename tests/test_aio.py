@@ -0,0 +1,119 @@
+# pylint: disable=unused-import, redefined-outer-name
+"""
+Tests for overlapping file I/O with asyncio.
+"""
+
+import datetime
+import os
+import threading
+import time
+from typing import List
+
+import pytest
+import tidynotes
+from tidynotes import aio
+from tidynotes.hashing import calc_digests
+
+from .fixtures import test_notebook
+
+
+def test_pool_overlaps_calls() -> None:
+    """Test that blocking calls run at the same time, up to the limit."""
+    running: List[int] = []
+    peak: List[int] = [0]
+    lock = threading.Lock()
+
+    def slow(value: int) -> int:
+        with lock:
+            running.append(value)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(value)
+        return value * 2
+
+    async def main() -> List[int]:
+        async with aio.IOPool(4) as pool:
+            return await pool.map(slow, range(16))
+
+    assert aio.run(main()) == [x * 2 for x in range(16)]
+    assert peak[0] == 4
+
+
+def test_run_inside_loop(test_notebook: tidynotes.Notebook) -> None:
+    """Test that the synchronous methods still work when called from async code."""
+    test_notebook.make_series(2, datetime.datetime(year=2021, month=1, day=1))
+    test_notebook.refresh()
+
+    async def main() -> int:
+        return len(test_notebook.read_notes())
+
+    assert aio.run(main()) == 2
+
+
+def test_async_methods(test_notebook: tidynotes.Notebook) -> None:
+    """Test that the async methods give the same results as the synchronous ones."""
+    test_notebook.config["io_concurrency"] = 3
+    test_notebook.make_series(5, datetime.datetime(year=2021, month=1, day=1))
+    test_notebook.refresh()
+    expected = [x.combine() for x in test_notebook.notes]
+
+    test_notebook.refresh()
+    notes = aio.run(test_notebook.read_notes_async())
+    assert [x.combine() for x in notes] == expected
+
+    test_notebook.refresh()
+    aio.run(test_notebook.clean_async(incremental=False))
+    cleaned = [x.combine() for x in test_notebook.read_notes()]
+
+    output_dir = os.path.join(test_notebook.root_dir, "rendered")
+    test_notebook.render_all_projects()
+    test_notebook.render_full()
+    rendered = {
+        x: calc_digests(os.path.join(output_dir, x)) for x in os.listdir(output_dir)
+    }
+    aio.run(test_notebook.render_all_projects_async())
+    aio.run(test_notebook.render_full_async())
+    assert rendered == {
+        x: calc_digests(os.path.join(output_dir, x)) for x in os.listdir(output_dir)
+    }
+
+    test_notebook.refresh()
+    test_notebook.clean(incremental=False)
+    assert [x.combine() for x in test_notebook.notes] == cleaned
+
+
+def test_async_shards(test_notebook: tidynotes.Notebook) -> None:
+    """Test that rendering shards asynchronously gives the same pages."""
+    test_notebook.make_series(3, datetime.datetime(year=2021, month=1, day=30))
+    shard_dir = os.path.join(test_notebook.root_dir, "rendered", "by_month")
+    assert test_notebook.render_shards() == ["2021-01", "2021-02"]
+    rendered = {
+        x: calc_digests(os.path.join(shard_dir, x)) for x in os.listdir(shard_dir)
+    }
+    assert aio.run(test_notebook.render_shards_async(force=True)) == [
+        "2021-01",
+        "2021-02",
+    ]
+    assert rendered == {
+        x: calc_digests(os.path.join(shard_dir, x)) for x in os.listdir(shard_dir)
+    }
+
+
+def test_failed_async_render(test_notebook: tidynotes.Notebook) -> None:
+    """Test that a failed async render leaves the last good page in place."""
+    test_notebook.make_series(3, datetime.datetime(year=2021, month=1, day=1))
+    output_dir = os.path.join(test_notebook.root_dir, "rendered")
+    test_notebook.render_full()
+    rendered = {
+        x: calc_digests(os.path.join(output_dir, x)) for x in os.listdir(output_dir)
+    }
+
+    with open(os.path.join(test_notebook.root_dir, "notes", "broken.md"), "wb") as file:
+        file.write(b"# Broken\n\n\xff\xfe\n")
+    test_notebook.refresh()
+    with pytest.raises(UnicodeDecodeError):
+        aio.run(test_notebook.render_full_async())
+    assert rendered == {
+        x: calc_digests(os.path.join(output_dir, x)) for x in os.listdir(output_dir)
+    }
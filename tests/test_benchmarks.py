@@ -0,0 +1,34 @@
+# pylint: disable=unused-import, redefined-outer-name
+"""
+Tests for the synthetic notebooks used in benchmarks.
+"""
+
+import os
+import tempfile
+
+from benchmarks.synthetic import NotebookSpec, generate_notebook
+
+
+def _read_notes(notebook_dir: str) -> str:
+    """Get the text of all of the notes in a notebook."""
+    output = []
+    for root, _, files in sorted(os.walk(os.path.join(notebook_dir, "notes"))):
+        for name in sorted(files):
+            with open(os.path.join(root, name), encoding="utf-8") as file:
+                output.append(file.read())
+    return "\n".join(output)
+
+
+def test_synthetic_notebook() -> None:
+    """Test that synthetic notebooks have the right shape and are repeatable."""
+    spec = NotebookSpec(notes=5, projects=2, depth=4, body_lines=2, corrections=5)
+    with tempfile.TemporaryDirectory("tidynotes") as working_dir:
+        first = os.path.join(working_dir, "first")
+        notebook = generate_notebook(first, spec)
+        assert len(notebook.notes) == 5
+        assert all(len(x.parts) == 2 for x in notebook.notes)
+        assert notebook.notes[0].parts[0].parts[0].parts[0].level == 4
+
+        second = os.path.join(working_dir, "second")
+        generate_notebook(second, spec)
+        assert _read_notes(first) == _read_notes(second)
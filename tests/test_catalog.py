@@ -0,0 +1,145 @@
+# pylint: disable=unused-import, redefined-outer-name
+"""
+Tests for the catalog of the dates notes are for.
+"""
+
+import datetime
+import os
+
+import pytest
+import tidynotes
+from tidynotes import aio
+from tidynotes.catalog import note_date, path_pattern
+from tidynotes.mardown_document import MarkdownPart
+
+from .fixtures import test_notebook_dir, test_notebook
+
+
+def test_notes_between(test_notebook: tidynotes.Notebook) -> None:
+    """Test that only the notes in a range of dates are read."""
+    test_notebook.make_series(10, datetime.datetime(year=2021, month=1, day=1))
+    paths = list(test_notebook.files)
+    test_notebook.refresh()
+
+    notes = test_notebook.notes_between(
+        datetime.date(year=2021, month=1, day=3),
+        datetime.date(year=2021, month=1, day=5),
+    )
+    assert [x.meta[".file"]["path"] for x in notes] == paths[2:5]
+    assert test_notebook._notes is None  # pylint: disable=protected-access
+    assert len(test_notebook.notes_between(datetime.date(2021, 1, 9))) == 2
+    assert len(test_notebook.notes_between(end=datetime.date(2021, 1, 1))) == 1
+    assert len(test_notebook.notes_between()) == 10
+
+
+def test_front_matter_dates(test_notebook: tidynotes.Notebook) -> None:
+    """Test that notes not named by date are dated from their front matter."""
+    test_notebook.make_note(datetime.datetime(year=2021, month=1, day=1))
+    note_dir = os.path.join(test_notebook.root_dir, "notes")
+    with open(os.path.join(note_dir, "meeting.md"), "w", encoding="utf-8") as file:
+        file.write("---\ntitle: Meeting\nnote_for: 2021-02-01\n---\n# Meeting\n")
+    with open(os.path.join(note_dir, "misc.md"), "w", encoding="utf-8") as file:
+        file.write("# Misc\n")
+
+    test_notebook.update_catalog()
+    dates = test_notebook.catalog.dates()
+    assert dates[os.path.join(note_dir, "meeting.md")] == datetime.date(2021, 2, 1)
+    assert dates[os.path.join(note_dir, "misc.md")] is None
+    assert [
+        x.title for x in test_notebook.notes_between(datetime.date(2021, 2, 1))
+    ] == ["Meeting"]
+
+    os.remove(os.path.join(note_dir, "meeting.md"))
+    test_notebook.update_catalog()
+    assert not test_notebook.notes_between(datetime.date(2021, 2, 1))
+
+
+def test_note_for_first(test_notebook: tidynotes.Notebook) -> None:
+    """Test that "note_for" takes precedence over the date in a note's path."""
+    test_notebook.make_series(2, datetime.datetime(year=2021, month=1, day=31))
+    path = list(test_notebook.files)[0]
+    with open(path, encoding="utf-8") as file:
+        text = file.read()
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text.replace("note_for: 2021-01-31", "note_for: 2021-02-02"))
+    test_notebook.refresh()
+
+    test_notebook.update_catalog()
+    assert test_notebook.catalog.dates()[path] == datetime.date(2021, 2, 2)
+    assert test_notebook.render_shards() == ["2021-02"]
+
+
+def test_render_range(test_notebook: tidynotes.Notebook) -> None:
+    """Test extracting and rendering a project for a range of dates."""
+    test_notebook.make_series(3, datetime.datetime(year=2021, month=1, day=1))
+    for path in test_notebook.files:
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(f"\n## Alpha\n\nWork in {os.path.basename(path)}.\n")
+    test_notebook.refresh()
+    start = datetime.date(year=2021, month=1, day=2)
+
+    extracted = test_notebook.extract_project("Alpha", start)
+    assert len(extracted) == 2
+    assert len(test_notebook.extract_project("Alpha")) == 3
+
+    output_dir = os.path.join(test_notebook.root_dir, "rendered")
+    test_notebook.render_project("Alpha", start=start)
+    test_notebook.render_full(start=start, end=start)
+    assert sorted(os.listdir(output_dir)) == [
+        "Alpha (from 2021-01-02).html",
+        f"{test_notebook.config['notebook_name']} (2021-01-02 to 2021-01-02).html",
+    ]
+
+
+def test_render_range_async(test_notebook: tidynotes.Notebook) -> None:
+    """Test that the async methods give the same ranged outputs as the sync ones."""
+    test_notebook.make_series(3, datetime.datetime(year=2021, month=1, day=1))
+    for path in test_notebook.files:
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(f"\n## Alpha\n\nWork in {os.path.basename(path)}.\n")
+    test_notebook.refresh()
+    start = datetime.date(year=2021, month=1, day=2)
+    output_dir = os.path.join(test_notebook.root_dir, "rendered")
+
+    test_notebook.render_project("Alpha", start=start)
+    test_notebook.render_full(end=start)
+    rendered = {x: _read(os.path.join(output_dir, x)) for x in os.listdir(output_dir)}
+
+    test_notebook.refresh()
+    notes = aio.run(test_notebook.notes_between_async(start))
+    assert [x.meta[".file"]["path"] for x in notes] == list(test_notebook.files)[1:]
+    aio.run(test_notebook.render_project_async("Alpha", start=start))
+    aio.run(test_notebook.render_full_async(end=start))
+    assert rendered == {
+        x: _read(os.path.join(output_dir, x)) for x in os.listdir(output_dir)
+    }
+
+
+def _read(path: str) -> str:
+    """Read the text of a file."""
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def test_note_date() -> None:
+    """Test that dates are taken from each form of "note_for"."""
+    expected = datetime.date(year=2021, month=1, day=2)
+    for value in ["2021-01-02", "2021-01-02 00:00:00"]:
+        assert note_date(MarkdownPart(f"---\ntitle: A\nnote_for: {value}\n---\n")) == (
+            expected
+        )
+    assert note_date(MarkdownPart("---\ntitle: A\nnote_for: '2021-01-02'\n---\n")) == (
+        expected
+    )
+    assert note_date(MarkdownPart("---\ntitle: A\nnote_for: soon\n---\n")) is None
+    assert note_date(MarkdownPart("# A\n")) is None
+
+
+def test_path_pattern() -> None:
+    """Test reading dates back from paths made with a note file format."""
+    pattern = path_pattern("%Y/%m/notes_%Y-%m-%d_%a.md")
+    assert pattern is not None
+    assert pattern.match("2021/01/notes_2021-01-05_Tue.md")
+    assert not pattern.match("2021/01/notes_2020-01-05_Tue.md")
+    assert path_pattern("%Y-%m.md") is None
+    assert path_pattern("%Y%m%d_%Z.md") is None
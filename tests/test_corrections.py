@@ -0,0 +1,65 @@
+"""
+Tests for compiled sets of text corrections.
+"""
+
+import random
+import re
+from typing import Dict
+
+from tidynotes.corrections import CorrectionSet, is_literal
+
+
+def _apply_in_turn(rules: Dict[str, str], text: str, regex: bool = True) -> str:
+    """Apply each rule one at a time, the way MarkdownPart.make_replacement does."""
+    for pattern, replacement in rules.items():
+        if regex:
+            text = re.sub(pattern, replacement, text)
+        else:
+            text = text.replace(pattern, replacement)
+    return text
+
+
+def test_is_literal() -> None:
+    """Check detection of patterns without any regex syntax."""
+    assert is_literal("’")
+    assert is_literal("isn't")
+    assert not is_literal("(“|”)")
+    assert not is_literal("\n{2,}")
+
+
+def test_default_corrections() -> None:
+    """Check the default corrections give the same result as applying them in turn."""
+    rules = {"\n{2,}": "\n\n", "(’|′|ʻ|‘)": "'", "(“|”)": '"'}
+    text = "“Quoted”\n\n\n\nIt’s a ‘test’.\n"
+    assert CorrectionSet(rules).apply(text) == _apply_in_turn(rules, text)
+
+
+def test_chained_literals() -> None:
+    """Check that literal rules feeding into each other keep their order."""
+    rules = {"a": "b", "b": "c", "x": "", "yz": "!"}
+    text = "abc xy yxz"
+    assert CorrectionSet(rules).apply(text) == "ccc y !"
+    assert CorrectionSet(rules).apply(text) == _apply_in_turn(rules, text)
+
+
+def test_random_rules() -> None:
+    """Check random mixes of literal and regex rules against applying them in turn."""
+    generator = random.Random(1234)
+    alphabet = "abcde’ \n"
+    for _ in range(200):
+        rules = {}
+        for _ in range(generator.randint(1, 8)):
+            pattern = "".join(generator.choices(alphabet, k=generator.randint(1, 3)))
+            if generator.random() < 0.2:
+                pattern += "+"
+            replacement = "".join(
+                generator.choices(alphabet, k=generator.randint(0, 2))
+            )
+            rules[pattern] = replacement
+        text = "".join(generator.choices(alphabet, k=60))
+
+        assert CorrectionSet(rules).apply(text) == _apply_in_turn(rules, text)
+        literal_rules = {x.rstrip("+"): y for x, y in rules.items()}
+        assert CorrectionSet(literal_rules, regex=False).apply(text) == _apply_in_turn(
+            literal_rules, text, regex=False
+        )
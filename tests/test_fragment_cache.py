@@ -0,0 +1,77 @@
+# pylint: disable=unused-import, redefined-outer-name
+"""
+Tests for the cache of HTML fragments.
+"""
+
+import os
+from typing import List
+
+import markdown
+from tidynotes.fragment_cache import FragmentCache
+from tidynotes.mardown_document import HtmlDocument, MarkdownPart, RENDERER_EXTENSIONS
+
+from .fixtures import test_notebook_dir
+
+NOTES = [
+    "---\ntitle: A\n---\n# Note A\n\nSome *text* with [a link][ref].\n\n"
+    "## Alpha\n\n* one\n* two\n\n### Task\n\n| a | b |\n|---|---|\n| 1 | 2 |\n",
+    "# Note B\n\n```\ncode\n```\n\n!!! note\n    Remember.\n\n"
+    "[ref]: http://example.com\n",
+]
+
+
+def _counting_cache(path: str, converted: List[str], max_size: int) -> FragmentCache:
+    """Make a cache that records each text it has to convert."""
+
+    def convert(text: str) -> str:
+        converted.append(text)
+        return MarkdownPart.markdown_to_html(text)
+
+    return FragmentCache(path, convert=convert, version="test", max_size=max_size)
+
+
+def test_fragments_reused(test_notebook_dir: str) -> None:
+    """Check fragments are only converted once, including across instances."""
+    path = os.path.join(test_notebook_dir, "fragments.sqlite")
+    converted: List[str] = []
+    texts = ["# Title\n", "Some *text*.\n", "# Title\n"]
+
+    first = _counting_cache(path, converted, 1000).convert_many(texts)
+    assert converted == ["# Title\n", "Some *text*.\n"]
+    assert first == [MarkdownPart.markdown_to_html(x) for x in texts]
+
+    second = _counting_cache(path, converted, 1000).convert_many(texts)
+    assert second == first
+    assert len(converted) == 2
+
+
+def test_fragments_evicted(test_notebook_dir: str) -> None:
+    """Check the least recently used fragments are dropped to keep under the limit."""
+    path = os.path.join(test_notebook_dir, "fragments.sqlite")
+    converted: List[str] = []
+    cache = _counting_cache(path, converted, 30)
+
+    cache.convert_many(["First.\n"])
+    cache.convert_many(["Second.\n"])
+    cache.convert_many(["Third.\n"])
+    converted.clear()
+
+    cache.convert_many(["Third.\n", "First.\n"])
+    assert converted == ["First.\n"]
+
+
+def test_fragments_match_document(test_notebook_dir: str) -> None:
+    """Check converting a section at a time gives the same HTML as all at once."""
+    whole = HtmlDocument("# Title")
+    for text in NOTES:
+        whole.add_part(MarkdownPart(text))
+    expected = markdown.Markdown(extensions=RENDERER_EXTENSIONS).convert(
+        whole.combine(metadata=False)
+    )
+    assert "".join(whole.html_fragments()) == expected
+
+    path = os.path.join(test_notebook_dir, "fragments.sqlite")
+    for _ in range(2):
+        streamed = HtmlDocument("# Title", fragments=_counting_cache(path, [], 100000))
+        streamed.stream_parts(MarkdownPart(x) for x in NOTES)
+        assert "".join(streamed.html_fragments()) == expected
@@ -0,0 +1,43 @@
+# pylint: disable=unused-import, redefined-outer-name
+"""
+Tests for calculating file digests.
+"""
+
+import hashlib
+import os
+
+import tidynotes
+from tidynotes.hashing import calc_digests, calc_md5, calc_sha256
+
+from .fixtures import test_notebook_dir, test_notebook
+
+
+def test_calc_digests(test_notebook_dir: str) -> None:
+    """Test that each way of reading a file gives the same digests as hashlib."""
+    os.makedirs(test_notebook_dir, exist_ok=True)
+    path = os.path.join(test_notebook_dir, "data.bin")
+    for data in [b"", b"Some text.\n", os.urandom(200_000)]:
+        with open(path, "wb") as file:
+            file.write(data)
+        expected = {
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "md5": hashlib.md5(data).hexdigest(),
+        }
+        assert calc_digests(path) == expected
+        assert calc_digests(path, buffer_size=1000) == expected
+        assert calc_digests(path, use_mmap=True) == expected
+        assert calc_sha256(path) == expected["sha256"]
+        assert calc_md5(path) == expected["md5"]
+
+
+def test_rendered_digests(test_notebook: tidynotes.Notebook) -> None:
+    """Test that the hash log matches the files that were rendered."""
+    test_notebook.make_note()
+    test_notebook.render_full()
+
+    hash_log = os.path.join(test_notebook.root_dir, "working", "hash_log.csv")
+    with open(hash_log, encoding="utf-8") as file:
+        path, _, sha256, md5, size = file.readline().strip().split(",")
+    path = os.path.join(test_notebook.root_dir, path.strip('"'))
+    assert calc_digests(path) == {"sha256": sha256, "md5": md5}
+    assert os.path.getsize(path) == int(size)
@@ -0,0 +1,81 @@
+# pylint: disable=unused-import, redefined-outer-name, protected-access
+"""
+Tests for the index of links between notes.
+"""
+
+import datetime
+import os
+from typing import List
+
+import tidynotes
+from tidynotes.links import link_key
+from tidynotes.mardown_document import MarkdownPart
+
+from .fixtures import test_notebook_dir, test_notebook
+
+
+def _append(path: str, text: str) -> None:
+    """Add some text to the end of a note."""
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(text)
+
+
+def test_link_key() -> None:
+    """Test that links are normalised for matching."""
+    assert link_key("Some Note") == "some note"
+    assert link_key(" Some Note|alias") == "some note"
+    assert link_key("Some Note#Heading") == "some note"
+    assert link_key("#Heading") == ""
+
+
+def test_links(test_notebook: tidynotes.Notebook) -> None:
+    """Test finding links, backlinks and broken references."""
+    test_notebook.make_series(3, datetime.datetime(year=2021, month=1, day=1))
+    paths = list(test_notebook.files)
+    _append(paths[0], "\nSee [[2021-01-02 (Saturday)|tomorrow]] and [[Nowhere]].\n")
+    _append(
+        paths[2], "\n## Alpha\n\nFrom [[notes_2021-01-02_Sat]].\n![](missing.png)\n"
+    )
+
+    assert test_notebook.backlinks(paths) == {
+        paths[0]: [],
+        paths[1]: [paths[0], paths[2]],
+        paths[2]: [],
+    }
+    index = test_notebook.link_index
+    assert index.links_from(paths[0]) == ["2021-01-02 (Saturday)|tomorrow", "Nowhere"]
+    assert index.dangling() == [(paths[0], "Nowhere")]
+    assert index.images(paths[2]) == ["missing.png"]
+    assert index.missing_images() == [(paths[2], "missing.png")]
+
+    # Only the modified note is re-read.
+    _append(paths[0], "\nAlso [[2021-01-03 (Sunday)]].\n")
+    test_notebook.refresh()
+    read: List[str] = []
+
+    def reader(paths: List[str]) -> List[MarkdownPart]:
+        read.extend(paths)
+        return test_notebook._read_files(paths)
+
+    index.update(test_notebook.files, reader)
+    assert read == [paths[0]]
+    assert index.backlinks([paths[2]]) == {paths[2]: [paths[0]]}
+    assert not index.dangling()[1:]
+
+
+def test_rendered_backlinks(test_notebook: tidynotes.Notebook) -> None:
+    """Test that backlinks can be included when rendering."""
+    test_notebook.make_series(2, datetime.datetime(year=2021, month=1, day=1))
+    _append(list(test_notebook.files)[1], "\nBack to [[2021-01-01 (Friday)]].\n")
+    test_notebook.refresh()
+    output_path = os.path.join(test_notebook.root_dir, "rendered", "full.html")
+
+    test_notebook.render_full(output_path)
+    with open(output_path, encoding="utf-8") as file:
+        assert "Linked from" not in file.read()
+
+    test_notebook.config["render_backlinks"] = True
+    test_notebook.render_full(output_path)
+    with open(output_path, encoding="utf-8") as file:
+        assert "Linked from: 2021-01-02 (Saturday)" in file.read()
+    assert "Linked from" not in test_notebook.notes[0].combine()
@@ -1,8 +1,18 @@
-# pylint: disable=redefined-outer-name
+# pylint: disable=unused-import, redefined-outer-name
 """
 Tests for the code managing individual notes.
 """
-from tidynotes.mardown_document import MarkdownPart
+
+import os
+import random
+import re
+from typing import Any, List, Tuple
+
+import pytest
+from tidynotes import mardown_document
+from tidynotes.mardown_document import MarkdownPart, PartView
+
+from .fixtures import test_notebook_dir
 
 
 def test_simple_note() -> None:
@@ -59,3 +69,194 @@ def test_no_title_note() -> None:
     assert test_note.title is None
     assert test_note.body.strip() == body
     assert len(test_note.parts) == 0
+
+
+class _ReferencePart(MarkdownPart):  # pylint: disable=too-few-public-methods
+    """
+    The original recursive parser, kept as a reference for the single-pass one.
+    """
+
+    def _parse_raw(self, text: str) -> None:
+        lines = self._parse_title(self._parse_metadata(text.split("\n")))
+        line_no = -1
+        child_pattern = re.compile(f"^({'#' * (self.level + 1)}) (.*)$")
+        body: List[str] = []
+        for line_no, line in enumerate(lines):
+            if re.match(child_pattern, line):
+                break
+            body.append(line)
+        lines = lines[line_no:]
+
+        current_child: List[str] = []
+        children: List[MarkdownPart] = []
+        for line in lines:
+            if not re.match(child_pattern, line):
+                current_child.append(line)
+            else:
+                if "\n".join(current_child).strip():
+                    children.append(_ReferencePart("\n".join(current_child)))
+                current_child = [line]
+        if current_child and re.match(child_pattern, current_child[0]):
+            children.append(_ReferencePart("\n".join(current_child)))
+
+        self.body = "\n".join(body).strip("\n") + "\n"
+        self.parts = children
+
+
+def _structure(part: Any) -> Tuple[Any, ...]:
+    """Summarise a parsed document so two parsers can be compared."""
+    return (
+        part.title,
+        part.body,
+        part.level,
+        part.meta,
+        [_structure(x) for x in part.parts],
+    )
+
+
+def test_parser_equivalence() -> None:
+    """Check the single-pass parser against the original recursive one."""
+    generator = random.Random(42)
+    line_options = [
+        "",
+        "",
+        "Some text.",
+        "More text with a # in it.",
+        "# Level 1",
+        "## Level 2",
+        "### Level 3",
+        "#### Level 4",
+        "##### Level 5",
+        "##Not a heading",
+        "## ",
+        "#",
+        "---",
+    ]
+    headers = [
+        "",
+        "---\ntitle: Meta title\nnote_for: 2021-01-24\n---\n",
+        "---\na: 1\n---\n",
+    ]
+    for _ in range(500):
+        lines = generator.choices(line_options, k=generator.randint(0, 40))
+        header = generator.choice(headers)
+        if not header and lines and lines[0] == "---":
+            lines[0] = "Some text."
+        text = header + "\n".join(lines)
+        assert _structure(MarkdownPart(text)) == _structure(_ReferencePart(text))
+
+
+def test_shared_source() -> None:
+    """Check that parts share the source text until they're changed."""
+    test_note = MarkdownPart("# Title\n\nIntro.\n\n## Project\n\nIt isn't.\n")
+    project = test_note.parts[0]
+
+    assert not hasattr(test_note, "__dict__")
+    assert project._source is test_note._source  # pylint: disable=protected-access
+    assert project.body == "It isn't.\n"
+
+    project.make_replacement("isn't", "is", regex=False)
+    assert project.body == "It is.\n"
+    assert test_note.body == "Intro.\n"
+
+
+def test_part_views() -> None:
+    """Check that extracted parts match copies, and don't change the original."""
+    text = "# Title\n\n## Project\n\nIt isn't.\n\n### Task\n\nIt isn't.\n"
+    test_note = MarkdownPart(text)
+
+    extracted = test_note.extract_parts("Project")
+    assert [x.combine() for x in extracted] == [test_note.parts[0].copy().combine()]
+
+    document = MarkdownPart("# Document")
+    document.add_part(extracted[0])
+    document.make_replacement("isn't", "is", regex=False)
+    assert document.parts[0].level == 2
+    assert document.parts[0].parts[0].level == 3
+    assert document.parts[0].parts[0].body == "It is.\n"
+    assert test_note.combine() == MarkdownPart(text).combine()
+
+
+def test_view_file_info(test_notebook_dir: str) -> None:
+    """Check that writing a view out doesn't change the file info of its base."""
+    path = os.path.join(test_notebook_dir, "note.md")
+    MarkdownPart("# Title\n\nIt isn't.\n").to_file(path)
+    test_note = MarkdownPart.from_file(path)
+    file_info = dict(test_note.meta[".file"])
+
+    view = PartView(test_note)
+    view.make_replacement("isn't", "is", regex=False)
+    view.to_file(path)
+    assert view.meta[".file"]["sha256"] != file_info["sha256"]
+    assert test_note.meta[".file"] == file_info
+
+
+def test_metadata_passthrough() -> None:
+    """Check that unchanged metadata is written back out exactly as it was read."""
+    header = "---\ntitle: Title\nnote_for: 2021-01-01\ntags: [a, b]  # Comment\n---\n"
+    test_note = MarkdownPart(header + "\n# Title\n\nBody.\n")
+    assert test_note.combine().startswith(header + "\n# Title")
+
+    test_note.meta["tags"].append("c")
+    changed = test_note.combine()
+    assert "# Comment" not in changed
+    assert MarkdownPart(changed).meta["tags"] == ["a", "b", "c"]
+
+    test_note.meta["tags"] = ["a", "b"]
+    assert test_note.combine().startswith(header)
+
+
+def test_metadata_dump() -> None:
+    """Check that changed metadata is written the same way as `yaml.dump`."""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    test_note = MarkdownPart("---\ntitle: Title\n---\n\n# Title\n")
+    test_note.meta["note_for"] = "2021-01-01"
+    test_note.meta["projects"] = ["One", "Two"]
+    expected = yaml.dump({**test_note.meta, "title": "Title"}).strip()
+    assert test_note.combine().startswith(f"---\n{expected}\n---\n")
+
+
+def test_write_avoidance(
+    test_notebook_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Check that unchanged notes aren't read or written, and changes are."""
+    path = os.path.join(test_notebook_dir, "note.md")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("# Title\n\nIt isn't.\n")
+    test_note = MarkdownPart.from_file(path)
+    test_note.to_file(path)
+
+    def no_open(*_: Any, **__: Any) -> None:
+        raise AssertionError("The file shouldn't be opened.")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(mardown_document, "open", no_open, raising=False)
+        test_note.to_file(path)
+
+    test_note.make_replacement("isn't", "is", regex=False)
+    test_note.to_file(path)
+    assert os.listdir(test_notebook_dir) == ["note.md"]
+    assert MarkdownPart.from_file(path).meta[".file"] == test_note.meta[".file"]
+
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("Edited.\n")
+    test_note.to_file(path)
+    assert MarkdownPart.from_file(path).combine() == test_note.combine()
+
+
+def test_atomic_write(test_notebook_dir: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Check that an interrupted write leaves the original file alone."""
+    path = os.path.join(test_notebook_dir, "note.md")
+    MarkdownPart("# Title\n\nOriginal.\n").to_file(path)
+
+    def fail(*_: Any) -> None:
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "replace", fail)
+        with pytest.raises(KeyboardInterrupt):
+            MarkdownPart("# Title\n\nChanged.\n").to_file(path)
+
+    assert os.listdir(test_notebook_dir) == ["note.md"]
+    assert MarkdownPart.from_file(path).body == "Original.\n"
@@ -0,0 +1,134 @@
+# pylint: disable=unused-import, redefined-outer-name
+"""
+Tests for the cache of parsed notes.
+"""
+
+import datetime
+import os
+import pickle
+import sqlite3
+from typing import Any, Tuple
+
+import tidynotes
+from tidynotes import note_cache
+from tidynotes.mardown_document import MarkdownPart
+
+from .fixtures import test_notebook_dir, test_notebook
+
+
+def _stat(path: str) -> note_cache.FileStat:
+    file_info = os.stat(path)
+    return (file_info.st_mtime, file_info.st_size)
+
+
+def test_cache_round_trip(test_notebook_dir: str) -> None:
+    """Check that a cached note comes back the same as it went in."""
+    note_path = os.path.join(test_notebook_dir, "note.md")
+    with open(note_path, "w", encoding="utf-8") as file:
+        file.write("# Title\n\nSome text.\n\n## Project\n\nMore text.\n")
+    note = MarkdownPart.from_file(note_path)
+
+    cache = note_cache.NoteCache(os.path.join(test_notebook_dir, "cache.sqlite"))
+    cache.put([note])
+    cached = cache.get({note_path: _stat(note_path)})
+
+    assert list(cached) == [note_path]
+    assert cached[note_path].combine() == note.combine()
+    assert cached[note_path].meta == note.meta
+
+
+def test_cache_metadata(test_notebook_dir: str) -> None:
+    """Check that cached metadata and edited sections come back the same."""
+    note_path = os.path.join(test_notebook_dir, "note.md")
+    with open(note_path, "w", encoding="utf-8") as file:
+        file.write(
+            "---\ntitle: Title\nnote_for: 2021-01-24  # Comment\ntags: [a, b]\n---\n"
+            "\n# Title\n\nSome text.\n\n## Project\n\n### Task\n\nMore text.\n"
+        )
+    note = MarkdownPart.from_file(note_path)
+    note.parts[0].body = "Changed.\n"
+
+    cache = note_cache.NoteCache(os.path.join(test_notebook_dir, "cache.sqlite"))
+    cache.put([note])
+    cached = cache.get({note_path: _stat(note_path)})[note_path]
+
+    assert cached.meta == note.meta
+    assert cached.meta["note_for"] == datetime.date(2021, 1, 24)
+    assert cached.combine() == note.combine()
+    assert "# Comment" in cached.combine()
+    assert [x.level for x in cached.parts[0].parts] == [3]
+
+
+class _Payload:  # pylint: disable=too-few-public-methods
+    """Writes a file when unpickled."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str, str]]:
+        return (open, (self.path, "w"))
+
+
+def test_cache_not_unpickled(test_notebook_dir: str) -> None:
+    """Check that a pickled entry written into the cache isn't run."""
+    note_path = os.path.join(test_notebook_dir, "note.md")
+    with open(note_path, "w", encoding="utf-8") as file:
+        file.write("# Title\n\nSome text.\n")
+    cache_path = os.path.join(test_notebook_dir, "cache.sqlite")
+    cache = note_cache.NoteCache(cache_path)
+    cache.put([MarkdownPart.from_file(note_path)])
+
+    marker = os.path.join(test_notebook_dir, "marker")
+    connection = sqlite3.connect(cache_path)
+    with connection:
+        connection.execute(
+            "UPDATE notes SET data = ?", (pickle.dumps(_Payload(marker)),)
+        )
+    connection.close()
+
+    assert not cache.get({note_path: _stat(note_path)})
+    assert not os.path.exists(marker)
+
+
+def test_cache_stale_entry(test_notebook_dir: str) -> None:
+    """Check that entries aren't used once the file has changed."""
+    note_path = os.path.join(test_notebook_dir, "note.md")
+    with open(note_path, "w", encoding="utf-8") as file:
+        file.write("# Title\n\nSome text.\n")
+    cache = note_cache.NoteCache(os.path.join(test_notebook_dir, "cache.sqlite"))
+    cache.put([MarkdownPart.from_file(note_path)])
+
+    with open(note_path, "a", encoding="utf-8") as file:
+        file.write("Some more text.\n")
+
+    assert not cache.get({note_path: _stat(note_path)})
+
+
+def test_cache_version(test_notebook_dir: str) -> None:
+    """Check that entries from another cache version are dropped."""
+    note_path = os.path.join(test_notebook_dir, "note.md")
+    with open(note_path, "w", encoding="utf-8") as file:
+        file.write("# Title\n\nSome text.\n")
+    cache_path = os.path.join(test_notebook_dir, "cache.sqlite")
+    cache = note_cache.NoteCache(cache_path)
+    cache.put([MarkdownPart.from_file(note_path)])
+
+    connection = sqlite3.connect(cache_path)
+    with connection:
+        connection.execute("UPDATE info SET value = 'old' WHERE key = 'version'")
+    connection.close()
+
+    assert not cache.get({note_path: _stat(note_path)})
+
+
+def test_notebook_reads_changes(test_notebook: tidynotes.Notebook) -> None:
+    """Check that a re-read notebook picks up changes to cached notes."""
+    test_notebook.make_note(datetime.datetime(year=2021, month=1, day=24))
+    test_notebook.refresh()
+    note_path = test_notebook.notes[0].meta[".file"]["path"]
+
+    with open(note_path, "a", encoding="utf-8") as file:
+        file.write("\n## Project\n\nNew text.\n")
+    test_notebook.refresh()
+
+    assert [x.title for x in test_notebook.notes[0].parts] == ["Project"]
@@ -3,7 +3,12 @@
 Tests for the overall notebook object.
 """
 import datetime
+import os
+from typing import List
+
+import pytest
 import tidynotes
+from tidynotes.mardown_document import MarkdownPart
 
 from .fixtures import test_notebook_dir, test_notebook
 
@@ -47,3 +52,188 @@ def test_note_series_creation(test_notebook: tidynotes.Notebook) -> None:
     assert len(test_notebook.notes) == 5
     test_notebook.make_series(5, note_date)
     assert len(test_notebook.notes) == 5
+
+
+def test_bulk_note_creation(test_notebook: tidynotes.Notebook) -> None:
+    """Test that notes generated in bulk match the files written."""
+    start = datetime.datetime(year=2021, month=1, day=30)
+    dates = [start + datetime.timedelta(days=x) for x in range(4)]
+
+    assert len(test_notebook.notes) == 0
+    paths = test_notebook.make_notes(dates + dates[:1])
+    assert len(paths) == 4
+    assert test_notebook.make_notes(dates) == []
+    assert len(test_notebook.make_notes(dates[:2], force=True)) == 2
+
+    generated = test_notebook.notes
+    assert [x.meta[".file"]["path"] for x in generated] == sorted(paths)
+    for note in generated:
+        from_file = MarkdownPart.from_file(note.meta[".file"]["path"])
+        assert note.combine() == from_file.combine()
+        assert note.meta == from_file.meta
+
+    test_notebook.refresh()
+    assert list(test_notebook.files) == sorted(paths)
+
+
+def test_parallel_loading(test_notebook: tidynotes.Notebook) -> None:
+    """Test that loading notes with a worker pool matches loading them serially."""
+    test_notebook.make_series(5, datetime.datetime(year=2021, month=1, day=24))
+    test_notebook.config["cache_notes"] = False
+
+    test_notebook.refresh()
+    serial = [x.combine() for x in test_notebook.notes]
+
+    test_notebook.workers = 2
+    test_notebook.parallel_threshold = 0
+    test_notebook.refresh()
+    assert [x.combine() for x in test_notebook.notes] == serial
+
+
+def test_lazy_loading(test_notebook_dir: str) -> None:
+    """Test that notes are only read once they're needed."""
+    tidynotes.Notebook.initialise(test_notebook_dir)
+    notebook = tidynotes.Notebook(test_notebook_dir)
+    notebook.make_note(datetime.datetime(year=2021, month=1, day=24))
+    assert notebook._notes is None  # pylint: disable=protected-access
+
+    assert len(notebook.files) == 1
+    assert len(notebook.notes) == 1
+    assert list(notebook.files) == [x.meta[".file"]["path"] for x in notebook.notes]
+
+
+def test_incremental_clean(test_notebook_dir: str) -> None:
+    """Test that cleaning only processes notes that changed since the last clean."""
+    tidynotes.Notebook.initialise(test_notebook_dir)
+    notebook = tidynotes.Notebook(test_notebook_dir)
+    notebook.make_series(3, datetime.datetime(year=2021, month=1, day=24))
+    notebook.clean()
+
+    cleaned = []
+    notebook = tidynotes.Notebook(test_notebook_dir)
+    original = notebook.text_corrections
+
+    def spy(notes: List[MarkdownPart]) -> None:
+        cleaned.extend(notes)
+        original(notes)
+
+    notebook.text_corrections = spy  # type: ignore
+    notebook.clean()
+    assert not cleaned
+
+    note_path = list(notebook.files)[1]
+    with open(note_path, "a", encoding="utf-8") as file:
+        file.write("\nIt‘s changed.\n")
+    notebook.clean()
+    assert [x.meta[".file"]["path"] for x in cleaned] == [note_path]
+    with open(note_path, encoding="utf-8") as file:
+        assert "It's changed." in file.read()
+
+    cleaned.clear()
+    notebook.clean(incremental=False)
+    assert len(cleaned) == 3
+
+
+def _add_projects(notebook: tidynotes.Notebook) -> None:
+    """Write a few notes with projects and tasks into a notebook."""
+    notebook.make_series(4, datetime.datetime(year=2021, month=1, day=1))
+    for this_note, project in zip(notebook.notes, ["Alpha", "Beta", "Broken", "Alpha"]):
+        path = this_note.meta[".file"]["path"]
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(f"\n## {project}\n\n### Task\n\nSome work.\n")
+    notebook.refresh()
+
+
+def test_parallel_project_rendering(test_notebook: tidynotes.Notebook) -> None:
+    """Test that rendering projects in parallel matches rendering them serially."""
+    _add_projects(test_notebook)
+    output_dir = os.path.join(test_notebook.root_dir, "rendered")
+    os.makedirs(os.path.join(output_dir, "Broken.html"))
+
+    assert test_notebook.render_all_projects() == ["Broken"]
+    with open(os.path.join(output_dir, "Alpha.html"), encoding="utf-8") as file:
+        serial = file.read()
+    os.remove(os.path.join(output_dir, "Alpha.html"))
+
+    test_notebook.workers = 2
+    assert test_notebook.render_all_projects() == ["Broken"]
+    with open(os.path.join(output_dir, "Alpha.html"), encoding="utf-8") as file:
+        assert file.read() == serial
+    assert serial.count("Some work.") == 2
+
+    hash_log = os.path.join(test_notebook.root_dir, "working", "hash_log.csv")
+    with open(hash_log, encoding="utf-8") as file:
+        assert len(file.readlines()) == 4
+
+
+def test_renamed_project_index(test_notebook: tidynotes.Notebook) -> None:
+    """Test that renaming projects while the notes are loaded updates the index."""
+    _add_projects(test_notebook)
+    test_notebook.clean()
+    assert len(test_notebook.extract_project("Alpha")) == 2
+
+    for this_note in test_notebook.notes:
+        this_note.replace_title({"Alpha": "Alhpa"}, level=2)
+    test_notebook.notes = test_notebook.notes
+    assert "Alhpa" in test_notebook.project_index.projects
+
+    projects_path = os.path.join(test_notebook.root_dir, "working", "projects.json")
+    with open(projects_path, "w", encoding="utf-8") as file:
+        file.write('{"Alhpa": "Alpha"}')
+    test_notebook.clean()
+    test_notebook.render_all_projects()
+
+    output_dir = os.path.join(test_notebook.root_dir, "rendered")
+    assert "Alhpa" not in test_notebook.project_index.projects
+    assert not os.path.exists(os.path.join(output_dir, "Alhpa.html"))
+    assert len(test_notebook.extract_project("Alpha")) == 2
+
+
+def test_streamed_rendering(test_notebook_dir: str) -> None:
+    """Test that streaming a render gives the same output as rendering in one go."""
+    notebook = tidynotes.Notebook.initialise(test_notebook_dir)
+    _add_projects(notebook)
+    output_dir = os.path.join(notebook.root_dir, "rendered")
+
+    notebook = tidynotes.Notebook(test_notebook_dir)
+    notebook.stream_chunk_size = 3
+    notebook.render_full(os.path.join(output_dir, "streamed.html"))
+    notebook._render(  # pylint: disable=protected-access
+        notes=notebook.notes,
+        title=str(notebook.config["notebook_name"]),
+        dst_path=os.path.join(output_dir, "whole.html"),
+        stream=False,
+    )
+
+    with open(os.path.join(output_dir, "streamed.html"), "rb") as file:
+        streamed = file.read()
+    with open(os.path.join(output_dir, "whole.html"), "rb") as file:
+        assert file.read() == streamed
+    assert streamed.count(b"Some work.") == 4
+    assert streamed.count(b"<h2>2021-01-") == 4
+
+
+def _break_note(notebook: tidynotes.Notebook) -> None:
+    """Add a note that can't be read (invalid UTF-8), with the notes unloaded."""
+    path = os.path.join(notebook.root_dir, "notes", "zz_broken.md")
+    with open(path, "wb") as file:
+        file.write(b"# Broken\n\n\xff\xfe\n")
+    notebook.refresh()
+
+
+def test_failed_render(test_notebook: tidynotes.Notebook) -> None:
+    """Test that a render that fails partway leaves the last good page in place."""
+    _add_projects(test_notebook)
+    test_notebook.stream_chunk_size = 2
+    output_dir = os.path.join(test_notebook.root_dir, "rendered")
+    test_notebook.render_full()
+    rendered = sorted(os.listdir(output_dir))
+    with open(os.path.join(output_dir, rendered[0]), "rb") as file:
+        expected = file.read()
+
+    _break_note(test_notebook)
+    with pytest.raises(UnicodeDecodeError):
+        test_notebook.render_full()
+    assert sorted(os.listdir(output_dir)) == rendered
+    with open(os.path.join(output_dir, rendered[0]), "rb") as file:
+        assert file.read() == expected
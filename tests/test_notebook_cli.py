@@ -2,9 +2,15 @@
 """
 Tests for the CLI architecture.
 """
+import datetime
 import os
+import sys
+from typing import Any, List
 
+import pytest
 import tidynotes
+from tidynotes import __main__, aio
+from tidynotes.hashing import calc_digests
 
 from .fixtures import test_notebook_dir
 
@@ -51,3 +57,53 @@ def test_note_series_creation_cli(test_notebook_dir: str) -> None:
 
     notebook.refresh()
     assert len(notebook.notes) == 4
+
+
+def test_render_range_cli(test_notebook_dir: str) -> None:
+    """Test rendering the notes for the last few days in the command-line."""
+    cmd = f'tidynotes -notedir "{test_notebook_dir}" -i'
+    os.system(cmd)
+    cmd = f'tidynotes -notedir "{test_notebook_dir}" -g -r --days 7'
+    os.system(cmd)
+
+    notebook = tidynotes.Notebook(test_notebook_dir)
+    start = datetime.date.today() - datetime.timedelta(days=6)
+    name = f"{notebook.config['notebook_name']} (from {start}).html"
+    assert os.path.exists(os.path.join(test_notebook_dir, "rendered", name))
+
+
+def test_range_needs_render_cli(test_notebook_dir: str) -> None:
+    """Test that a range of dates is rejected for actions that would ignore it."""
+    cmd = f'tidynotes -notedir "{test_notebook_dir}" -i'
+    os.system(cmd)
+    for flags in ["-a --days 7", "-r --shards --days 7", "-q test --since 2021-01-01"]:
+        cmd = f'tidynotes -notedir "{test_notebook_dir}" {flags}'
+        assert os.system(cmd) != 0
+    assert not os.path.exists(os.path.join(test_notebook_dir, "rendered"))
+
+
+def test_async_io_cli(test_notebook_dir: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that --async_io cleans and renders through the async methods."""
+    cmd = f'tidynotes -notedir "{test_notebook_dir}" -i -s 3'
+    os.system(cmd)
+    cmd = f'tidynotes -notedir "{test_notebook_dir}" -c -r'
+    os.system(cmd)
+    name = f"{tidynotes.Notebook(test_notebook_dir).config['notebook_name']}.html"
+    output_path = os.path.join(test_notebook_dir, "rendered", name)
+    expected = calc_digests(output_path)
+    os.remove(output_path)
+
+    ran: List[Any] = []
+    original = aio.run
+
+    def spy(coroutine: Any) -> Any:
+        ran.append(coroutine.__name__)
+        return original(coroutine)
+
+    monkeypatch.setattr(aio, "run", spy)
+    monkeypatch.setattr(__main__, "setup_logging", lambda _: None)
+    flags = ["-notedir", test_notebook_dir, "-c", "-r", "--async_io"]
+    monkeypatch.setattr(sys, "argv", ["tidynotes", *flags])
+    __main__.main()
+    assert ran == ["clean_async", "render_full_async"]
+    assert calc_digests(output_path) == expected
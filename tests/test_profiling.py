@@ -0,0 +1,72 @@
+# pylint: disable=unused-import, redefined-outer-name
+"""
+Tests for timing phases of work.
+"""
+
+import datetime
+import os
+from typing import Dict, List, Tuple
+
+import tidynotes
+from tidynotes import profiling
+from tidynotes.mardown_document import MarkdownPart, write_text
+
+from .fixtures import test_notebook_dir, test_notebook
+
+
+def test_phases() -> None:
+    """Test recording phases, counters and hooks."""
+    seen: List[Tuple[str, Dict[str, int]]] = []
+    with profiling.profile([lambda x, y, z: seen.append((x, z))]) as profiler:
+        with profiling.phase("outer", notes=2) as timer:
+            with profiling.phase("inner", bytes_read=10):
+                pass
+            timer.add(notes=1)
+        with profiling.phase("inner", bytes_read=5):
+            pass
+
+    report = profiler.report()
+    assert report["phases"]["outer"]["notes"] == 3
+    assert report["phases"]["inner"]["calls"] == 2
+    assert report["phases"]["inner"]["bytes_read"] == 15
+    assert [x[0] for x in seen] == ["inner", "outer", "inner"]
+
+    # Nothing is recorded once profiling is turned off.
+    with profiling.phase("outer"):
+        pass
+    assert profiler.report()["phases"]["outer"]["calls"] == 1
+
+
+def test_notebook_profile(test_notebook: tidynotes.Notebook) -> None:
+    """Test that each phase of cleaning and rendering is recorded."""
+    test_notebook.make_series(3, datetime.datetime(year=2021, month=1, day=1))
+    test_notebook.refresh()
+    test_notebook.cache.clear()
+    with test_notebook.profile() as profiler:
+        test_notebook.clean(incremental=False)
+        test_notebook.render_full()
+
+    phases = profiler.report()["phases"]
+    for name in ["glob", "parse", "yaml", "corrections", "titles"]:
+        assert phases[name]["calls"] > 0
+    for name in ["combine", "convert", "template", "render", "write", "hash"]:
+        assert phases[name]["calls"] > 0
+    assert phases["parse"]["notes"] == 3
+    assert phases["write"]["bytes_written"] > 0
+
+    # Corrections made while rendering are recorded too, for the title and each note.
+    with test_notebook.profile() as profiler:
+        test_notebook.render_full()
+    assert profiler.report()["phases"]["corrections"]["notes"] == 4
+
+
+def test_bytes_counted(test_notebook_dir: str) -> None:
+    """Test that bytes (not characters) are counted for text with non-ASCII in it."""
+    path = os.path.join(test_notebook_dir, "note.md")
+    with profiling.profile() as profiler:
+        write_text(path, "# Café\n\nIt’s “quoted”.\n")
+        MarkdownPart.from_file(path)
+
+    phases = profiler.report()["phases"]
+    assert phases["write"]["bytes_written"] == os.path.getsize(path)
+    assert phases["parse"]["bytes_read"] == os.path.getsize(path)
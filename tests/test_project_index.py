@@ -0,0 +1,54 @@
+"""
+Tests for the index of projects and tasks.
+"""
+
+import random
+from typing import List
+
+from tidynotes.mardown_document import MarkdownPart
+from tidynotes.project_index import ProjectIndex
+
+
+def _make_notes(seed: int) -> List[MarkdownPart]:
+    """Make a set of random notes with a few projects and tasks."""
+    generator = random.Random(seed)
+    titles = ["Alpha", "Alpha 2", "Beta", "Gamma (old)", "Misc"]
+    notes = []
+    for note_no in range(20):
+        lines = [f"# Note {note_no}", "", "Intro."]
+        for _ in range(generator.randint(0, 4)):
+            level = generator.randint(2, 4)
+            lines.extend(["#" * level + " " + generator.choice(titles), "", "Text."])
+        notes.append(MarkdownPart("\n".join(lines)))
+    return notes
+
+
+def test_find_matches_extract_parts() -> None:
+    """Check lookups give the same parts as extracting from each note in turn."""
+    for seed in range(10):
+        notes = _make_notes(seed)
+        index = ProjectIndex(notes)
+        for pattern in ["Alpha", "Alpha 2", "Gamma", "Gamma (old)", "B.*", "Nothing"]:
+            expected = [
+                (this_note.title, x.combine())
+                for this_note in notes
+                for x in this_note.extract_parts(pattern)
+            ]
+            found = [(x.title, y.combine()) for x, y in index.find(pattern)]
+            assert found == expected
+
+
+def test_replace_titles() -> None:
+    """Check title replacement matches replacing the titles note by note."""
+    mapping = {"Alpha": "Alpha 2", "Misc": "Other"}
+    for seed in range(10):
+        expected = _make_notes(seed)
+        for this_note in expected:
+            this_note.replace_title(mapping, level=2)
+            this_note.replace_title(mapping, level=3)
+
+        notes = _make_notes(seed)
+        index = ProjectIndex(notes)
+        index.replace_titles(mapping, level=2)
+        index.replace_titles(mapping, level=3)
+        assert [x.combine() for x in notes] == [x.combine() for x in expected]
@@ -0,0 +1,51 @@
+# pylint: disable=unused-import, redefined-outer-name, protected-access
+"""
+Tests for the full-text search index.
+"""
+
+import datetime
+import os
+
+import pytest
+import tidynotes
+
+from .fixtures import test_notebook_dir, test_notebook
+
+
+def test_search(test_notebook: tidynotes.Notebook) -> None:
+    """Test searching the text, headings and dates of notes."""
+    test_notebook.make_series(3, datetime.datetime(year=2021, month=1, day=1))
+    paths = list(test_notebook.files)
+    with open(paths[1], "a", encoding="utf-8") as file:
+        file.write("\n## Alpha\n\n### Planning\n\nDiscussed the budget.\n")
+
+    results = test_notebook.search("budget")
+    assert len(results) == 1
+    assert results[0].path == paths[1]
+    assert results[0].project == "Alpha"
+    assert results[0].task == "Planning"
+    assert "[budget]" in results[0].snippet
+
+    assert [x.heading for x in test_notebook.search("project:alpha")] == [
+        "Alpha",
+        "Planning",
+    ]
+    assert len(test_notebook.search('date:"2021-01-03"')) == 1
+    with pytest.raises(ValueError):
+        test_notebook.search('"unbalanced')
+
+
+def test_incremental_indexing(test_notebook_dir: str) -> None:
+    """Test that only modified notes are re-indexed."""
+    notebook = tidynotes.Notebook.initialise(test_notebook_dir)
+    notebook.make_series(3, datetime.datetime(year=2021, month=1, day=1))
+    paths = list(notebook.files)
+    assert notebook.search_index.update(notebook.files, notebook._read_files) == 3
+
+    notebook = tidynotes.Notebook(test_notebook_dir)
+    with open(paths[0], "a", encoding="utf-8") as file:
+        file.write("\nA new thought.\n")
+    os.remove(paths[2])
+    assert notebook.search("thought")[0].path == paths[0]
+    assert notebook.search_index.update(notebook.files, notebook._read_files) == 0
+    assert not notebook.search('date:"2021-01-03"')
@@ -0,0 +1,80 @@
+# pylint: disable=unused-import, redefined-outer-name
+"""
+Tests for rendering the notebook as a page per period.
+"""
+
+import datetime
+import os
+
+import pytest
+import tidynotes
+from tidynotes.shards import ShardManifest
+
+from .fixtures import test_notebook_dir, test_notebook
+
+
+def _read(path: str) -> str:
+    """Read the text of a file."""
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def test_render_shards(test_notebook: tidynotes.Notebook) -> None:
+    """Test that only the shards with changed notes are rendered again."""
+    test_notebook.make_series(4, datetime.datetime(year=2021, month=1, day=30))
+    shard_dir = os.path.join(test_notebook.root_dir, "rendered", "by_month")
+    paths = list(test_notebook.files)
+
+    assert test_notebook.render_shards() == ["2021-01", "2021-02"]
+    assert sorted(os.listdir(shard_dir)) == [
+        "2021-01.html",
+        "2021-02.html",
+        "index.html",
+    ]
+    assert "2021-02.html" in _read(os.path.join(shard_dir, "2021-01.html"))
+    assert "1 note" not in _read(os.path.join(shard_dir, "index.html"))
+    assert "2 notes" in _read(os.path.join(shard_dir, "index.html"))
+    assert test_notebook.render_shards() == []
+
+    with open(paths[-1], "a", encoding="utf-8") as file:
+        file.write("\n## Alpha\n\nSomething new.\n")
+    test_notebook.refresh()
+    assert test_notebook.render_shards() == ["2021-02"]
+    assert "Something new." in _read(os.path.join(shard_dir, "2021-02.html"))
+
+    # New shards are linked to from the pages either side.
+    test_notebook.make_note(datetime.datetime(year=2021, month=3, day=1))
+    assert test_notebook.render_shards() == ["2021-02", "2021-03"]
+    os.remove(test_notebook.notes[-1].meta[".file"]["path"])
+    test_notebook.refresh()
+    assert test_notebook.render_shards() == ["2021-02"]
+    assert not os.path.exists(os.path.join(shard_dir, "2021-03.html"))
+
+    assert test_notebook.render_shards("year") == ["2021"]
+    assert test_notebook.render_shards(force=True) == ["2021-01", "2021-02"]
+    with pytest.raises(ValueError):
+        test_notebook.render_shards("week")
+
+
+def test_shard_settings(test_notebook: tidynotes.Notebook) -> None:
+    """Test that everything is rendered again if the templates change."""
+    test_notebook.make_series(2, datetime.datetime(year=2021, month=1, day=31))
+    assert test_notebook.render_shards() == ["2021-01", "2021-02"]
+
+    css_path = os.path.join(test_notebook.root_dir, "templates", "note.css")
+    with open(css_path, "a", encoding="utf-8") as file:
+        file.write("\n.note { color: black; }\n")
+    assert test_notebook.render_shards() == ["2021-01", "2021-02"]
+
+
+def test_manifest_period(test_notebook_dir: str) -> None:
+    """Test that the manifest only accepts known periods."""
+    path = os.path.join(test_notebook_dir, "manifest.json")
+    with pytest.raises(ValueError):
+        ShardManifest(path, "week", "")
+    manifest = ShardManifest(path, "month", "settings")
+    manifest.assign("a.md", (1.0, 2), "2021-01")
+    manifest.save()
+    assert ShardManifest(path, "month", "settings").shards() == {"2021-01": ["a.md"]}
+    assert not ShardManifest(path, "year", "settings").shards()
+    assert not ShardManifest(path, "month", "other").shards()
@@ -0,0 +1,36 @@
+"""
+Tests that the command-line tool starts quickly.
+"""
+
+import subprocess
+import sys
+
+# Modules that are slow to import, so should only be imported when needed.
+SLOW_MODULES = ["jinja2", "markdown", "yaml", "pkg_resources", "asyncio"]
+
+# Generous limit (in seconds) on importing the package, to catch big regressions.
+IMPORT_BUDGET = 0.5
+
+IMPORT_SCRIPT = f"""
+import sys, time
+start = time.perf_counter()
+import tidynotes.__main__
+print(time.perf_counter() - start)
+print(",".join(x for x in {SLOW_MODULES!r} if x in sys.modules))
+"""
+
+
+def test_import_budget() -> None:
+    """Test that importing the package is quick and defers slow imports."""
+    durations = []
+    for _ in range(3):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            stdout=subprocess.PIPE,
+            check=True,
+            universal_newlines=True,
+        )
+        duration, loaded = result.stdout.split("\n")[:2]
+        assert not loaded
+        durations.append(float(duration))
+    assert min(durations) < IMPORT_BUDGET
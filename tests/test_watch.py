@@ -0,0 +1,112 @@
+# pylint: disable=unused-import, redefined-outer-name, protected-access
+"""
+Tests for watching a notebook for changes.
+"""
+
+import datetime
+import logging
+import os
+from typing import Any, List
+
+import pytest
+import tidynotes
+from tidynotes.watch import NotebookWatcher
+
+from .fixtures import test_notebook_dir, test_notebook
+
+
+def _read(path: str) -> str:
+    """Read the text of a file."""
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def test_watch(
+    test_notebook: tidynotes.Notebook, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that changes to notes are picked up and re-rendered."""
+    test_notebook.make_series(3, datetime.datetime(year=2021, month=1, day=1))
+    paths = list(test_notebook.files)
+    output_dir = os.path.join(test_notebook.root_dir, "rendered")
+    full_path = os.path.join(
+        output_dir, f"{test_notebook.config['notebook_name']}.html"
+    )
+    test_notebook.clean()
+    watcher = NotebookWatcher(
+        test_notebook, clean=True, render_projects=True, debounce=0
+    )
+    assert not watcher.check()
+
+    # Only the edited notes are checked for changes when cleaning.
+    checked: List[Any] = []
+    changed_since_clean = test_notebook._changed_since_clean
+
+    def spy(note_state: Any, paths: Any = None) -> List[str]:
+        checked.append(paths)
+        return changed_since_clean(note_state, paths)
+
+    monkeypatch.setattr(test_notebook, "_changed_since_clean", spy)
+    with open(paths[0], "a", encoding="utf-8") as file:
+        file.write("\n## Alpha\n\nIt’s started.\n")
+    assert watcher.check()
+    assert "It's started." in _read(paths[0])
+    assert "It's started." in _read(full_path)
+    assert "It's started." in _read(os.path.join(output_dir, "Alpha.html"))
+    assert not os.path.exists(os.path.join(output_dir, "Beta.html"))
+    assert checked == [{paths[0]}]
+    # Notes written by cleaning don't count as another change.
+    assert not watcher.check()
+
+    os.remove(paths[0])
+    assert watcher.check()
+    assert len(test_notebook.notes) == 2
+    assert "It's started." not in _read(full_path)
+    # Projects that aren't in any note any more have their pages removed.
+    assert not os.path.exists(os.path.join(output_dir, "Alpha.html"))
+
+
+def test_debounce(test_notebook: tidynotes.Notebook) -> None:
+    """Test that changes are only processed once they stop changing."""
+    test_notebook.make_note(datetime.datetime(year=2021, month=1, day=1))
+    watcher = NotebookWatcher(test_notebook, debounce=60)
+    test_notebook.make_note(datetime.datetime(year=2021, month=1, day=2))
+    assert not watcher.check()
+    assert not watcher.check()
+
+    watcher.debounce = 0
+    assert watcher.check()
+    assert len(test_notebook.notes) == 2
+
+
+def test_retry(
+    test_notebook: tidynotes.Notebook,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test that a failed update is retried, only logging the error once."""
+    test_notebook.make_note(datetime.datetime(year=2021, month=1, day=1))
+    full_path = os.path.join(
+        test_notebook.root_dir,
+        "rendered",
+        f"{test_notebook.config['notebook_name']}.html",
+    )
+    watcher = NotebookWatcher(test_notebook, debounce=0, interval=0)
+
+    calls: List[Any] = []
+    render_full = test_notebook.render_full
+
+    def flaky() -> None:
+        calls.append(None)
+        if len(calls) < 3:
+            raise OSError("Locked.")
+        render_full()
+
+    monkeypatch.setattr(test_notebook, "render_full", flaky)
+    with open(list(test_notebook.files)[0], "a", encoding="utf-8") as file:
+        file.write("\nChanged.\n")
+    with caplog.at_level(logging.DEBUG):
+        watcher.run(cycles=4)
+
+    assert len(calls) == 3
+    assert "Changed." in _read(full_path)
+    assert len([x for x in caplog.records if x.levelno == logging.ERROR]) == 1